@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CommonConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'common'
+
+    def ready(self):
+        # 注册写入时使租户缓存、计数缓存失效的信号处理
+        from . import count_cache, tenant_cache  # noqa: F401
@@ -0,0 +1,138 @@
+"""
+计数缓存模块
+缓存分页使用的COUNT(*)结果，键为(模型, 租户, 查询指纹)，查询指纹是去掉排序后SQL与参数的摘要。
+
+写入失效通过按(模型, 租户)的版本标记实现：模型实例保存、删除或多对多关系变更时写入新的随机标记，
+缓存条目记录计数前读取的标记，标记不一致的条目视为失效。标记的有效期与条目相同，
+标记过期时在其之前写入的条目也已过期。
+bulk_create、update等不触发信号的批量操作，以及查询中关联的其他模型的变更不会使计数失效，
+这些情况由较短的TTL保证计数最终准确
+"""
+import hashlib
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .tenant_middleware import get_current_tenant
+
+logger = logging.getLogger('django')
+
+DEFAULTS = {
+    # 使用的缓存别名（settings.CACHES中的键），多进程部署时应为共享缓存
+    'ALIAS': 'default',
+    # 计数缓存有效期（秒）
+    'TTL': 30,
+}
+
+KEY_PREFIX = 'count'
+
+
+def get_setting(name):
+    """
+    读取settings.COUNT_CACHE中的配置，未配置时使用默认值
+    """
+    return getattr(settings, 'COUNT_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def query_fingerprint(queryset):
+    """
+    计算查询指纹，排序不影响计数，计算前去掉
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    return hashlib.sha1(f'{queryset.db}|{sql}|{params!r}'.encode('utf-8')).hexdigest()
+
+
+class CountCache:
+    """
+    分页计数缓存
+    用法：
+        total = count_cache.count(queryset)
+        total = count_cache.count(queryset, refresh=True)  # 重新计数并更新缓存
+        count_cache.invalidate(Product, tenant_id)
+    """
+
+    @property
+    def cache(self):
+        return caches[get_setting('ALIAS')]
+
+    def _version_key(self, model, tenant_id):
+        return f'{KEY_PREFIX}:version:{model._meta.label_lower}:{tenant_id}'
+
+    def _entry_key(self, model, tenant_id, fingerprint):
+        return f'{KEY_PREFIX}:entry:{model._meta.label_lower}:{tenant_id}:{fingerprint}'
+
+    def get_version(self, model, tenant_id):
+        """
+        模型在租户下的当前版本标记，依赖该模型的其他统计缓存可以用它判断是否失效
+        """
+        return self.cache.get(self._version_key(model, tenant_id), '')
+
+    def count(self, queryset, refresh=False):
+        """
+        获取查询集的行数
+        :param queryset: 查询集
+        :param refresh: 是否忽略缓存重新计数
+        :return: 行数
+        """
+        try:
+            fingerprint = query_fingerprint(queryset)
+        except EmptyResultSet:
+            # none()或空的IN列表，不会返回任何行，也无法生成SQL
+            return 0
+        model = queryset.model
+        tenant = get_current_tenant()
+        tenant_id = tenant.pk if tenant is not None else None
+        version_key = self._version_key(model, tenant_id)
+        entry_key = self._entry_key(model, tenant_id, fingerprint)
+
+        cache = self.cache
+        # 计数之前读取版本标记，计数期间发生写入时条目随即失效
+        cached = cache.get_many([version_key, entry_key])
+        version = cached.get(version_key, '')
+        entry = cached.get(entry_key)
+        if not refresh and entry is not None and entry[1] == version:
+            return entry[0]
+
+        total = queryset.count()
+        cache.set(entry_key, (total, version), get_setting('TTL'))
+        return total
+
+    def invalidate(self, model, tenant_id):
+        """
+        使模型在指定租户下的计数缓存失效，同时使未限定租户（超级管理员）的计数失效
+        """
+        version = uuid.uuid4().hex
+        keys = {self._version_key(model, None): version}
+        if tenant_id is not None:
+            keys[self._version_key(model, tenant_id)] = version
+        self.cache.set_many(keys, get_setting('TTL'))
+
+
+count_cache = CountCache()
+
+
+@receiver(post_save, dispatch_uid='count_cache_invalidate_on_save')
+@receiver(post_delete, dispatch_uid='count_cache_invalidate_on_delete')
+def invalidate_count_cache(sender, instance, **kwargs):
+    """
+    模型实例保存或删除后使该模型的计数缓存失效
+    """
+    if kwargs.get('raw'):
+        return
+    count_cache.invalidate(sender, getattr(instance, 'tenant_id', None))
+
+
+@receiver(m2m_changed, dispatch_uid='count_cache_invalidate_on_m2m_changed')
+def invalidate_count_cache_on_m2m_changed(sender, instance, action, **kwargs):
+    """
+    多对多关系变更后使关系两侧模型的计数缓存失效
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        tenant_id = getattr(instance, 'tenant_id', None)
+        count_cache.invalidate(type(instance), tenant_id)
+        count_cache.invalidate(kwargs['model'], tenant_id)
@@ -5,16 +5,32 @@
 import json
 import traceback
 import logging
+from django.conf import settings
 from django.utils import timezone
 from django.http import JsonResponse
 from rest_framework.exceptions import APIException, ValidationError
 from rest_framework import status
 from .exceptions import BusinessException
-from .response import APIResponse, ResponseCode
+from .response import DEFAULT_MESSAGES, APIResponse, ResponseCode, is_formatted, mark_formatted
 
 # 配置日志
 logger = logging.getLogger('django')
 
+DEFAULTS = {
+    # 超过该字节数的JsonResponse不转换为标准格式，原样返回
+    'WRAP_MAX_BYTES': 1024 * 1024,
+}
+
+# 标准格式的顶层字段
+ENVELOPE_KEYS = ('success', 'code', 'message')
+
+
+def get_setting(name):
+    """
+    读取settings.API_RESPONSE中的配置，未配置时使用默认值
+    """
+    return getattr(settings, 'API_RESPONSE', {}).get(name, DEFAULTS[name])
+
 
 def custom_exception_handler(exc, context):
     """
@@ -72,6 +88,10 @@ class APIResponseMiddleware:
     """
     API响应中间件
     用于将Django标准响应转换为API标准响应格式
+    已是标准格式的响应带有标记属性（见common.response.mark_formatted），直接返回，不再解析；
+    未标记但手工构造了标准格式（含success、code、message）的JsonResponse同样直接返回；
+    其他JsonResponse按原始字节嵌入标准格式，不做JSON解码与重新编码；
+    超过settings.API_RESPONSE['WRAP_MAX_BYTES']的响应不做处理
     """
     
     def __init__(self, get_response):
@@ -88,8 +108,8 @@ class APIResponseMiddleware:
         if not self._should_process(request):
             return response
         
-        # 如果是已处理过的APIResponse，直接返回
-        if hasattr(response, '_apiresponse_formatted'):
+        # 如果是已处理过的响应，直接返回
+        if is_formatted(response):
             return response
             
         # 尝试格式化响应
@@ -117,37 +137,45 @@ class APIResponseMiddleware:
         :param response: 原始响应对象
         :return: 格式化后的响应
         """
-        # 如果已经是JSONResponse，尝试提取数据并重新格式化
-        if isinstance(response, JsonResponse):
-            try:
-                # 提取数据
-                content = response.content
-                data = json.loads(content)
-                
-                # 检查是否已经符合格式
-                if isinstance(data, dict) and 'success' in data and 'code' in data and 'message' in data:
-                    return response
-                
-                # 创建新的标准响应
-                std_response = APIResponse(
-                    data=data,
-                    code=response.status_code,
-                    success=200 <= response.status_code < 300,
-                    status=response.status_code
-                )
-                
-                # 标记为已处理
-                std_response._apiresponse_formatted = True
-                
-                # 复制原始响应的headers
-                for header, value in response.items():
-                    if header != 'Content-Type':  # 保留我们的Content-Type
-                        std_response[header] = value
-                
-                return std_response
-            except:
-                # 解析失败则返回原始响应
-                return response
-        
-        # 其他类型的响应暂不处理
-        return response
+        # 其他类型的响应（流式响应、文件等）不处理
+        if not isinstance(response, JsonResponse):
+            return response
+
+        # 大响应直接返回，避免复制整个响应体
+        content = response.content
+        if len(content) > get_setting('WRAP_MAX_BYTES'):
+            return response
+
+        # 手工构造的标准格式响应不再包装
+        if self._is_envelope(content):
+            return mark_formatted(response)
+
+        # 将原始JSON作为data字段嵌入标准格式
+        status_code = response.status_code
+        envelope = json.dumps({
+            "success": 200 <= status_code < 300,
+            "code": status_code,
+            "message": DEFAULT_MESSAGES.get(status_code, "未知状态"),
+        }, ensure_ascii=False)
+        meta = json.dumps({"timestamp": timezone.now().isoformat()})
+        response.content = b''.join([
+            envelope[:-1].encode('utf-8'), b', "data": ', content,
+            b', "meta": ', meta.encode('utf-8'), b'}',
+        ])
+        return mark_formatted(response)
+
+    def _is_envelope(self, content):
+        """
+        响应体是否已是标准格式；只有包含全部标准字段名的响应体才解码确认
+        :param content: 响应体字节
+        :return: bool
+        """
+        if not content.lstrip().startswith(b'{'):
+            return False
+        if not all(f'"{key}"'.encode('utf-8') in content for key in ENVELOPE_KEYS):
+            return False
+        try:
+            data = json.loads(content)
+        except ValueError:
+            return False
+        return isinstance(data, dict) and all(key in data for key in ENVELOPE_KEYS)
@@ -151,9 +151,9 @@ class BaseModel(models.Model):
     def save(self, *args, **kwargs):
         """
         重写保存方法，自动设置租户
-        如果没有指定租户，则使用当前线程的租户
+        如果没有指定租户，则使用当前上下文的租户
         """
         if not self.tenant:
-            # 如果没有指定租户，则使用当前线程的租户
+            # 如果没有指定租户，则使用当前上下文的租户
             self.tenant = get_current_tenant()
         super().save(*args, **kwargs)
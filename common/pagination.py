@@ -2,31 +2,147 @@
 分页模块
 提供自定义分页类，用于API响应中的标准分页处理
 """
-from rest_framework.pagination import PageNumberPagination, LimitOffsetPagination
+import base64
+import json
+from functools import partial
+from math import ceil
+
+from django.core.exceptions import EmptyResultSet, ImproperlyConfigured
+from django.core.paginator import Page, Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, LimitOffsetPagination
+from rest_framework.utils.urls import replace_query_param
+
+from .count_cache import count_cache
+from .exceptions import ValidationException
 from .response import APIResponse
 
 
-class StandardPagination(PageNumberPagination):
+class CountedPaginator(DjangoPaginator):
+    """
+    由调用方提供行数的分页器
+    """
+
+    def __init__(self, object_list, per_page, count_func, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_func = count_func
+
+    @cached_property
+    def count(self):
+        return self.count_func(self.object_list)
+
+
+class CountModeMixin:
+    """
+    分页总数计算方式混入类
+    通过count参数选择：estimate（执行计划估计）、exact（精确计数并更新缓存）、none（不计算）；
+    未指定时使用default_count_mode，cached表示使用计数缓存（见common.count_cache）
+    """
+    count_query_param = 'count'
+    count_modes = ('estimate', 'exact', 'none')
+    default_count_mode = 'cached'
+
+    def get_count_mode(self, request):
+        """
+        获取计数方式
+        """
+        mode = request.query_params.get(self.count_query_param)
+        if not mode:
+            return self.default_count_mode
+        if mode not in self.count_modes:
+            raise ValidationException(message=f"count参数只能为{'、'.join(self.count_modes)}")
+        return mode
+
+    def get_total(self, queryset):
+        """
+        按计数方式计算总数，不计算时返回None；非查询集（如列表）直接取长度
+        """
+        if self.count_mode == 'none':
+            return None
+        if not isinstance(queryset, QuerySet):
+            return len(queryset)
+        if self.count_mode == 'estimate':
+            return estimate_count(queryset)
+        return count_cache.count(queryset, refresh=self.count_mode == 'exact')
+
+    def get_count_parameter_schema(self):
+        return {
+            'name': self.count_query_param,
+            'required': False,
+            'in': 'query',
+            'description': '总数计算方式：estimate（估计）、exact（精确）、none（不计算）',
+            'schema': {'type': 'string', 'enum': list(self.count_modes)},
+        }
+
+
+class StandardPagination(CountModeMixin, PageNumberPagination):
     """
     标准分页类
     基于页码的分页，提供标准API响应格式
+    总数默认使用计数缓存；count=estimate或none时不执行COUNT(*)，多取一行判断是否有下一页
     """
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
-    
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        按计数方式分页
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        self.count_mode = self.get_count_mode(request)
+        if self.count_mode in ('estimate', 'none'):
+            return self.paginate_uncounted(queryset, request, page_size)
+
+        # 计数只在分页器需要时计算一次
+        self.django_paginator_class = partial(CountedPaginator, count_func=self.get_total)
+        page = super().paginate_queryset(queryset, request, view)
+        self.total = self.page.paginator.count
+        return page
+
+    def paginate_uncounted(self, queryset, request, page_size):
+        """
+        不计数的分页：多取一行判断是否有下一页
+        """
+        page_number = request.query_params.get(self.page_query_param) or 1
+        try:
+            number = int(page_number)
+            if number < 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message='页码无效'))
+
+        offset = (number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        if not rows and number > 1:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message='该页没有数据'))
+
+        # 分页器的行数只用于判断是否有下一页
+        paginator = CountedPaginator(queryset, page_size, count_func=lambda _: offset + len(rows))
+        self.page = Page(rows[:page_size], number, paginator)
+        self.total = self.get_total(queryset)
+        return list(self.page)
+
     def get_paginated_response(self, data):
         """
         重写响应方法，返回标准格式
         """
+        page_size = self.page.paginator.per_page
         return APIResponse(
             data=data,
             meta={
                 'pagination': {
                     'page': self.page.number,
-                    'page_size': self.get_page_size(self.request),
-                    'total': self.page.paginator.count,
-                    'total_pages': self.page.paginator.num_pages,
+                    'page_size': page_size,
+                    'total': self.total,
+                    'total_pages': ceil(self.total / page_size) if self.total is not None else None,
+                    'count_mode': self.count_mode,
                     'links': {
                         'next': self.get_next_link(),
                         'previous': self.get_previous_link(),
@@ -35,15 +151,43 @@ class StandardPagination(PageNumberPagination):
             }
         )
 
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [self.get_count_parameter_schema()]
 
-class StandardLimitOffsetPagination(LimitOffsetPagination):
+
+class StandardLimitOffsetPagination(CountModeMixin, LimitOffsetPagination):
     """
     基于偏移量的分页类
     提供标准API响应格式
+    总数默认使用计数缓存；count=estimate或none时不执行COUNT(*)，多取一行判断是否有下一页
     """
     default_limit = 10
     max_limit = 100
-    
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        按计数方式分页
+        """
+        self.count_mode = self.get_count_mode(request)
+        if self.count_mode not in ('estimate', 'none'):
+            rows = super().paginate_queryset(queryset, request, view)
+            self.total = getattr(self, 'count', None)
+            return rows
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        # count只用于生成下一页链接：多取到一行时表示还有下一页
+        self.count = self.offset + len(rows)
+        self.total = self.get_total(queryset)
+        return rows[:self.limit]
+
+    def get_count(self, queryset):
+        return self.get_total(queryset)
+
     def get_paginated_response(self, data):
         """
         重写响应方法，返回标准格式
@@ -54,7 +198,100 @@ class StandardLimitOffsetPagination(LimitOffsetPagination):
                 'pagination': {
                     'limit': self.limit,
                     'offset': self.offset,
-                    'total': self.count,
+                    'total': self.total,
+                    'count_mode': self.count_mode,
+                    'links': {
+                        'next': self.get_next_link(),
+                        'previous': self.get_previous_link(),
+                    }
+                }
+            }
+        )
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [self.get_count_parameter_schema()]
+
+
+def estimate_count(queryset):
+    """
+    估算查询集的行数
+    MySQL与PostgreSQL使用执行计划中的行数估计，不扫描数据；
+    其他数据库（如开发环境的SQLite）没有可用的估计，返回精确计数
+    :param queryset: 查询集
+    :return: 行数
+    """
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    if connection.vendor not in ('mysql', 'postgresql'):
+        return queryset.count()
+    try:
+        sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    except EmptyResultSet:
+        # none()或空的IN列表，不会返回任何行，也无法生成SQL
+        return 0
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(f'EXPLAIN {sql}', params)
+            columns = [column[0] for column in cursor.description]
+            row = cursor.fetchone()
+            return int(row[columns.index('rows')] or 0) if row else 0
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(CountModeMixin, BasePagination):
+    """
+    键集（游标）分页类
+    按排序键定位下一页（WHERE (排序键) > (上一页最后一行的排序键)），不使用OFFSET，
+    翻到任意深度的代价都与第一页相同，适合深度浏览与同步客户端遍历全部数据。
+    排序键取视图的keyset_ordering、查询集的排序或模型Meta.ordering，并追加主键保证唯一，
+    排序字段需不为空，并应有(tenant, 排序字段..., id)的组合索引。
+    总数默认不计算，可通过count参数选择：estimate（执行计划估计）、exact（精确计数）
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    default_count_mode = 'none'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        按游标取得一页数据
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset, view)
+        self.count_mode = self.get_count_mode(request)
+        self.total = self.get_total(queryset)
+
+        values, self.reverse = self.decode_cursor(request)
+        self.has_cursor = values is not None
+        ordering = [self.invert(field) for field in self.ordering] if self.reverse else self.ordering
+        if self.has_cursor:
+            queryset = queryset.filter(self.seek_filter(ordering, values))
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+
+        self.has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+        self.rows = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        """
+        返回标准格式
+        """
+        return APIResponse(
+            data=data,
+            meta={
+                'pagination': {
+                    'page_size': self.page_size,
+                    'total': self.total,
+                    'count_mode': self.count_mode,
                     'links': {
                         'next': self.get_next_link(),
                         'previous': self.get_previous_link(),
@@ -62,3 +299,126 @@ class StandardLimitOffsetPagination(LimitOffsetPagination):
                 }
             }
         )
+
+    def get_page_size(self, request):
+        """
+        获取每页条数，不超过max_page_size
+        """
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_ordering(self, queryset, view):
+        """
+        获取排序键，末尾追加主键
+        """
+        ordering = getattr(view, 'keyset_ordering', None) or queryset.query.order_by or queryset.model._meta.ordering
+        ordering = list(ordering)
+        if not all(isinstance(field, str) for field in ordering):
+            raise ImproperlyConfigured('KeysetPagination只支持按字段名排序')
+        pk_name = queryset.model._meta.pk.name
+        if not any(field.lstrip('-') in ('pk', pk_name) for field in ordering):
+            # 主键方向与最后一个排序字段一致，便于使用同一个组合索引
+            descending = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append(f'-{pk_name}' if descending else pk_name)
+        self.fields = [queryset.model._meta.get_field(field.lstrip('-')) for field in ordering]
+        return ordering
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def seek_filter(self, ordering, values):
+        """
+        构建定位条件：(a, b, id) 在排序方向上位于values之后
+        展开为 a > va OR (a = va AND b < vb) OR (a = va AND b = vb AND id > vid)，
+        各字段按自身方向比较，支持混合升降序
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def encode_cursor(self, obj, reverse):
+        """
+        将一行的排序键编码为游标
+        """
+        values = [field.value_to_string(obj) for field in self.fields]
+        payload = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        """
+        解析游标
+        :return: (排序键值列表, 是否向前翻页)，没有游标时返回(None, False)
+        """
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            values = payload['v']
+            if len(values) != len(self.fields):
+                raise ValueError('排序键数量不匹配')
+            values = [field.to_python(value) for field, value in zip(self.fields, values)]
+            return values, bool(payload.get('r'))
+        except Exception:
+            raise ValidationException(message="无效的分页游标")
+
+    def get_next_link(self):
+        """
+        下一页链接：向后翻页时还有更多数据，或向前翻到的页面之后总有数据
+        """
+        if not self.rows or not (self.reverse or self.has_more):
+            return None
+        return self.encode_cursor(self.rows[-1], reverse=False)
+
+    def get_previous_link(self):
+        """
+        上一页链接：向前翻页时还有更多数据，或从游标向后翻到的页面之前总有数据
+        """
+        if self.reverse and not self.has_more:
+            return None
+        if not self.reverse and not self.has_cursor:
+            return None
+        if not self.rows:
+            return None
+        return self.encode_cursor(self.rows[0], reverse=True)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'success': {'type': 'boolean'},
+                'code': {'type': 'integer'},
+                'message': {'type': 'string'},
+                'data': schema,
+                'meta': {'type': 'object'},
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': '分页游标，取自上一次响应的links',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'每页条数，最大{self.max_page_size}',
+                'schema': {'type': 'integer'},
+            },
+            self.get_count_parameter_schema(),
+        ]
@@ -0,0 +1,36 @@
+"""
+解析器模块
+基于orjson的JSON解析器，未安装orjson时回退到DRF的JSONParser
+"""
+import codecs
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer, orjson
+
+
+class FastJSONParser(JSONParser):
+    """
+    使用orjson的JSON解析器
+    orjson只接受UTF-8，请求使用其他编码或未安装orjson时使用JSONParser
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.is_utf8(encoding):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+    @staticmethod
+    def is_utf8(encoding):
+        try:
+            return codecs.lookup(encoding).name == 'utf-8'
+        except LookupError:
+            return False
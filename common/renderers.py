@@ -0,0 +1,45 @@
+"""
+渲染器模块
+基于orjson的JSON渲染器，未安装orjson时回退到DRF的JSONRenderer
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson为可选依赖
+    orjson = None
+
+
+def orjson_default(obj):
+    """
+    orjson无法直接序列化的类型（Decimal、集合、惰性翻译字符串等）
+    按DRF JSONEncoder处理，带to_dict方法的对象与CustomJSONEncoder一致
+    """
+    if hasattr(obj, 'to_dict') and callable(obj.to_dict):
+        return obj.to_dict()
+    return JSONRenderer.encoder_class().default(obj)
+
+
+# UTC时间以Z结尾，与DRF JSONEncoder的输出一致；允许非字符串键
+ORJSON_OPTIONS = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    使用orjson的JSON渲染器
+    输出与JSONRenderer一致（紧凑格式、UTF-8、转义U+2028/U+2029），
+    请求缩进输出（如可浏览API）或未安装orjson时使用JSONRenderer
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=orjson_default, option=ORJSON_OPTIONS)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -9,6 +9,39 @@ import traceback
 import sys
 
 
+# 已是标准格式的响应带有该属性，APIResponseMiddleware据此直接返回，不再解析响应体
+FORMATTED_MARKER = '_apiresponse_formatted'
+
+# 状态码对应的默认消息
+DEFAULT_MESSAGES = {
+    200: "成功",
+    201: "创建成功",
+    204: "删除成功",
+    400: "请求错误",
+    401: "未授权",
+    403: "禁止访问",
+    404: "资源不存在",
+    500: "服务器内部错误"
+}
+
+
+def mark_formatted(response):
+    """
+    标记响应已是标准格式，用于自行构建标准格式的JsonResponse等响应
+    :param response: 响应对象
+    :return: 同一响应对象
+    """
+    setattr(response, FORMATTED_MARKER, True)
+    return response
+
+
+def is_formatted(response):
+    """
+    判断响应是否已标记为标准格式
+    """
+    return getattr(response, FORMATTED_MARKER, False)
+
+
 class APIResponse(Response):
     """
     自定义API响应类，统一API返回格式
@@ -20,6 +53,8 @@ class APIResponse(Response):
         "meta": {...}
     }
     """
+    _apiresponse_formatted = True
+
     def __init__(self, data=None, code=None, message="", 
                  success=None, status=None, headers=None, 
                  meta=None, exception=False, exception_obj=None, **kwargs):
@@ -65,17 +100,7 @@ class APIResponse(Response):
     
     def _get_default_message(self, code):
         """根据状态码获取默认消息"""
-        messages = {
-            200: "成功",
-            201: "创建成功",
-            204: "删除成功",
-            400: "请求错误",
-            401: "未授权",
-            403: "禁止访问",
-            404: "资源不存在",
-            500: "服务器内部错误"
-        }
-        return messages.get(code, "未知状态")
+        return DEFAULT_MESSAGES.get(code, "未知状态")
 
 
 def success_response(data=None, message=None, **kwargs):
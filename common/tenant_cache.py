@@ -0,0 +1,150 @@
+"""
+租户缓存模块
+按租户ID在进程内缓存Tenant对象，请求认证时根据令牌中的tenant_id取得租户，
+租户状态检查（暂停、删除）同样由缓存提供，不再按请求查询租户表。
+
+缓存失效通过按租户的版本号实现：Tenant保存或删除时递增版本号，
+缓存条目记录写入时的版本号，版本号不一致的条目视为失效。
+配置了共享层时版本号保存在共享层，各进程立即可见；
+只有进程内版本号时，其他进程最多在LOCAL_TTL秒后失效
+"""
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Tenant
+
+logger = logging.getLogger('django')
+
+DEFAULTS = {
+    # 进程内条目有效期（秒）
+    'LOCAL_TTL': 60,
+    # 进程内最多保存的租户数
+    'LOCAL_MAX_ENTRIES': 1000,
+    # 保存版本号的缓存别名（settings.CACHES中的键），为None时版本号只保存在进程内
+    'SHARED_ALIAS': None,
+}
+
+KEY_PREFIX = 'tenant'
+
+
+def get_setting(name):
+    """
+    读取settings.TENANT_CACHE中的配置，未配置时使用默认值
+    """
+    return getattr(settings, 'TENANT_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def is_tenant_active(tenant):
+    """
+    判断租户是否可用，暂停或已删除的租户不可用
+    """
+    return tenant.status == 'active' and not tenant.is_deleted
+
+
+class TenantCache:
+    """
+    进程内的租户缓存
+    用法：
+        tenant = tenant_cache.get(tenant_id)
+        tenant_cache.invalidate(tenant_id)
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        """
+        保存版本号的共享缓存，未配置时为None
+        """
+        alias = get_setting('SHARED_ALIAS')
+        return caches[alias] if alias else None
+
+    def _version_key(self, tenant_id):
+        return f'{KEY_PREFIX}:version:{tenant_id}'
+
+    def get_version(self, tenant_id):
+        """
+        获取租户当前的版本号
+        """
+        shared = self.shared
+        if shared is not None:
+            return shared.get(self._version_key(tenant_id), 0)
+        with self._lock:
+            return self._versions.get(tenant_id, 0)
+
+    def get(self, tenant_id):
+        """
+        按ID获取租户
+        :param tenant_id: 租户ID，为空时返回None
+        :return: Tenant实例的副本，调用方修改后不影响缓存；租户不存在时返回None
+        """
+        if not tenant_id:
+            return None
+        # 查询数据库之前读取版本号，查询期间租户被修改时缓存条目随即失效
+        version = self.get_version(tenant_id)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(tenant_id)
+            if cached is not None:
+                tenant, cached_version, cached_at = cached
+                if cached_version == version and now - cached_at < get_setting('LOCAL_TTL'):
+                    self._entries.move_to_end(tenant_id)
+                    return copy.copy(tenant)
+                del self._entries[tenant_id]
+
+        tenant = Tenant.objects.filter(pk=tenant_id).first()
+        if tenant is None:
+            return None
+        with self._lock:
+            self._entries[tenant_id] = (tenant, version, now)
+            while len(self._entries) > get_setting('LOCAL_MAX_ENTRIES'):
+                self._entries.popitem(last=False)
+        return copy.copy(tenant)
+
+    def invalidate(self, tenant_id):
+        """
+        递增租户的版本号，使各进程缓存的该租户失效
+        """
+        shared = self.shared
+        if shared is not None:
+            key = self._version_key(tenant_id)
+            # 版本号不设过期时间，过期后回到0可能与旧条目的版本号重合
+            if not shared.add(key, 1, None):
+                try:
+                    shared.incr(key)
+                except ValueError:
+                    shared.set(key, 1, None)
+        with self._lock:
+            self._versions[tenant_id] = self._versions.get(tenant_id, 0) + 1
+            self._entries.pop(tenant_id, None)
+
+    def clear(self):
+        """
+        清空进程内缓存，用于测试
+        """
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+
+tenant_cache = TenantCache()
+
+
+@receiver(post_save, sender=Tenant, dispatch_uid='tenant_cache_invalidate_on_save')
+@receiver(post_delete, sender=Tenant, dispatch_uid='tenant_cache_invalidate_on_delete')
+def invalidate_tenant_cache(sender, instance, **kwargs):
+    """
+    租户保存（包括状态变更）或删除后使缓存失效
+    """
+    tenant_cache.invalidate(instance.pk)
@@ -1,62 +1,115 @@
 """
 租户中间件模块
 提供租户上下文管理和请求处理中间件
+租户上下文保存在contextvars中：同步请求按线程隔离，ASGI下同一线程上的多个协程也互相隔离，
+sync_to_async/async_to_sync会把上下文带到执行线程
 """
-import threading
-from django.utils.deprecation import MiddlewareMixin
+from contextlib import contextmanager
+from contextvars import ContextVar
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 
-# 线程本地存储，用于存储当前请求的租户信息
-_thread_local = threading.local()
+
+# 当前请求（或任务）的租户
+_current_tenant = ContextVar('current_tenant', default=None)
 
 
 def get_current_tenant():
     """
-    获取当前线程的租户
+    获取当前上下文的租户
     :return: Tenant实例或None
     """
-    return getattr(_thread_local, 'tenant', None)
+    return _current_tenant.get()
 
 
 def set_current_tenant(tenant):
     """
-    设置当前线程的租户
+    设置当前上下文的租户
     :param tenant: Tenant实例
+    :return: 可传给reset_current_tenant恢复之前租户的标记
+    """
+    return _current_tenant.set(tenant)
+
+
+def reset_current_tenant(token):
+    """
+    恢复set_current_tenant之前的租户
+    :param token: set_current_tenant的返回值
     """
-    _thread_local.tenant = tenant
+    _current_tenant.reset(token)
 
 
 def clear_current_tenant():
     """
-    清除当前线程的租户
+    清除当前上下文的租户
+    """
+    _current_tenant.set(None)
+
+
+@contextmanager
+def tenant_context(tenant):
+    """
+    在指定租户的上下文中执行，退出时恢复之前的租户
+    用法：
+        with tenant_context(tenant):
+            Product.objects.all()
     """
-    if hasattr(_thread_local, 'tenant'):
-        del _thread_local.tenant
+    token = set_current_tenant(tenant)
+    try:
+        yield tenant
+    finally:
+        reset_current_tenant(token)
 
 
-class TenantMiddleware(MiddlewareMixin):
+class TenantMiddleware:
     """
     租户中间件
-    负责从请求中提取租户信息并设置到线程本地存储
+    负责从请求中提取租户信息并设置到租户上下文，同时支持同步与异步请求处理
     """
-    
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with tenant_context(self.get_request_tenant(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        # 读取用户与租户可能查询数据库，放到线程中执行
+        tenant = await sync_to_async(self.get_request_tenant)(request)
+        with tenant_context(tenant):
+            return await self.get_response(request)
+
+    def get_request_tenant(self, request):
+        """
+        获取请求的租户
+        :param request: HttpRequest实例
+        :return: 已认证用户所属的Tenant实例（来自租户缓存），未认证时返回None；
+                 JWT认证在视图中进行，由JWTAuthentication设置租户上下文
+        """
+        # common.models导入本模块，租户缓存在此处导入以避免循环导入
+        from .tenant_cache import tenant_cache
+
+        user = getattr(request, 'user', None)
+        if user and user.is_authenticated:
+            return tenant_cache.get(user.tenant_id)
+        return None
+
     def process_request(self, request):
         """
         处理请求，设置当前租户
+        供直接调用中间件的场景使用，请求处理链中由__call__管理上下文
         :param request: HttpRequest实例
         """
-        # 清除之前的租户信息
-        clear_current_tenant()
-        
-        # 获取当前用户
-        user = request.user
-        
-        # 如果用户已认证，设置其所属租户
-        if user and user.is_authenticated:
-            set_current_tenant(user.tenant)
-            
+        set_current_tenant(self.get_request_tenant(request))
         return None
-    
+
     def process_response(self, request, response):
         """
         处理响应，清除租户信息
@@ -64,12 +117,10 @@ class TenantMiddleware(MiddlewareMixin):
         :param response: HttpResponse实例
         :return: HttpResponse实例
         """
-        # 清除租户信息
         clear_current_tenant()
-        
         return response
-    
-    
+
+
 class TenantQuerySetMixin:
     """
     租户查询集混入类
@@ -58,14 +58,15 @@ class ExportTemplateAdmin(admin.ModelAdmin):
 
 @admin.register(ExportHistory)
 class ExportHistoryAdmin(admin.ModelAdmin):
-    list_display = ('file_name', 'user', 'export_list', 'template', 'product_count', 'variation_count', 'created_at')
-    list_filter = ('created_at',)
+    list_display = ('file_name', 'user', 'export_list', 'template', 'status', 'product_count', 'variation_count', 'created_at')
+    list_filter = ('status', 'created_at')
     search_fields = ('file_name', 'user__username', 'export_list__name')
     raw_id_fields = ('user', 'export_list', 'template')
-    readonly_fields = ('created_at',)
+    readonly_fields = ('artifact_key', 'created_at')
     fieldsets = (
         (None, {'fields': ('user', 'export_list', 'template')}),
-        ('文件信息', {'fields': ('file_name', 'file_path')}),
-        ('数据统计', {'fields': ('product_count', 'variation_count')}),
+        ('文件信息', {'fields': ('file_name', 'file_path', 'artifact_key')}),
+        ('数据统计', {'fields': ('status', 'product_count', 'variation_count')}),
+        ('错误日志', {'fields': ('error_log',), 'classes': ('collapse',)}),
         ('时间信息', {'fields': ('created_at',), 'classes': ('collapse',)}),
     )
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ExportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'exports'
+
+    def ready(self):
+        # 注册导出文件内容版本的信号处理
+        from . import artifacts  # noqa: F401
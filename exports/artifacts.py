@@ -0,0 +1,246 @@
+"""
+导出文件缓存模块
+按内容寻址保存已生成的导出文件：键由清单内容、导出模板以及清单中产品与变体的最后修改时间计算，
+内容没有变化时直接复用已生成的文件，不再重新查询与生成。
+分类、标签、属性改名以及多对多关系、图片、变体属性的变更不修改产品的更新时间，
+键中另外包含租户分类、标签、属性与属性值的最后修改时间，以及由products应用的信号在事务提交后递增的租户内容版本。
+可同时保存gzip压缩副本，下载时按请求的Accept-Encoding返回
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from common.models import Tenant
+from products.models import Attribute, AttributeValue, Category, Tag
+
+from .models import ExportContentVersion
+
+logger = logging.getLogger('django')
+
+# 导出格式变化时递增，使已生成的文件全部失效
+ARTIFACT_VERSION = 1
+
+DEFAULTS = {
+    # 存放目录（相对MEDIA_ROOT）
+    'DIR': os.path.join('exports', 'artifacts'),
+    # 是否同时保存gzip压缩副本
+    'COMPRESS': True,
+}
+
+# 当前线程中待递增内容版本的租户ID
+_pending = threading.local()
+
+# 名称会写入导出文件的关联模型
+LABEL_MODELS = (Category, Tag, Attribute, AttributeValue)
+
+ACCEPT_ENCODING_PATTERN = re.compile(r'^\s*([^\s;]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+def get_setting(name):
+    """
+    读取settings.EXPORT_ARTIFACTS中的配置，未配置时使用默认值
+    """
+    return getattr(settings, 'EXPORT_ARTIFACTS', {}).get(name, DEFAULTS[name])
+
+
+def content_version(tenant_id):
+    """
+    租户产品数据的内容版本，没有记录时为0
+    """
+    version = ExportContentVersion.objects.filter(tenant_id=tenant_id).values_list('version', flat=True).first()
+    return version or 0
+
+
+def bump_content_version(tenant_id):
+    """
+    递增租户的内容版本，没有记录时创建
+    """
+    versions = ExportContentVersion.objects.filter(tenant_id=tenant_id)
+    if versions.update(version=F('version') + 1):
+        return
+    if tenant_id is not None and not Tenant.objects.filter(pk=tenant_id).exists():
+        # 租户在回滚的事务中创建或已被删除
+        return
+    _, created = ExportContentVersion.objects.get_or_create(tenant_id=tenant_id, defaults={'version': 1})
+    if not created:
+        # 并发创建时由另一方先创建了记录
+        versions.update(version=F('version') + 1)
+
+
+def bump_pending():
+    """
+    递增待处理租户的内容版本
+    """
+    tenant_ids = getattr(_pending, 'tenant_ids', None)
+    if not tenant_ids:
+        return
+    _pending.tenant_ids = set()
+    for tenant_id in tenant_ids:
+        bump_content_version(tenant_id)
+
+
+def mark_pending(tenant_id):
+    """
+    记录待递增内容版本的租户，在事务提交后合并处理；
+    提交前生成的键仍使用旧版本；事务回滚时留下的租户在下次提交后一并处理，只会多递增一次
+    """
+    _pending.__dict__.setdefault('tenant_ids', set()).add(tenant_id)
+    # 每次都登记回调，第一个执行的回调处理全部记录，其余的直接返回
+    transaction.on_commit(bump_pending)
+
+
+@receiver(post_save, dispatch_uid='export_artifacts_version_on_save')
+@receiver(post_delete, dispatch_uid='export_artifacts_version_on_delete')
+@receiver(m2m_changed, dispatch_uid='export_artifacts_version_on_m2m')
+def bump_version_on_change(sender, instance, raw=False, action=None, **kwargs):
+    """
+    products应用的模型或多对多关系变更的事务提交后递增租户的内容版本
+    """
+    if raw or sender._meta.app_label != 'products':
+        return
+    if action is not None and not action.startswith('post_'):
+        return
+    mark_pending(getattr(instance, 'tenant_id', None))
+
+
+def artifact_key(export_list, template=None):
+    """
+    计算导出文件的内容键
+    清单项增删、模板修改、清单中产品或变体（含变体的父产品）被修改，
+    租户的分类、标签、属性被修改以及产品的关联数据变更时键随之变化
+    :param export_list: ExportList实例
+    :param template: ExportTemplate实例
+    :return: 64位十六进制字符串
+    """
+    digest = hashlib.sha256(f'v{ARTIFACT_VERSION}\n'.encode())
+    if template is not None:
+        fields = json.dumps(template.fields, sort_keys=True, ensure_ascii=False)
+        digest.update(f'template:{template.pk}:{fields}\n'.encode())
+
+    items = export_list.items.order_by('id').values_list('product_id', 'variation_id')
+    for product_id, variation_id in items.iterator(chunk_size=2000):
+        digest.update(f'{product_id},{variation_id}\n'.encode())
+
+    latest = export_list.items.aggregate(
+        product_updated=Max('product__updated_at'),
+        variation_updated=Max('variation__updated_at'),
+        parent_updated=Max('variation__product__updated_at'),
+    )
+    tenant_id = export_list.user.tenant_id
+    for model in LABEL_MODELS:
+        latest[model._meta.model_name] = model.original_objects.filter(tenant_id=tenant_id).aggregate(
+            updated=Max('updated_at')
+        )['updated']
+    for name, value in sorted(latest.items()):
+        digest.update(f'{name}:{value.isoformat() if value else ""}\n'.encode())
+    digest.update(f'content:{content_version(tenant_id)}\n'.encode())
+    return digest.hexdigest()
+
+
+def accepts_gzip(accept_encoding):
+    """
+    判断Accept-Encoding请求头是否接受gzip（q=0表示拒绝）
+    """
+    for part in (accept_encoding or '').split(','):
+        match = ACCEPT_ENCODING_PATTERN.match(part)
+        if not match or match.group(1).lower() not in ('gzip', '*'):
+            continue
+        try:
+            return float(match.group(2) or 1) > 0
+        except ValueError:
+            return False
+    return False
+
+
+class ArtifactStore:
+    """
+    导出文件存储
+    文件先写入临时文件，完整生成后再原子替换为正式文件名，读取方不会看到写了一半的文件
+    用法：
+        store = ArtifactStore()
+        path = store.get(key) or ...
+        for chunk in store.write(key, stream): ...
+    """
+
+    def __init__(self, root=None, compress=None):
+        """
+        :param root: 存放目录，默认MEDIA_ROOT下的EXPORT_ARTIFACTS['DIR']
+        :param compress: 是否保存gzip副本，默认EXPORT_ARTIFACTS['COMPRESS']
+        """
+        self.root = root or os.path.join(settings.MEDIA_ROOT, get_setting('DIR'))
+        self.compress = get_setting('COMPRESS') if compress is None else compress
+
+    def path(self, key, compressed=False):
+        """
+        导出文件路径，按键的前两位分目录
+        """
+        return os.path.join(self.root, key[:2], f'{key}.csv.gz' if compressed else f'{key}.csv')
+
+    def get(self, key, compressed=False):
+        """
+        获取已生成的文件路径
+        :return: 文件路径，不存在时返回None
+        """
+        path = self.path(key, compressed)
+        return path if os.path.exists(path) else None
+
+    def write(self, key, chunks):
+        """
+        边转发边写入导出内容
+        调用方完整迭代后文件才会生效；中途停止迭代（如客户端断开）时删除临时文件
+        :param key: 内容键
+        :param chunks: 生成CSV文本块的可迭代对象
+        :return: 原样生成chunks中的文本块
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        suffix = f'.{uuid.uuid4().hex}.tmp'
+        temp_paths = [path + suffix]
+        plain = open(temp_paths[0], 'w', newline='', encoding='utf-8')
+        compressed = None
+        if self.compress:
+            temp_paths.append(self.path(key, compressed=True) + suffix)
+            compressed = gzip.open(temp_paths[1], 'wt', newline='', encoding='utf-8')
+
+        completed = False
+        try:
+            for chunk in chunks:
+                plain.write(chunk)
+                if compressed is not None:
+                    compressed.write(chunk)
+                yield chunk
+            completed = True
+        finally:
+            plain.close()
+            if compressed is not None:
+                compressed.close()
+            if completed:
+                # 先替换压缩副本，正式文件出现时压缩副本已就绪
+                if compressed is not None:
+                    os.replace(temp_paths[1], self.path(key, compressed=True))
+                os.replace(temp_paths[0], path)
+            else:
+                for temp_path in temp_paths:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                logger.info(f"导出文件未完整生成，已丢弃: {key}")
+
+    def save(self, key, chunks):
+        """
+        完整写入导出内容
+        :return: 文件路径
+        """
+        for _ in self.write(key, chunks):
+            pass
+        return self.path(key)
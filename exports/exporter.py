@@ -0,0 +1,203 @@
+"""
+WooCommerce CSV导出模块
+将导出清单中的产品与变体转换为WooCommerce产品CSV行。
+清单项以iterator分块读取并逐块生成CSV文本，可直接作为StreamingHttpResponse的内容，
+也可写入导出文件，内存占用与清单大小无关
+"""
+import csv
+import logging
+import os
+from itertools import islice
+
+from django.db.models import Count, F
+
+from products.models import ProductAttribute, VariationAttribute
+from .artifacts import ArtifactStore, artifact_key
+from .loader import ExportDataLoader
+from .projection import compile_columns, default_columns, parse_template_columns
+from .models import ExportHistory
+
+logger = logging.getLogger('django')
+
+# 每次从数据库读取的清单项数量
+EXPORT_CHUNK_SIZE = 500
+
+# 输出缓冲大小，累积到该长度再生成一个文本块，避免逐行输出过多小块
+STREAM_BUFFER_SIZE = 64 * 1024
+
+
+def get_attribute_count(export_list):
+    """
+    计算导出清单需要的属性列组数，至少保留WooCommerce默认的2组
+    """
+    counts = [
+        ProductAttribute.original_objects.filter(
+            product__in=export_list.items.filter(product__isnull=False).values('product')
+        ).values('product').annotate(n=Count('id')).order_by('-n').values_list('n', flat=True).first(),
+        VariationAttribute.original_objects.filter(
+            variation__in=export_list.items.filter(variation__isnull=False).values('variation')
+        ).values('variation').annotate(n=Count('id')).order_by('-n').values_list('n', flat=True).first(),
+    ]
+    return max([2] + [n for n in counts if n])
+
+
+def iter_export_items(export_list, projection, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    按导入所需顺序遍历清单项：产品在前，变体在后，保证导入时父产品先于变体写入
+    只读取投影需要的字段，使用iterator分块读取，不缓存整个查询集
+    :param projection: ExportProjection实例
+    """
+    # export_list由关联管理器回填，需一并读取外键列，否则每行都会补查一次
+    return export_list.items.select_related(*projection.item_relations).only(
+        'export_list', *projection.item_fields
+    ).order_by(F('variation').asc(nulls_first=True), 'id').iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """
+    csv.writer使用的伪文件对象，直接返回写入的内容
+    """
+
+    def write(self, value):
+        return value
+
+
+class WooCommerceCSVStream:
+    """
+    WooCommerce CSV文本流
+    迭代时先生成带BOM的表头，再逐块生成数据行；
+    迭代过程中累计product_count与variation_count
+    用法：StreamingHttpResponse(WooCommerceCSVStream(export_list), content_type='text/csv')
+    """
+
+    def __init__(self, export_list, template=None, chunk_size=EXPORT_CHUNK_SIZE):
+        """
+        :param export_list: ExportList实例
+        :param template: ExportTemplate实例，为None或未配置列时导出全部WooCommerce列
+        :param chunk_size: 每次从数据库读取并批量预取关联数据的清单项数量
+        :raises ValueError: 模板的列配置不正确
+        """
+        self.export_list = export_list
+        self.chunk_size = chunk_size
+        columns = parse_template_columns(template.fields) if template is not None else ()
+        self.projection = compile_columns(columns or default_columns(get_attribute_count(export_list)))
+        self.loader = ExportDataLoader(export_list.user.tenant)
+        self.product_count = 0
+        self.variation_count = 0
+
+    def iter_rows(self):
+        """
+        逐块读取清单项并预取关联数据，每块的查询次数固定
+        :return: 生成按投影列顺序排列的值列表
+        """
+        projection = self.projection
+        items = iter_export_items(self.export_list, projection, self.chunk_size)
+        while True:
+            chunk = list(islice(items, self.chunk_size))
+            if not chunk:
+                return
+            self.loader.load(
+                products=[item.product for item in chunk if not item.variation_id],
+                variations=[item.variation for item in chunk if item.variation_id],
+                product_plans=projection.product_plans,
+                variation_plans=projection.variation_plans,
+            )
+            for item in chunk:
+                if item.variation_id:
+                    self.variation_count += 1
+                    yield projection.variation_row(item.variation, self.loader)
+                else:
+                    self.product_count += 1
+                    yield projection.product_row(item.product, self.loader)
+
+    def __iter__(self):
+        writer = csv.writer(_Echo())
+        # 带BOM便于Excel正确识别中文
+        yield '\ufeff' + writer.writerow(self.projection.headers)
+
+        buffer, size = [], 0
+        for row in self.iter_rows():
+            line = writer.writerow(row)
+            buffer.append(line)
+            size += len(line)
+            if size >= STREAM_BUFFER_SIZE:
+                yield ''.join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield ''.join(buffer)
+
+
+class WooCommerceExporter:
+    """
+    WooCommerce CSV导出器
+    用法：WooCommerceExporter(history).run()
+    """
+
+    def __init__(self, history):
+        """
+        :param history: ExportHistory实例，需关联导出清单
+        """
+        self.history = history
+
+    def run(self):
+        """
+        生成导出文件，并维护导出历史的状态
+        未指定file_path时按内容键保存到导出文件缓存，内容未变化时复用已生成的文件
+        :return: 刷新后的ExportHistory实例
+        """
+        history = self.history
+        self.set_status('processing')
+        try:
+            if history.file_path:
+                os.makedirs(os.path.dirname(history.file_path), exist_ok=True)
+                updates = dict(file_path=history.file_path, **self.write(history.file_path))
+            else:
+                updates = self.write_artifact()
+        except Exception as e:
+            logger.exception(f"导出失败: {history.file_name}")
+            self.set_status('failed', error=f"导出失败: {e}\n")
+            raise
+        ExportHistory.objects.filter(pk=history.pk).update(**updates)
+        self.set_status('completed')
+        return self.history
+
+    def write(self, file_path):
+        """
+        写入CSV文件
+        :return: {'product_count': 产品行数, 'variation_count': 变体行数}
+        """
+        stream = WooCommerceCSVStream(self.history.export_list, template=self.history.template)
+        with open(file_path, 'w', newline='', encoding='utf-8') as f:
+            for chunk in stream:
+                f.write(chunk)
+        return {'product_count': stream.product_count, 'variation_count': stream.variation_count}
+
+    def write_artifact(self):
+        """
+        写入导出文件缓存，已有相同内容键的完成记录且文件仍在时直接复用
+        :return: ExportHistory需要更新的字段
+        """
+        history = self.history
+        store = ArtifactStore()
+        key = artifact_key(history.export_list, history.template)
+        previous = ExportHistory.objects.filter(artifact_key=key, status='completed').exclude(
+            pk=history.pk
+        ).order_by('-id').first()
+        if previous is not None and store.get(key):
+            logger.info(f"导出内容未变化，复用已生成的文件: {key}")
+            counts = {'product_count': previous.product_count, 'variation_count': previous.variation_count}
+        else:
+            stream = WooCommerceCSVStream(history.export_list, template=history.template)
+            store.save(key, stream)
+            counts = {'product_count': stream.product_count, 'variation_count': stream.variation_count}
+        return dict(file_path=store.path(key), artifact_key=key, **counts)
+
+    def set_status(self, status, error=None):
+        """
+        更新导出状态
+        """
+        updates = {'status': status}
+        if error:
+            updates['error_log'] = error
+        ExportHistory.objects.filter(pk=self.history.pk).update(**updates)
+        self.history.refresh_from_db()
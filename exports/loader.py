@@ -0,0 +1,130 @@
+"""
+导出数据加载模块
+按预先规划的Prefetch为一批产品和变体一次性加载导出行需要的关联数据，
+查询次数固定，与批次中的行数无关。预取计划按名称登记，导出列只声明自己需要的计划
+"""
+from django.db.models import Prefetch, prefetch_related_objects
+
+from products import woocommerce as wc
+from products.models import (
+    Category, Product, ProductAttribute, ProductImage, ProductVariation, Tag, VariationAttribute,
+)
+
+
+# 产品行的预取计划：分类、标签、图片、关联产品、产品属性（含变体上实际使用的属性值）
+PRODUCT_PREFETCHES = {
+    'categories': (Prefetch('categories', queryset=Category.objects.only('id')),),
+    'tags': (Prefetch('tags', queryset=Tag.original_objects.only('id', 'name')),),
+    'images': (
+        Prefetch('images', queryset=ProductImage.original_objects.only('id', 'product_id', 'image_url', 'order')),
+    ),
+    'upsells': (Prefetch('upsell_products', queryset=Product.original_objects.only('id', 'sku')),),
+    'cross_sells': (Prefetch('cross_sell_products', queryset=Product.original_objects.only('id', 'sku')),),
+    'attributes': (
+        Prefetch(
+            'product_attributes',
+            queryset=ProductAttribute.original_objects.select_related('attribute').only(
+                'id', 'product_id', 'attribute__name'
+            ).order_by('id'),
+        ),
+        Prefetch(
+            'variations',
+            queryset=ProductVariation.original_objects.only('id', 'product_id'),
+            to_attr='export_variations',
+        ),
+        Prefetch(
+            'export_variations__attributes',
+            queryset=VariationAttribute.original_objects.select_related('value').only(
+                'id', 'variation_id', 'attribute_id', 'value__name', 'value__sort_order'
+            ).order_by('value__sort_order', 'value_id'),
+        ),
+    ),
+}
+
+# 变体行的预取计划：变体自身的属性及属性值
+VARIATION_PREFETCHES = {
+    'attributes': (
+        Prefetch(
+            'attributes',
+            queryset=VariationAttribute.original_objects.select_related('attribute', 'value').only(
+                'id', 'variation_id', 'attribute__name', 'value__name'
+            ).order_by('id'),
+        ),
+    ),
+}
+
+
+class ExportDataLoader:
+    """
+    导出数据加载器
+    首次加载时一次查询构建租户的分类路径映射，之后每个批次的查询次数固定
+    用法：
+        loader = ExportDataLoader(tenant)
+        loader.load(products, variations)
+        loader.category_paths(product)
+    """
+
+    def __init__(self, tenant):
+        """
+        :param tenant: Tenant实例，为None时加载全部分类（超级管理员）
+        """
+        self.tenant = tenant
+        self._category_paths = None
+
+    def load(self, products=(), variations=(), product_plans=tuple(PRODUCT_PREFETCHES),
+             variation_plans=tuple(VARIATION_PREFETCHES)):
+        """
+        为一批产品和变体预取关联数据
+        :param products: Product实例列表
+        :param variations: ProductVariation实例列表
+        :param product_plans: 需要执行的产品预取计划名称，默认全部
+        :param variation_plans: 需要执行的变体预取计划名称，默认全部
+        """
+        if 'categories' in product_plans and self._category_paths is None:
+            queryset = Category.objects.all()
+            if self.tenant is not None:
+                queryset = queryset.filter(tenant=self.tenant)
+            self._category_paths = wc.build_category_paths(queryset.values_list('id', 'parent_id', 'name'))
+        if products:
+            prefetch_related_objects(
+                list(products), *(prefetch for name in product_plans for prefetch in PRODUCT_PREFETCHES[name])
+            )
+        if variations:
+            prefetch_related_objects(
+                list(variations), *(prefetch for name in variation_plans for prefetch in VARIATION_PREFETCHES[name])
+            )
+
+    def category_paths(self, product):
+        """
+        获取产品分类的完整路径列表，依赖load预取的分类
+        """
+        return [self._category_paths[category.id] for category in product.categories.all()]
+
+    def product_attributes(self, product):
+        """
+        获取产品属性及其在变体中使用的属性值，依赖load预取的数据
+        结果缓存在实例上，多个属性列共用
+        :return: [(属性名, [属性值, ...]), ...]
+        """
+        if hasattr(product, '_export_attributes'):
+            return product._export_attributes
+        values = {}
+        for variation in product.export_variations:
+            for variation_attribute in variation.attributes.all():
+                names = values.setdefault(variation_attribute.attribute_id, [])
+                if variation_attribute.value.name not in names:
+                    names.append(variation_attribute.value.name)
+        product._export_attributes = [
+            (product_attribute.attribute.name, values.get(product_attribute.attribute_id, []))
+            for product_attribute in product.product_attributes.all()
+        ]
+        return product._export_attributes
+
+    def variation_attributes(self, variation):
+        """
+        获取变体的属性值，依赖load预取的数据
+        :return: [(属性名, [属性值]), ...]
+        """
+        if not hasattr(variation, '_export_attributes'):
+            variation._export_attributes = [(va.attribute.name, [va.value.name]) for va in variation.attributes.all()]
+        return variation._export_attributes
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:13
+
+from django.db import migrations, models
+
+STATUS_CHOICES = [('pending', '待处理'), ('processing', '处理中'), ('completed', '已完成'), ('failed', '失败')]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exports', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exporthistory',
+            name='error_log',
+            field=models.TextField(blank=True),
+        ),
+        # 已有的导出记录都是同步生成的，添加字段时以completed填充
+        migrations.AddField(
+            model_name='exporthistory',
+            name='status',
+            field=models.CharField(choices=STATUS_CHOICES, default='completed', max_length=20),
+        ),
+        # 之后新建的记录默认为pending
+        migrations.AlterField(
+            model_name='exporthistory',
+            name='status',
+            field=models.CharField(choices=STATUS_CHOICES, default='pending', max_length=20),
+        ),
+    ]
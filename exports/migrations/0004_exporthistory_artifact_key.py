@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exports', '0003_exporthistory_error_log_exporthistory_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exporthistory',
+            name='artifact_key',
+            field=models.CharField(blank=True, db_index=True, help_text='导出文件内容键', max_length=64),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0003_tenant_is_deleted'),
+        ('exports', '0004_exporthistory_artifact_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportContentVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='common.tenant')),
+            ],
+            options={
+                'verbose_name': '导出内容版本',
+                'verbose_name_plural': '导出内容版本',
+                'db_table': 'export_content_versions',
+            },
+        ),
+    ]
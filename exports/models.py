@@ -1,4 +1,5 @@
 from django.db import models
+from common.models import Tenant
 from users.models import User
 from products.models import Product, ProductVariation
 
@@ -80,6 +81,13 @@ class ExportHistory(models.Model):
     """
     导出历史记录
     """
+    STATUS_CHOICES = (
+        ('pending', '待处理'),
+        ('processing', '处理中'),
+        ('completed', '已完成'),
+        ('failed', '失败'),
+    )
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_history')
     export_list = models.ForeignKey(ExportList, on_delete=models.CASCADE, null=True, blank=True)
     template = models.ForeignKey(ExportTemplate, on_delete=models.SET_NULL, null=True, blank=True)
@@ -87,6 +95,9 @@ class ExportHistory(models.Model):
     file_path = models.CharField(max_length=255)
     product_count = models.IntegerField(default=0)
     variation_count = models.IntegerField(default=0)
+    artifact_key = models.CharField(max_length=64, blank=True, db_index=True, help_text="导出文件内容键")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    error_log = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -96,3 +107,21 @@ class ExportHistory(models.Model):
         
     def __str__(self):
         return f"{self.file_name} ({self.created_at.strftime('%Y-%m-%d %H:%M')})"
+
+
+class ExportContentVersion(models.Model):
+    """
+    租户产品数据的内容版本
+    products应用的模型或多对多关系变更的事务提交后递增，计入导出文件内容键，见exports.artifacts
+    """
+    tenant = models.OneToOneField(Tenant, on_delete=models.CASCADE, null=True, related_name='+')
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'export_content_versions'
+        verbose_name = '导出内容版本'
+        verbose_name_plural = '导出内容版本'
+
+    def __str__(self):
+        return f"{self.tenant_id}: {self.version}"
@@ -0,0 +1,239 @@
+"""
+导出列投影模块
+将导出模板的列配置编译为投影：按列顺序排列的取值函数，
+以及读取清单项时需要的最少字段（.only()）与需要执行的预取计划。
+编译结果按列配置缓存，同一配置在进程内只编译一次
+
+模板字段配置格式（ExportTemplate.fields）：
+    {"columns": ["SKU", "Name", {"column": "Regular price", "header": "价格"}]}
+列名为WooCommerce列名，header为可选的自定义表头；未配置列时导出全部WooCommerce列
+"""
+import re
+from functools import lru_cache
+
+from products import woocommerce as wc
+
+# 属性列，例如 "Attribute 1 value(s)"
+ATTRIBUTE_COLUMN_PATTERN = re.compile(r'^Attribute (\d+) (name|value\(s\)|visible|global)$')
+
+
+class Column:
+    """
+    单个导出列的定义
+    getter签名为 (实例, ExportDataLoader) -> 字符串
+    fields为取值需要读取的模型字段，可包含跨关联的 "product__sku" 形式
+    plans为需要执行的预取计划名称
+    """
+    __slots__ = ('getter', 'fields', 'plans')
+
+    def __init__(self, getter, fields=(), plans=()):
+        self.getter = getter
+        self.fields = tuple(fields)
+        self.plans = tuple(plans)
+
+
+BLANK = Column(lambda obj, loader: '')
+
+
+def const(value):
+    return Column(lambda obj, loader: value)
+
+
+def field(name, formatter=None):
+    """
+    直接读取模型字段的列
+    """
+    if formatter is None:
+        return Column(lambda obj, loader: getattr(obj, name), fields=(name,))
+    return Column(lambda obj, loader: formatter(getattr(obj, name)), fields=(name,))
+
+
+# 产品行各列
+PRODUCT_COLUMNS = {
+    'Type': field('type'),
+    'SKU': field('sku'),
+    'GTIN, UPC, EAN, or ISBN': field('gtin'),
+    'Name': field('name'),
+    'Published': field('status', wc.format_published),
+    'Is featured?': field('featured', wc.format_bool),
+    'Visibility in catalog': field('catalog_visibility'),
+    'Short description': field('short_description'),
+    'Description': field('description'),
+    'Date sale price starts': field('sale_price_start_date', wc.format_datetime),
+    'Date sale price ends': field('sale_price_end_date', wc.format_datetime),
+    'Tax status': const('taxable'),
+    'In stock?': field('stock_status', wc.format_stock_status),
+    'Stock': field('stock_quantity', str),
+    'Backorders allowed?': field('backorders_allowed', wc.format_bool),
+    'Sold individually?': field('sold_individually', wc.format_bool),
+    'Weight (kg)': field('weight', wc.format_decimal),
+    'Length (cm)': field('length', wc.format_decimal),
+    'Width (cm)': field('width', wc.format_decimal),
+    'Height (cm)': field('height', wc.format_decimal),
+    'Allow customer reviews?': field('reviews_allowed', wc.format_bool),
+    'Purchase note': field('purchase_note'),
+    'Sale price': field('sale_price', wc.format_decimal),
+    'Regular price': field('regular_price', wc.format_decimal),
+    'Categories': Column(
+        lambda p, loader: wc.format_category_paths(loader.category_paths(p)), plans=('categories',)
+    ),
+    'Tags': Column(lambda p, loader: wc.format_list(tag.name for tag in p.tags.all()), plans=('tags',)),
+    'Shipping class': field('shipping_class'),
+    'Images': Column(
+        lambda p, loader: wc.format_list(image.image_url for image in p.images.all()), plans=('images',)
+    ),
+    'Upsells': Column(
+        lambda p, loader: wc.format_list(related.sku for related in p.upsell_products.all()), plans=('upsells',)
+    ),
+    'Cross-sells': Column(
+        lambda p, loader: wc.format_list(related.sku for related in p.cross_sell_products.all()),
+        plans=('cross_sells',),
+    ),
+    'External URL': field('external_url'),
+    'Button text': field('button_text'),
+    'Position': field('menu_order', str),
+    'Brands': field('brand'),
+}
+
+# 变体行各列
+VARIATION_COLUMNS = {
+    'Type': const(wc.VARIATION_TYPE),
+    'SKU': field('sku'),
+    'Name': field('name'),
+    'Published': const('1'),
+    'Description': field('description'),
+    'Date sale price starts': field('sale_price_start_date', wc.format_datetime),
+    'Date sale price ends': field('sale_price_end_date', wc.format_datetime),
+    'Tax status': const('taxable'),
+    'Tax class': const('parent'),
+    'In stock?': field('stock_status', wc.format_stock_status),
+    'Stock': field('stock_quantity', str),
+    'Weight (kg)': field('weight', wc.format_decimal),
+    'Length (cm)': field('length', wc.format_decimal),
+    'Width (cm)': field('width', wc.format_decimal),
+    'Height (cm)': field('height', wc.format_decimal),
+    'Sale price': field('sale_price', wc.format_decimal),
+    'Regular price': field('regular_price', wc.format_decimal),
+    'Images': Column(
+        lambda v, loader: v.image.image_url if v.image_id else '', fields=('image_id', 'image__image_url')
+    ),
+    'Parent': Column(lambda v, loader: v.product.sku, fields=('product__sku',)),
+    'Position': field('sort_order', str),
+}
+
+
+def _attribute_column(n, part, is_variation):
+    """
+    第n组属性列，属性数据由loader预取
+    """
+    index = n - 1
+
+    def getter(obj, loader):
+        attributes = loader.variation_attributes(obj) if is_variation else loader.product_attributes(obj)
+        if index >= len(attributes):
+            return ''
+        name, values = attributes[index]
+        if part == 'name':
+            return name
+        if part == 'value(s)':
+            return wc.format_list(values)
+        if part == 'visible':
+            return '' if is_variation else '1'
+        return '0'
+
+    return Column(getter, plans=('attributes',))
+
+
+def _resolve(column, columns, is_variation):
+    if column in columns:
+        return columns[column]
+    match = ATTRIBUTE_COLUMN_PATTERN.match(column)
+    if match:
+        return _attribute_column(int(match.group(1)), match.group(2), is_variation)
+    if column in wc.WOOCOMMERCE_BASE_COLUMNS:
+        return BLANK
+    raise ValueError(f"未知的导出列: {column}")
+
+
+class ExportProjection:
+    """
+    编译后的导出列投影
+    """
+
+    def __init__(self, columns):
+        """
+        :param columns: ((WooCommerce列名, 表头), ...)
+        """
+        self.headers = tuple(header for _, header in columns)
+        product_columns = [_resolve(column, PRODUCT_COLUMNS, False) for column, _ in columns]
+        variation_columns = [_resolve(column, VARIATION_COLUMNS, True) for column, _ in columns]
+
+        self.product_getters = tuple(column.getter for column in product_columns)
+        self.variation_getters = tuple(column.getter for column in variation_columns)
+        self.product_plans = self._unique(plan for column in product_columns for plan in column.plans)
+        self.variation_plans = self._unique(plan for column in variation_columns for plan in column.plans)
+
+        product_fields = self._unique(f for column in product_columns for f in column.fields)
+        variation_fields = self._unique(f for column in variation_columns for f in column.fields)
+        # 读取清单项时只加载投影需要的字段
+        self.item_fields = ('id', 'product_id', 'variation_id') + tuple(
+            f'product__{name}' for name in ('id',) + product_fields
+        ) + tuple(
+            f'variation__{name}' for name in ('id', 'product_id') + variation_fields
+        )
+        self.item_relations = ('product', 'variation') + tuple(
+            f'variation__{name.split("__")[0]}' for name in variation_fields if '__' in name
+        )
+
+    @staticmethod
+    def _unique(values):
+        return tuple(dict.fromkeys(values))
+
+    def product_row(self, product, loader):
+        return [getter(product, loader) for getter in self.product_getters]
+
+    def variation_row(self, variation, loader):
+        return [getter(variation, loader) for getter in self.variation_getters]
+
+
+@lru_cache(maxsize=128)
+def compile_columns(columns):
+    """
+    编译列配置，结果按配置缓存
+    :param columns: ((WooCommerce列名, 表头), ...)
+    :return: ExportProjection
+    :raises ValueError: 列名不正确
+    """
+    return ExportProjection(columns)
+
+
+def parse_template_columns(fields):
+    """
+    解析导出模板的字段配置
+    :param fields: ExportTemplate.fields
+    :return: ((WooCommerce列名, 表头), ...)，未配置列时返回空元组
+    :raises ValueError: 配置格式不正确
+    """
+    if isinstance(fields, dict):
+        fields = fields.get('columns') or []
+    if not isinstance(fields, list):
+        raise ValueError("导出模板的columns必须是列表")
+
+    columns = []
+    for entry in fields:
+        if isinstance(entry, str):
+            columns.append((entry, entry))
+        elif isinstance(entry, dict) and isinstance(entry.get('column'), str):
+            columns.append((entry['column'], entry.get('header') or entry['column']))
+        else:
+            raise ValueError(f"无效的导出列配置: {entry}")
+    return tuple(columns)
+
+
+def default_columns(attribute_count=2):
+    """
+    未配置列时使用的全部WooCommerce列
+    :param attribute_count: 属性列组数
+    :return: ((WooCommerce列名, 表头), ...)
+    """
+    return tuple((column, column) for column in wc.get_columns(attribute_count))
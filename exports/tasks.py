@@ -0,0 +1,38 @@
+"""
+导出后台任务
+导出文件在worker进程中生成，不占用Web请求线程
+"""
+from jobs import broker
+from jobs.registry import register
+from .exporter import WooCommerceExporter
+from .models import ExportHistory
+
+EXPORT_TASK = 'exports.woocommerce'
+
+
+def mark_export_failed(history_id, error, **params):
+    """
+    导出任务最终失败（如worker多次中断）时将未结束的导出历史标记为失败
+    """
+    ExportHistory.objects.filter(pk=history_id).exclude(status__in=('completed', 'failed')).update(
+        status='failed', error_log=f"导出失败: {error}\n",
+    )
+
+
+@register(EXPORT_TASK, on_failure=mark_export_failed)
+def run_export(history_id):
+    """
+    执行导出任务，导出文件可完整重新生成，worker中断后直接重新执行
+    """
+    history = ExportHistory.objects.select_related('user__tenant', 'export_list').get(pk=history_id)
+    if history.status in ('completed', 'failed'):
+        return
+    WooCommerceExporter(history).run()
+
+
+def enqueue_export(history):
+    """
+    提交导出任务，导出历史保持pending状态直到worker开始执行
+    :return: Job实例
+    """
+    return broker.enqueue(EXPORT_TASK, tenant=history.user.tenant, history_id=history.pk)
@@ -0,0 +1,11 @@
+"""
+导出模块URL配置
+"""
+from django.urls import path
+from . import views
+
+app_name = 'exports'
+
+urlpatterns = [
+    path('lists/<int:list_id>/download/', views.ExportListDownloadAPIView.as_view(), name='export_list_download'),
+]
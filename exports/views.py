@@ -1,3 +1,92 @@
-from django.shortcuts import render
+"""
+导出模块视图
+"""
+from django.db.models import Q
+from django.http import FileResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import content_disposition_header, parse_etags
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 
-# Create your views here.
+from common.exceptions import ValidationException
+from common.permissions import IsAuthenticated
+from common.views import BaseAPIView
+from users.authentication import JWTAuthentication
+
+from .artifacts import ArtifactStore, accepts_gzip, artifact_key
+from .exporter import WooCommerceCSVStream
+from .models import ExportList, ExportTemplate
+
+CSV_CONTENT_TYPE = 'text/csv; charset=utf-8'
+
+
+class ExportListDownloadAPIView(BaseAPIView):
+    """导出清单下载API"""
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    @extend_schema(
+        tags=['导出'],
+        summary="下载导出清单",
+        description="以WooCommerce CSV格式流式下载导出清单中的产品与变体，列顺序与WooCommerce导入模板一致；"
+                    "指定导出模板时只导出模板配置的列。内容未变化时直接返回已生成的文件，"
+                    "支持If-None-Match与gzip传输编码",
+        parameters=[
+            OpenApiParameter(
+                name='template', type=OpenApiTypes.INT, location=OpenApiParameter.QUERY,
+                description="导出模板ID，可使用自己的模板或公开模板", required=False,
+            ),
+        ],
+        responses={
+            200: OpenApiResponse(description="CSV文件"),
+            304: OpenApiResponse(description="内容未变化"),
+            400: OpenApiResponse(description="导出模板配置不正确"),
+            404: OpenApiResponse(description="导出清单或导出模板不存在"),
+        },
+        auth=[{"Bearer": []}],
+    )
+    def get(self, request, list_id):
+        """流式下载导出清单"""
+        queryset = ExportList.objects.all()
+        if not request.user.is_super_admin:
+            queryset = queryset.filter(user=request.user)
+        export_list = self.get_object_or_404(queryset, pk=list_id)
+
+        template = None
+        template_id = request.query_params.get('template')
+        if template_id:
+            if not template_id.isdigit():
+                raise ValidationException(message="导出模板ID必须是整数")
+            template = self.get_object_or_404(
+                ExportTemplate.objects.filter(Q(user=request.user) | Q(is_public=True)), pk=template_id
+            )
+
+        # 内容未变化时直接返回已生成的文件，ETag为内容键
+        key = artifact_key(export_list, template)
+        etag = f'"{key}"'
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        store = ArtifactStore()
+        filename = f"{export_list.name}.csv"
+        compressed = accepts_gzip(request.headers.get('Accept-Encoding')) and store.get(key, compressed=True)
+        path = compressed or store.get(key)
+        if path:
+            response = FileResponse(
+                open(path, 'rb'), as_attachment=True, filename=filename, content_type=CSV_CONTENT_TYPE
+            )
+            if compressed:
+                response['Content-Encoding'] = 'gzip'
+        else:
+            try:
+                stream = WooCommerceCSVStream(export_list, template=template)
+            except ValueError as e:
+                raise ValidationException(message=str(e))
+            # 首次下载时边输出边生成缓存文件
+            response = StreamingHttpResponse(store.write(key, stream), content_type=CSV_CONTENT_TYPE)
+            response['Content-Disposition'] = content_disposition_header(as_attachment=True, filename=filename)
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
@@ -19,7 +19,8 @@ class ImportHistoryAdmin(admin.ModelAdmin):
         (None, {'fields': ('user', 'file_name', 'file_path')}),
         ('导入格式', {'fields': ('format',)}),
         ('状态信息', {'fields': ('status', 'total_rows', 'processed_rows', 'success_rows', 'error_rows', 
-                            'product_count', 'variation_count')}),
+                            'product_count', 'variation_count', 'created_rows', 'updated_rows', 'skipped_rows',
+                            'checkpoint_row', 'checkpoint_offset')}),
         ('错误日志', {'fields': ('error_log',), 'classes': ('collapse',)}),
         ('时间信息', {'fields': ('created_at', 'updated_at'), 'classes': ('collapse',)}),
     )
@@ -0,0 +1,666 @@
+"""
+WooCommerce CSV导入模块
+以生成器逐行流式读取CSV文件，按批次在独立事务中bulk_create写入产品数据，
+每个批次只更新一次导入历史的计数，内存占用与文件大小无关。
+每个SKU保存CSV行摘要，重复导入时跳过内容未变化的行，变化的行只更新有差异的字段。
+每个批次提交时在同一事务中记录检查点（字节偏移量与行号），中断的导入可从检查点继续
+"""
+import csv
+import logging
+from itertools import islice
+
+from django.db import DatabaseError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
+
+from products import woocommerce as wc
+from products.models import Product, ProductAttribute, ProductImage, ProductVariation, VariationAttribute
+from search.indexing import index_products
+from .lookups import ImportLookupCache, tenant_slug
+from .models import ImportHistory
+
+logger = logging.getLogger('django')
+
+# 默认每批处理的行数
+DEFAULT_BATCH_SIZE = 500
+
+# 每个批次最多记录的错误条数，避免错误日志无限增长
+MAX_BATCH_ERRORS = 50
+
+
+class CSVReader:
+    """
+    记录字节偏移量的CSV读取器
+    迭代时生成 (行号, 行字典) 元组，offset始终指向最近生成的行之后的位置，
+    可作为检查点传回构造函数，从该位置之后继续读取
+    """
+
+    def __init__(self, file_path, encoding='utf-8-sig', offset=0, row_number=0):
+        """
+        :param file_path: 文件路径
+        :param encoding: 文件编码，默认兼容带BOM的UTF-8
+        :param offset: 开始读取的字节偏移量，0表示从表头之后开始
+        :param row_number: offset之前已读取的行数
+        """
+        self.file_path = file_path
+        self.encoding = encoding
+        self.offset = offset
+        self.row_number = row_number
+
+    def __iter__(self):
+        with open(self.file_path, 'rb') as f:
+            position = 0
+
+            def lines():
+                # 以二进制读取并自行解码，才能在逐行迭代时得到准确的字节偏移量
+                nonlocal position
+                for line in f:
+                    position += len(line)
+                    yield line.decode(self.encoding)
+
+            reader = csv.DictReader(lines())
+            if reader.fieldnames is None:
+                return
+            if self.offset > position:
+                f.seek(self.offset)
+                position = self.offset
+            for row in reader:
+                self.row_number += 1
+                self.offset = position
+                yield self.row_number, row
+
+
+def iter_csv_rows(file_path, encoding='utf-8-sig'):
+    """
+    逐行读取CSV文件
+    :param file_path: 文件路径
+    :param encoding: 文件编码，默认兼容带BOM的UTF-8
+    :return: 生成 (行号, 行字典) 元组，行号从1开始（不含表头）
+    """
+    yield from CSVReader(file_path, encoding)
+
+
+def iter_batches(rows, batch_size):
+    """
+    将行迭代器切分为固定大小的批次
+    :param rows: 行迭代器
+    :param batch_size: 批次大小
+    :return: 生成行列表
+    """
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class WooCommerceImporter:
+    """
+    WooCommerce CSV导入器
+    用法：WooCommerceImporter(history).run()
+    """
+
+    # 更新已存在产品时写入的字段
+    PRODUCT_FIELDS = (
+        'name', 'type', 'status', 'featured', 'catalog_visibility', 'description',
+        'short_description', 'price', 'regular_price', 'sale_price',
+        'sale_price_start_date', 'sale_price_end_date', 'menu_order', 'stock_quantity',
+        'stock_status', 'backorders_allowed', 'sold_individually', 'weight', 'length',
+        'width', 'height', 'shipping_class', 'reviews_allowed', 'purchase_note', 'gtin',
+        'external_url', 'button_text', 'brand',
+    )
+
+    # 更新已存在变体时写入的字段
+    VARIATION_FIELDS = (
+        'product', 'name', 'description', 'price', 'regular_price', 'sale_price',
+        'sale_price_start_date', 'sale_price_end_date', 'stock_quantity', 'stock_status',
+        'weight', 'length', 'width', 'height', 'image', 'sort_order',
+    )
+
+    def __init__(self, history, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        :param history: ImportHistory实例
+        :param batch_size: 每批处理的行数
+        """
+        self.history = history
+        self.tenant = history.user.tenant
+        self.batch_size = batch_size
+        self.lookups = ImportLookupCache(self.tenant)
+
+    def run(self):
+        """
+        执行完整导入流程，并维护导入历史的状态
+        处于processing状态的导入（进程中断遗留）从最近的检查点继续
+        :return: 刷新后的ImportHistory实例
+        """
+        if self.history.status == 'processing':
+            reader = self._resume_reader()
+        else:
+            reader = CSVReader(self.history.file_path)
+        self.set_status('processing')
+        try:
+            self.import_rows(reader)
+        except Exception as e:
+            logger.exception(f"导入失败: {self.history.file_name}")
+            self.set_status('failed', error=f"导入失败: {e}\n")
+            raise
+        finally:
+            self.lookups.rebuild_tree()
+        self.set_status('completed')
+        return self.history
+
+    def _resume_reader(self):
+        """
+        从检查点创建读取器
+        检查点与已处理行数不一致时（例如并行导入中断）无法确定已提交的行，
+        清零计数后从头导入，已写入的行会因摘要相同而被跳过
+        """
+        history = self.history
+        if history.checkpoint_row and history.checkpoint_row == history.processed_rows:
+            logger.info(f"从第{history.checkpoint_row}行之后继续导入: {history.file_name}")
+            return CSVReader(history.file_path, offset=history.checkpoint_offset, row_number=history.checkpoint_row)
+
+        self.reset_progress()
+        return CSVReader(history.file_path)
+
+    def reset_progress(self):
+        """
+        清零导入计数与检查点，重新从头导入前调用
+        """
+        ImportHistory.objects.filter(pk=self.history.pk).update(
+            processed_rows=0, success_rows=0, error_rows=0, product_count=0, variation_count=0,
+            created_rows=0, updated_rows=0, skipped_rows=0, checkpoint_offset=0, checkpoint_row=0,
+            updated_at=timezone.now(),
+        )
+
+    def import_rows(self, rows):
+        """
+        按批次导入行
+        :param rows: (行号, 行字典) 迭代器，为CSVReader时每个批次同时记录检查点
+        """
+        for batch in iter_batches(rows, self.batch_size):
+            # islice恰好读取到批次最后一行，此时的偏移量即该批次的检查点
+            checkpoint = (rows.offset, rows.row_number) if isinstance(rows, CSVReader) else None
+            self.import_batch(batch, checkpoint)
+
+    def import_batch(self, batch, checkpoint=None):
+        """
+        在一个事务中导入一个批次，并更新一次导入历史计数
+        :param batch: (行号, 行字典) 列表
+        :param checkpoint: (字节偏移量, 行号)，与批次数据在同一事务中提交
+        """
+        errors = []
+        products, variations = [], []
+        for row_number, row in batch:
+            try:
+                item = self._parse_row(row_number, row)
+            except ValueError as e:
+                errors.append(f"第{row_number}行: {e}")
+                continue
+            (variations if item['is_variation'] else products).append(item)
+
+        stats = self._empty_stats()
+        try:
+            with transaction.atomic():
+                self.lookups.resolve_items(products + variations)
+                product_ids = self._save_products(products, errors, stats)
+                product_ids |= self._save_variations(variations, errors, stats)
+                # 批量写入不触发信号，显式更新写入的产品及变体所属产品的搜索文档与分面索引
+                index_products(product_ids)
+                stats['success'] = len(batch) - len(errors)
+                self._record_progress(len(batch), stats, errors, checkpoint)
+        except DatabaseError as e:
+            logger.exception("导入批次写入失败")
+            errors.append(f"第{batch[0][0]}-{batch[-1][0]}行写入失败: {e}")
+            # 回滚后缓存中可能包含未提交的记录
+            self.lookups.reload()
+            self._record_progress(len(batch), self._empty_stats(), errors, checkpoint)
+
+    def _empty_stats(self):
+        return {'success': 0, 'products': 0, 'variations': 0, 'created': 0, 'updated': 0, 'skipped': 0}
+
+    # ------------------------------------------------------------------
+    # 行解析
+    # ------------------------------------------------------------------
+
+    def _parse_row(self, row_number, row):
+        """
+        解析CSV行为导入条目
+        :raises ValueError: 行数据不合法
+        """
+        row_type = wc.clean(row.get('Type')).lower()
+        attributes = wc.parse_attributes(row)
+        item = {
+            'row_number': row_number,
+            'is_variation': row_type == wc.VARIATION_TYPE,
+            'attributes': attributes,
+            'images': wc.parse_list(row.get('Images')),
+            'fingerprint': wc.row_fingerprint(row),
+        }
+
+        if item['is_variation']:
+            parent_sku = wc.clean(row.get('Parent'))
+            if not parent_sku:
+                raise ValueError("变体缺少父产品SKU")
+            item['parent'] = parent_sku
+            item['sku'] = wc.clean(row.get('SKU')) or wc.variation_sku(parent_sku, attributes)
+            item['fields'] = self._variation_fields(row)
+            return item
+
+        sku = wc.clean(row.get('SKU'))
+        if not sku:
+            raise ValueError("缺少SKU")
+        item['sku'] = sku
+        item['fields'] = self._product_fields(row, sku, row_type)
+        item['categories'] = wc.parse_category_paths(row.get('Categories'))
+        item['tags'] = wc.parse_list(row.get('Tags'))
+        item['upsells'] = wc.parse_list(row.get('Upsells'))
+        item['cross_sells'] = wc.parse_list(row.get('Cross-sells'))
+        return item
+
+    def _product_fields(self, row, sku, row_type):
+        """
+        从CSV行提取产品字段
+        """
+        regular_price = wc.parse_decimal(row.get('Regular price'))
+        sale_price = wc.parse_decimal(row.get('Sale price'))
+        visibility = wc.clean(row.get('Visibility in catalog'))
+        return {
+            'name': (wc.clean(row.get('Name')) or sku)[:255],
+            'type': row_type if row_type in dict(Product.TYPE_CHOICES) else 'simple',
+            'status': wc.parse_published(row.get('Published')),
+            'featured': wc.parse_bool(row.get('Is featured?')),
+            'catalog_visibility': visibility if visibility in dict(Product.VISIBILITY_CHOICES) else 'visible',
+            'description': wc.clean(row.get('Description')),
+            'short_description': wc.clean(row.get('Short description')),
+            'price': sale_price if sale_price is not None else regular_price,
+            'regular_price': regular_price,
+            'sale_price': sale_price,
+            'sale_price_start_date': wc.parse_datetime(row.get('Date sale price starts')),
+            'sale_price_end_date': wc.parse_datetime(row.get('Date sale price ends')),
+            'menu_order': wc.parse_int(row.get('Position')),
+            'stock_quantity': wc.parse_int(row.get('Stock')),
+            'stock_status': wc.parse_stock_status(row.get('In stock?')),
+            'backorders_allowed': wc.parse_bool(row.get('Backorders allowed?')),
+            'sold_individually': wc.parse_bool(row.get('Sold individually?')),
+            'weight': wc.parse_decimal(row.get('Weight (kg)')),
+            'length': wc.parse_decimal(row.get('Length (cm)')),
+            'width': wc.parse_decimal(row.get('Width (cm)')),
+            'height': wc.parse_decimal(row.get('Height (cm)')),
+            'shipping_class': wc.clean(row.get('Shipping class'))[:100],
+            'reviews_allowed': wc.parse_bool(row.get('Allow customer reviews?')),
+            'purchase_note': wc.clean(row.get('Purchase note')),
+            'gtin': wc.clean(row.get('GTIN, UPC, EAN, or ISBN'))[:100],
+            'external_url': wc.clean(row.get('External URL')),
+            'button_text': wc.clean(row.get('Button text'))[:100],
+            'brand': wc.clean(row.get('Brands'))[:100],
+        }
+
+    def _variation_fields(self, row):
+        """
+        从CSV行提取变体字段
+        """
+        regular_price = wc.parse_decimal(row.get('Regular price'))
+        sale_price = wc.parse_decimal(row.get('Sale price'))
+        return {
+            'name': wc.clean(row.get('Name'))[:255],
+            'description': wc.clean(row.get('Description')),
+            'price': sale_price if sale_price is not None else regular_price,
+            'regular_price': regular_price,
+            'sale_price': sale_price,
+            'sale_price_start_date': wc.parse_datetime(row.get('Date sale price starts')),
+            'sale_price_end_date': wc.parse_datetime(row.get('Date sale price ends')),
+            'stock_quantity': wc.parse_int(row.get('Stock')),
+            'stock_status': wc.parse_stock_status(row.get('In stock?')),
+            'weight': wc.parse_decimal(row.get('Weight (kg)')),
+            'length': wc.parse_decimal(row.get('Length (cm)')),
+            'width': wc.parse_decimal(row.get('Width (cm)')),
+            'height': wc.parse_decimal(row.get('Height (cm)')),
+            'sort_order': wc.parse_int(row.get('Position')),
+        }
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def _save_products(self, items, errors, stats):
+        """
+        写入产品及其分类、标签、图片、属性和关联产品，内容未变化的产品整行跳过
+        :return: 写入的产品ID集合
+        """
+        items = self._dedupe(items)
+        if not items:
+            return set()
+
+        existing = self._existing_ids(Product, items, errors)
+        items = self._skip_unchanged(items, existing, stats)
+        if not items:
+            return set()
+        existing = existing['own']
+
+        new_products = [
+            Product(
+                tenant=self.tenant,
+                sku=item['sku'],
+                slug=tenant_slug(self.tenant, item['sku'], max_length=255),
+                import_fingerprint=item['fingerprint'],
+                **item['fields']
+            )
+            for item in items if item['sku'] not in existing
+        ]
+        Product.original_objects.bulk_create(new_products, batch_size=self.batch_size)
+        self._update_changed(Product, self.PRODUCT_FIELDS, items, existing)
+        stats['products'] += len(new_products)
+        stats['created'] += len(new_products)
+        stats['updated'] += len(items) - len(new_products)
+
+        # MySQL的bulk_create不回填主键，统一按SKU回查
+        product_ids = self._ids_by_sku(Product, [item['sku'] for item in items])
+        self._save_product_relations(items, product_ids)
+        return set(product_ids.values())
+
+    def _save_product_relations(self, items, product_ids):
+        """
+        批量写入产品的多对多关系、图片和属性
+        """
+        ids = list(product_ids.values())
+        category_links, tag_links, product_attributes = [], [], []
+        CategoryLink = Product.categories.through
+        TagLink = Product.tags.through
+
+        for item in items:
+            product_id = product_ids[item['sku']]
+            for path in item['categories']:
+                category_links.append(CategoryLink(product_id=product_id, category_id=self.lookups.category_id(path)))
+            for name in item['tags']:
+                tag_links.append(TagLink(product_id=product_id, tag_id=self.lookups.tag_id(name)))
+            for name, _ in item['attributes']:
+                product_attributes.append(ProductAttribute(
+                    tenant=self.tenant, product_id=product_id, attribute_id=self.lookups.attribute_id(name)
+                ))
+
+        # 重新导入时以CSV为准替换关联
+        CategoryLink.objects.filter(product_id__in=ids).delete()
+        TagLink.objects.filter(product_id__in=ids).delete()
+        CategoryLink.objects.bulk_create(category_links, ignore_conflicts=True)
+        TagLink.objects.bulk_create(tag_links, ignore_conflicts=True)
+        ProductAttribute.original_objects.bulk_create(product_attributes, ignore_conflicts=True)
+        self._save_related_products(items, product_ids)
+
+        # 只补充尚不存在的图片，保留已被变体引用的图片记录
+        existing_images = set(
+            ProductImage.original_objects.filter(product_id__in=ids).values_list('product_id', 'image_url')
+        )
+        new_images = []
+        for item in items:
+            product_id = product_ids[item['sku']]
+            for order, url in enumerate(item['images']):
+                if (product_id, url) not in existing_images:
+                    new_images.append(ProductImage(
+                        tenant=self.tenant, product_id=product_id, image_url=url,
+                        is_featured=(order == 0), order=order,
+                    ))
+        ProductImage.original_objects.bulk_create(new_images, batch_size=self.batch_size)
+
+    def _save_related_products(self, items, product_ids):
+        """
+        按SKU写入追加销售与交叉销售关联，目标产品不存在时跳过
+        """
+        related_skus = set()
+        for item in items:
+            related_skus.update(item['upsells'])
+            related_skus.update(item['cross_sells'])
+        related_ids = self._ids_by_sku(Product, related_skus) if related_skus else {}
+
+        UpsellLink = Product.upsell_products.through
+        CrossSellLink = Product.cross_sell_products.through
+        upsell_links, cross_sell_links = [], []
+        for item in items:
+            product_id = product_ids[item['sku']]
+            upsell_links.extend(
+                UpsellLink(from_product_id=product_id, to_product_id=related_ids[sku])
+                for sku in item['upsells'] if sku in related_ids
+            )
+            cross_sell_links.extend(
+                CrossSellLink(from_product_id=product_id, to_product_id=related_ids[sku])
+                for sku in item['cross_sells'] if sku in related_ids
+            )
+
+        ids = list(product_ids.values())
+        UpsellLink.objects.filter(from_product_id__in=ids).delete()
+        CrossSellLink.objects.filter(from_product_id__in=ids).delete()
+        UpsellLink.objects.bulk_create(upsell_links, ignore_conflicts=True)
+        CrossSellLink.objects.bulk_create(cross_sell_links, ignore_conflicts=True)
+
+    def link_related_products(self, rows):
+        """
+        单独重建追加销售与交叉销售关联
+        用于并行导入：关联的目标产品可能由其他分片写入，需在全部分片完成后再执行
+        :param rows: (行号, 行字典) 迭代器
+        """
+        for batch in iter_batches(rows, self.batch_size):
+            items = []
+            for row_number, row in batch:
+                if wc.clean(row.get('Type')).lower() == wc.VARIATION_TYPE:
+                    continue
+                if not (wc.clean(row.get('Upsells')) or wc.clean(row.get('Cross-sells'))):
+                    continue
+                items.append({
+                    'sku': wc.clean(row.get('SKU')),
+                    'upsells': wc.parse_list(row.get('Upsells')),
+                    'cross_sells': wc.parse_list(row.get('Cross-sells')),
+                })
+            product_ids = self._ids_by_sku(Product, [item['sku'] for item in items])
+            items = [item for item in items if item['sku'] in product_ids]
+            if items:
+                with transaction.atomic():
+                    self._save_related_products(items, product_ids)
+
+    def _save_variations(self, items, errors, stats):
+        """
+        写入变体及其属性，内容未变化的变体整行跳过
+        :return: 写入的变体所属的产品ID集合
+        """
+        items = self._dedupe(items)
+        if not items:
+            return set()
+
+        parent_ids = self._ids_by_sku(Product, {item['parent'] for item in items})
+        valid_items = []
+        for item in items:
+            if item['parent'] in parent_ids:
+                valid_items.append(item)
+            else:
+                errors.append(f"第{item['row_number']}行: 父产品 {item['parent']} 不存在")
+        items = valid_items
+
+        existing = self._existing_ids(ProductVariation, items, errors)
+        items = self._skip_unchanged(items, existing, stats)
+        if not items:
+            return set()
+        existing = existing['own']
+
+        # 变体图片引用父产品中URL相同的图片
+        image_ids = {
+            (product_id, url): image_id
+            for image_id, product_id, url in ProductImage.original_objects.filter(
+                product_id__in=parent_ids.values()
+            ).values_list('id', 'product_id', 'image_url')
+        }
+        for item in items:
+            product_id = parent_ids[item['parent']]
+            item['fields']['product_id'] = product_id
+            item['fields']['image_id'] = (
+                image_ids.get((product_id, item['images'][0])) if item['images'] else None
+            )
+
+        new_variations = [
+            ProductVariation(tenant=self.tenant, sku=item['sku'], import_fingerprint=item['fingerprint'], **item['fields'])
+            for item in items if item['sku'] not in existing
+        ]
+        ProductVariation.original_objects.bulk_create(new_variations, batch_size=self.batch_size)
+        self._update_changed(ProductVariation, self.VARIATION_FIELDS, items, existing)
+        stats['variations'] += len(new_variations)
+        stats['created'] += len(new_variations)
+        stats['updated'] += len(items) - len(new_variations)
+
+        variation_ids = self._ids_by_sku(ProductVariation, [item['sku'] for item in items])
+        variation_attributes = []
+        for item in items:
+            for name, values in item['attributes']:
+                variation_attributes.append(VariationAttribute(
+                    tenant=self.tenant,
+                    variation_id=variation_ids[item['sku']],
+                    attribute_id=self.lookups.attribute_id(name),
+                    value_id=self.lookups.attribute_value_id(name, values[0]),
+                ))
+        VariationAttribute.original_objects.filter(variation_id__in=variation_ids.values()).delete()
+        VariationAttribute.original_objects.bulk_create(variation_attributes, batch_size=self.batch_size)
+        return {item['fields']['product_id'] for item in items}
+
+    def _dedupe(self, items):
+        """
+        同一批次内SKU重复时保留最后一行
+        """
+        return list({item['sku']: item for item in items}.values())
+
+    def _existing_ids(self, model, items, errors):
+        """
+        查询批次中已存在的SKU，区分本租户与其他租户的记录
+        :return: {'own': {sku: id}, 'foreign': {sku, ...}, 'fingerprints': {sku: 摘要}}
+        """
+        own, foreign, fingerprints = {}, set(), {}
+        rows = model.original_objects.filter(
+            sku__in=[item['sku'] for item in items]
+        ).values_list('sku', 'id', 'tenant_id', 'import_fingerprint')
+        tenant_id = self.tenant.id if self.tenant else None
+        for sku, pk, owner_id, fingerprint in rows:
+            if owner_id == tenant_id:
+                own[sku] = pk
+                fingerprints[sku] = fingerprint
+            else:
+                foreign.add(sku)
+        for item in items:
+            if item['sku'] in foreign:
+                errors.append(f"第{item['row_number']}行: SKU {item['sku']} 已被其他租户使用")
+        return {'own': own, 'foreign': foreign, 'fingerprints': fingerprints}
+
+    def _skip_unchanged(self, items, existing, stats):
+        """
+        过滤其他租户的SKU以及摘要与上次导入相同的行
+        :return: 需要写入的条目
+        """
+        fingerprints = existing['fingerprints']
+        changed = []
+        for item in items:
+            if item['sku'] in existing['foreign']:
+                continue
+            if fingerprints.get(item['sku']) == item['fingerprint']:
+                stats['skipped'] += 1
+                continue
+            changed.append(item)
+        return changed
+
+    def _update_changed(self, model, fields, items, existing):
+        """
+        对比数据库中的当前值，只更新有差异的字段
+        差异字段相同的记录合并为一次bulk_update
+        :param model: Product或ProductVariation
+        :param fields: 可更新的字段名
+        :param items: 条目列表，只处理已存在的SKU
+        :param existing: {sku: id}
+        """
+        items = [item for item in items if item['sku'] in existing]
+        if not items:
+            return
+        attnames = {field: model._meta.get_field(field).attname for field in fields}
+        current = {
+            row['id']: row for row in model.original_objects.filter(
+                id__in=[existing[item['sku']] for item in items]
+            ).values('id', *attnames.values())
+        }
+
+        now = timezone.now()
+        groups = {}
+        for item in items:
+            pk = existing[item['sku']]
+            values = item['fields']
+            changed = tuple(
+                field for field, attname in attnames.items()
+                if attname in values and values[attname] != current[pk][attname]
+            )
+            instance = model(id=pk, updated_at=now, import_fingerprint=item['fingerprint'], **values)
+            groups.setdefault(changed, []).append(instance)
+
+        for changed, instances in groups.items():
+            model.original_objects.bulk_update(
+                instances, changed + ('import_fingerprint', 'updated_at'), batch_size=self.batch_size
+            )
+
+    def _ids_by_sku(self, model, skus):
+        """
+        按SKU查询本租户记录的主键
+        :return: {sku: id}
+        """
+        return dict(
+            model.original_objects.filter(tenant=self.tenant, sku__in=list(skus)).values_list('sku', 'id')
+        )
+
+    # ------------------------------------------------------------------
+    # 分类、标签、属性查找
+    # ------------------------------------------------------------------
+
+    def ensure_lookups(self, categories=(), tags=(), attribute_values=()):
+        """
+        预先创建分类、标签、属性及属性值
+        并行导入时由主进程调用，避免多个工作进程并发创建同一条记录
+        :param categories: 分类路径集合
+        :param tags: 标签名集合
+        :param attribute_values: (属性名, 属性值) 集合
+        """
+        with transaction.atomic():
+            self.lookups.resolve(categories, tags, attribute_values)
+        self.lookups.rebuild_tree()
+
+    # ------------------------------------------------------------------
+    # 导入历史
+    # ------------------------------------------------------------------
+
+    def _record_progress(self, processed, stats, errors, checkpoint=None):
+        """
+        每批次更新一次导入历史计数，使用F表达式累加以支持多个进程同时写入
+        :param checkpoint: (字节偏移量, 行号)，顺序导入时记录
+        """
+        updates = {
+            'processed_rows': F('processed_rows') + processed,
+            'success_rows': F('success_rows') + stats['success'],
+            'error_rows': F('error_rows') + (processed - stats['success']),
+            'product_count': F('product_count') + stats['products'],
+            'variation_count': F('variation_count') + stats['variations'],
+            'created_rows': F('created_rows') + stats['created'],
+            'updated_rows': F('updated_rows') + stats['updated'],
+            'skipped_rows': F('skipped_rows') + stats['skipped'],
+            'updated_at': timezone.now(),
+        }
+        if checkpoint:
+            updates['checkpoint_offset'], updates['checkpoint_row'] = checkpoint
+        if errors:
+            lines = errors[:MAX_BATCH_ERRORS]
+            if len(errors) > MAX_BATCH_ERRORS:
+                lines.append(f"...本批次共{len(errors)}条错误")
+            updates['error_log'] = Concat(F('error_log'), Value('\n'.join(lines) + '\n'))
+        ImportHistory.objects.filter(pk=self.history.pk).update(**updates)
+
+    def set_status(self, status, error=None):
+        """
+        更新导入状态，完成时以已处理行数作为总行数
+        """
+        updates = {'status': status, 'updated_at': timezone.now()}
+        if status in ('completed', 'failed'):
+            updates['total_rows'] = F('processed_rows')
+        if error:
+            updates['error_log'] = Concat(F('error_log'), Value(error))
+        ImportHistory.objects.filter(pk=self.history.pk).update(**updates)
+        self.history.refresh_from_db()
@@ -0,0 +1,187 @@
+"""
+导入查找缓存模块
+导入开始时一次性预加载租户的分类、标签、属性和属性值，
+每个批次缺失的条目按层级批量创建，避免逐个单元格get_or_create
+"""
+from products import woocommerce as wc
+from products.models import Attribute, AttributeValue, Category, Tag
+
+
+def tenant_slug(tenant, value, max_length=100):
+    """
+    slug全局唯一，为租户数据追加租户ID后缀避免不同租户之间冲突
+    """
+    suffix = f"-{tenant.id}" if tenant else ''
+    return wc.make_slug(value, max_length=max_length - len(suffix)) + suffix
+
+
+class ImportLookupCache:
+    """
+    按租户缓存分类路径、标签、属性及属性值到主键的映射
+    分类按路径元组为键，标签、属性按名称生成的slug为键，属性值按(属性ID, slug)为键
+    """
+
+    def __init__(self, tenant):
+        """
+        :param tenant: Tenant实例或None
+        """
+        self.tenant = tenant
+        self.categories_created = False
+        self.reload()
+
+    def reload(self):
+        """
+        从数据库重新加载缓存，批次事务回滚后调用
+        """
+        self.categories = self._load_category_paths()
+        self.tags = {
+            wc.make_slug(name): pk
+            for pk, name in Tag.original_objects.filter(tenant=self.tenant).values_list('id', 'name')
+        }
+        self.attributes = {
+            wc.make_slug(name): pk
+            for pk, name in Attribute.original_objects.filter(tenant=self.tenant).values_list('id', 'name')
+        }
+        self.attribute_values = {
+            (attribute_id, slug): pk
+            for pk, attribute_id, slug in AttributeValue.original_objects.filter(
+                attribute_id__in=list(self.attributes.values())
+            ).values_list('id', 'attribute_id', 'slug')
+        }
+
+    def _load_category_paths(self):
+        """
+        一次查询加载租户全部分类，在内存中拼接出完整路径
+        :return: {('家具', '餐桌'): id}
+        """
+        paths = wc.build_category_paths(
+            Category.objects.filter(tenant=self.tenant).values_list('id', 'parent_id', 'name')
+        )
+        return {path: pk for pk, path in paths.items()}
+
+    # ------------------------------------------------------------------
+    # 查找
+    # ------------------------------------------------------------------
+
+    def category_id(self, path):
+        return self.categories[path]
+
+    def tag_id(self, name):
+        return self.tags[wc.make_slug(name)]
+
+    def attribute_id(self, name):
+        return self.attributes[wc.make_slug(name)]
+
+    def attribute_value_id(self, name, value):
+        return self.attribute_values[(self.attribute_id(name), wc.make_slug(value))]
+
+    # ------------------------------------------------------------------
+    # 批量创建
+    # ------------------------------------------------------------------
+
+    def resolve(self, categories=(), tags=(), attribute_values=()):
+        """
+        批量创建缓存中缺失的条目，调用方负责事务
+        :param categories: 分类路径集合
+        :param tags: 标签名集合
+        :param attribute_values: (属性名, 属性值) 集合
+        """
+        self._create_categories(categories)
+        self._create_tags(tags)
+        self._create_attribute_values(attribute_values)
+
+    def resolve_items(self, items):
+        """
+        为一个批次的导入条目创建缺失的查找项
+        :param items: 导入器解析后的条目列表
+        """
+        categories, tags, attribute_values = set(), set(), set()
+        for item in items:
+            categories.update(item.get('categories', ()))
+            tags.update(item.get('tags', ()))
+            for name, values in item['attributes']:
+                attribute_values.update((name, value) for value in values)
+        self.resolve(categories, tags, attribute_values)
+
+    def _create_categories(self, paths):
+        """
+        按层级批量创建缺失分类，父级先于子级
+        树结构字段先写入占位值，导入结束后由rebuild_tree统一重建
+        """
+        missing = set()
+        for path in paths:
+            for depth in range(1, len(path) + 1):
+                if path[:depth] not in self.categories:
+                    missing.add(path[:depth])
+        if not missing:
+            return
+
+        for depth in sorted({len(path) for path in missing}):
+            level = [path for path in missing if len(path) == depth]
+            slugs = {tenant_slug(self.tenant, '-'.join(path)): path for path in level}
+            Category.objects.bulk_create([
+                Category(
+                    tenant=self.tenant,
+                    parent_id=self.categories[path[:-1]] if depth > 1 else None,
+                    name=path[-1][:100],
+                    slug=slug,
+                    lft=0, rght=0, tree_id=0, level=depth - 1,
+                )
+                for slug, path in slugs.items()
+            ])
+            # MySQL的bulk_create不回填主键，按slug回查
+            for pk, slug in Category.objects.filter(slug__in=list(slugs)).values_list('id', 'slug'):
+                self.categories[slugs[slug]] = pk
+        self.categories_created = True
+
+    def _create_tags(self, names):
+        """
+        批量创建缺失标签
+        """
+        missing = {wc.make_slug(name): name for name in names if wc.make_slug(name) not in self.tags}
+        if not missing:
+            return
+        slugs = {tenant_slug(self.tenant, key): key for key in missing}
+        Tag.original_objects.bulk_create([
+            Tag(tenant=self.tenant, name=missing[key][:100], slug=slug) for slug, key in slugs.items()
+        ])
+        for pk, slug in Tag.original_objects.filter(slug__in=list(slugs)).values_list('id', 'slug'):
+            self.tags[slugs[slug]] = pk
+
+    def _create_attribute_values(self, attribute_values):
+        """
+        批量创建缺失属性及属性值
+        """
+        names = {wc.make_slug(name): name for name, _ in attribute_values}
+        missing = {key: name for key, name in names.items() if key not in self.attributes}
+        if missing:
+            slugs = {tenant_slug(self.tenant, key): key for key in missing}
+            Attribute.original_objects.bulk_create([
+                Attribute(tenant=self.tenant, name=missing[key][:100], slug=slug) for slug, key in slugs.items()
+            ])
+            for pk, slug in Attribute.original_objects.filter(slug__in=list(slugs)).values_list('id', 'slug'):
+                self.attributes[slugs[slug]] = pk
+
+        new_values = {}
+        for name, value in attribute_values:
+            key = (self.attribute_id(name), wc.make_slug(value))
+            if key not in self.attribute_values:
+                new_values[key] = value
+        if not new_values:
+            return
+        AttributeValue.original_objects.bulk_create([
+            AttributeValue(tenant=self.tenant, attribute_id=attribute_id, slug=slug, name=value[:100])
+            for (attribute_id, slug), value in new_values.items()
+        ])
+        for pk, attribute_id, slug in AttributeValue.original_objects.filter(
+            attribute_id__in={attribute_id for attribute_id, _ in new_values}
+        ).values_list('id', 'attribute_id', 'slug'):
+            self.attribute_values[(attribute_id, slug)] = pk
+
+    def rebuild_tree(self):
+        """
+        有新建分类时重建一次MPTT树结构
+        """
+        if self.categories_created:
+            Category.objects.rebuild()
+            self.categories_created = False
@@ -0,0 +1,57 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.models import User
+from imports.importer import DEFAULT_BATCH_SIZE, WooCommerceImporter
+from imports.models import ImportHistory
+from imports.parallel import ParallelWooCommerceImporter
+from imports.tasks import enqueue_import
+
+
+class Command(BaseCommand):
+    help = '从WooCommerce格式的CSV文件导入产品'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file_path', type=str, help='CSV文件路径')
+        parser.add_argument('--username', type=str, help='执行导入的用户名（产品归属该用户的租户）', required=True)
+        parser.add_argument('--batch-size', type=int, help='每批处理的行数', default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, help='并行工作进程数，大于1时按父产品SKU分片并行导入', default=1)
+        parser.add_argument('--background', action='store_true', help='提交到后台任务队列，由run_worker执行')
+
+    def handle(self, *args, **options):
+        file_path = os.path.abspath(options['file_path'])
+        if not os.path.exists(file_path):
+            raise CommandError(f'文件 "{file_path}" 不存在')
+
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'用户 "{options["username"]}" 不存在')
+
+        history = ImportHistory.objects.create(
+            user=user,
+            file_name=os.path.basename(file_path),
+            file_path=file_path,
+            format='woocommerce',
+        )
+        if options['background']:
+            job = enqueue_import(history, workers=options['workers'], batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'已提交导入任务 #{job.pk}，导入历史 #{history.pk}'))
+            return
+
+        if options['workers'] > 1:
+            importer = ParallelWooCommerceImporter(
+                history, workers=options['workers'], batch_size=options['batch_size']
+            )
+        else:
+            importer = WooCommerceImporter(history, batch_size=options['batch_size'])
+        history = importer.run()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'导入完成：共{history.processed_rows}行，成功{history.success_rows}行，'
+            f'失败{history.error_rows}行，新建产品{history.product_count}个，新建变体{history.variation_count}个；'
+            f'新建{history.created_rows}条，更新{history.updated_rows}条，未变化跳过{history.skipped_rows}条'
+        ))
+        if history.error_log:
+            self.stdout.write(self.style.WARNING(history.error_log))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from imports.importer import DEFAULT_BATCH_SIZE, WooCommerceImporter
+from imports.models import ImportHistory
+
+
+class Command(BaseCommand):
+    help = '继续处理因进程中断而停留在处理中状态的导入'
+
+    def add_arguments(self, parser):
+        parser.add_argument('history_ids', nargs='*', type=int, help='导入历史ID，不指定时处理全部处理中的导入')
+        parser.add_argument('--batch-size', type=int, help='每批处理的行数', default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        queryset = ImportHistory.objects.filter(status='processing').select_related('user__tenant')
+        if options['history_ids']:
+            queryset = queryset.filter(pk__in=options['history_ids'])
+
+        for history in queryset:
+            self.stdout.write(f'继续导入 #{history.pk} {history.file_name}，已处理{history.checkpoint_row}行')
+            try:
+                history = WooCommerceImporter(history, batch_size=options['batch_size']).run()
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'导入 #{history.pk} 失败: {e}'))
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f'导入 #{history.pk} 完成：共{history.processed_rows}行，成功{history.success_rows}行，失败{history.error_rows}行'
+            ))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imports', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importhistory',
+            name='created_rows',
+            field=models.IntegerField(default=0, help_text='新建的产品与变体数'),
+        ),
+        migrations.AddField(
+            model_name='importhistory',
+            name='skipped_rows',
+            field=models.IntegerField(default=0, help_text='内容未变化而跳过的产品与变体数'),
+        ),
+        migrations.AddField(
+            model_name='importhistory',
+            name='updated_rows',
+            field=models.IntegerField(default=0, help_text='内容有变化而更新的产品与变体数'),
+        ),
+    ]
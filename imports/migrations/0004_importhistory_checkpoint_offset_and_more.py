@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imports', '0003_importhistory_created_rows_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importhistory',
+            name='checkpoint_offset',
+            field=models.BigIntegerField(default=0, help_text='最近提交批次结束处的文件字节偏移量'),
+        ),
+        migrations.AddField(
+            model_name='importhistory',
+            name='checkpoint_row',
+            field=models.IntegerField(default=0, help_text='最近提交批次的最后行号'),
+        ),
+    ]
@@ -30,6 +30,11 @@ class ImportHistory(models.Model):
     error_rows = models.IntegerField(default=0)
     product_count = models.IntegerField(default=0)
     variation_count = models.IntegerField(default=0)
+    created_rows = models.IntegerField(default=0, help_text="新建的产品与变体数")
+    updated_rows = models.IntegerField(default=0, help_text="内容有变化而更新的产品与变体数")
+    skipped_rows = models.IntegerField(default=0, help_text="内容未变化而跳过的产品与变体数")
+    checkpoint_offset = models.BigIntegerField(default=0, help_text="最近提交批次结束处的文件字节偏移量")
+    checkpoint_row = models.IntegerField(default=0, help_text="最近提交批次的最后行号")
     error_log = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
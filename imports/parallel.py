@@ -0,0 +1,151 @@
+"""
+并行导入模块
+按父产品SKU将WooCommerce CSV行分组为互不依赖的工作单元，
+分片后交给进程池中的多个工作进程导入，结果累加到同一条导入历史
+"""
+import csv
+import logging
+import os
+import shutil
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.db import connections
+
+from products import woocommerce as wc
+from .importer import DEFAULT_BATCH_SIZE, WooCommerceImporter, iter_csv_rows
+from .models import ImportHistory
+
+logger = logging.getLogger('django')
+
+# 分片文件中记录原始行号的列
+ROW_NUMBER_COLUMN = '__row__'
+
+
+def group_key(row_number, row):
+    """
+    获取行所属的工作单元
+    变体归入父产品SKU所在单元，其他产品按自身SKU分组
+    """
+    if wc.clean(row.get('Type')).lower() == wc.VARIATION_TYPE:
+        return wc.clean(row.get('Parent'))
+    return wc.clean(row.get('SKU')) or f'row-{row_number}'
+
+
+def partition_rows(file_path, shard_count, work_dir):
+    """
+    流式读取CSV并按工作单元哈希写入分片文件，同一父产品的行总在同一分片且保持原有顺序
+    同时收集分类、标签与属性值，供主进程预先创建
+    :param file_path: CSV文件路径
+    :param shard_count: 分片数量
+    :param work_dir: 分片文件目录
+    :return: (分片文件路径列表, 词表字典)
+    """
+    vocabulary = {'categories': set(), 'tags': set(), 'attribute_values': set()}
+    paths = [os.path.join(work_dir, f'shard-{index}.csv') for index in range(shard_count)]
+    files = [open(path, 'w', newline='', encoding='utf-8') for path in paths]
+    try:
+        writers = None
+        for row_number, row in iter_csv_rows(file_path):
+            if writers is None:
+                fieldnames = list(row.keys()) + [ROW_NUMBER_COLUMN]
+                writers = [csv.DictWriter(f, fieldnames=fieldnames) for f in files]
+                for writer in writers:
+                    writer.writeheader()
+
+            shard = zlib.crc32(group_key(row_number, row).encode('utf-8')) % shard_count
+            writers[shard].writerow(dict(row, **{ROW_NUMBER_COLUMN: row_number}))
+
+            vocabulary['categories'].update(wc.parse_category_paths(row.get('Categories')))
+            vocabulary['tags'].update(wc.parse_list(row.get('Tags')))
+            for name, values in wc.parse_attributes(row):
+                vocabulary['attribute_values'].update((name, value) for value in values)
+    finally:
+        for f in files:
+            f.close()
+    return paths, vocabulary
+
+
+def iter_shard_rows(shard_path):
+    """
+    读取分片文件，还原原始行号
+    :return: 生成 (行号, 行字典) 元组
+    """
+    for _, row in iter_csv_rows(shard_path):
+        yield int(row.pop(ROW_NUMBER_COLUMN)), row
+
+
+def _init_worker():
+    """
+    工作进程初始化：以spawn/forkserver方式启动时需要重新加载Django
+    数据库连接在首次查询时按进程各自建立
+    """
+    if not apps.ready:
+        django.setup()
+
+
+def import_shard(history_id, shard_path, batch_size):
+    """
+    导入单个分片，在工作进程中执行
+    计数通过F表达式累加到同一条导入历史
+    """
+    history = ImportHistory.objects.select_related('user__tenant').get(pk=history_id)
+    WooCommerceImporter(history, batch_size=batch_size).import_rows(iter_shard_rows(shard_path))
+    return shard_path
+
+
+class ParallelWooCommerceImporter:
+    """
+    并行WooCommerce CSV导入器
+    用法：ParallelWooCommerceImporter(history, workers=4).run()
+    """
+
+    def __init__(self, history, workers=None, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        :param history: ImportHistory实例
+        :param workers: 工作进程数，默认为CPU核数
+        :param batch_size: 每批处理的行数
+        """
+        self.history = history
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.importer = WooCommerceImporter(history, batch_size=batch_size)
+
+    def run(self):
+        """
+        执行并行导入流程，并维护导入历史的状态
+        :return: 刷新后的ImportHistory实例
+        """
+        importer = self.importer
+        # 分片之间没有全局顺序，中断的并行导入无法按检查点继续，只能从头重新导入
+        if self.history.status == 'processing':
+            importer.reset_progress()
+        importer.set_status('processing')
+        work_dir = tempfile.mkdtemp(prefix=f'import-{self.history.pk}-')
+        try:
+            shard_paths, vocabulary = partition_rows(self.history.file_path, self.workers, work_dir)
+            importer.ensure_lookups(**vocabulary)
+
+            # 子进程必须建立自己的连接，先关闭当前进程的连接以免被继承共享
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as executor:
+                futures = [
+                    executor.submit(import_shard, self.history.pk, path, self.batch_size)
+                    for path in shard_paths
+                ]
+                for future in futures:
+                    future.result()
+
+            # 关联产品可能跨分片，全部分片完成后统一重建
+            importer.link_related_products(iter_csv_rows(self.history.file_path))
+        except Exception as e:
+            logger.exception(f"并行导入失败: {self.history.file_name}")
+            importer.set_status('failed', error=f"导入失败: {e}\n")
+            raise
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        importer.set_status('completed')
+        return self.history
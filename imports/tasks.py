@@ -0,0 +1,50 @@
+"""
+导入后台任务
+导入在worker进程中执行，不占用Web请求线程
+"""
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
+
+from jobs import broker
+from jobs.registry import register
+from .importer import DEFAULT_BATCH_SIZE, WooCommerceImporter
+from .models import ImportHistory
+from .parallel import ParallelWooCommerceImporter
+
+IMPORT_TASK = 'imports.woocommerce'
+
+
+def mark_import_failed(history_id, error, **params):
+    """
+    导入任务最终失败（如worker多次中断）时将未结束的导入历史标记为失败
+    """
+    ImportHistory.objects.filter(pk=history_id).exclude(status__in=('completed', 'failed')).update(
+        status='failed', error_log=Concat(F('error_log'), Value(f"导入失败: {error}\n")), updated_at=timezone.now(),
+    )
+
+
+@register(IMPORT_TASK, on_failure=mark_import_failed)
+def run_import(history_id, workers=1, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    执行导入任务
+    worker中断后任务被重新认领时，处于processing状态的导入从检查点继续
+    """
+    history = ImportHistory.objects.select_related('user__tenant').get(pk=history_id)
+    if history.status in ('completed', 'failed'):
+        return
+    if workers > 1:
+        ParallelWooCommerceImporter(history, workers=workers, batch_size=batch_size).run()
+    else:
+        WooCommerceImporter(history, batch_size=batch_size).run()
+
+
+def enqueue_import(history, workers=1, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    提交导入任务，导入历史保持pending状态直到worker开始执行
+    :return: Job实例
+    """
+    return broker.enqueue(
+        IMPORT_TASK, tenant=history.user.tenant,
+        history_id=history.pk, workers=workers, batch_size=batch_size,
+    )
@@ -0,0 +1,16 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task', 'tenant', 'status', 'attempts', 'worker', 'created_at', 'started_at', 'finished_at')
+    list_filter = ('status', 'task', 'created_at')
+    search_fields = ('task', 'worker', 'tenant__name')
+    readonly_fields = ('created_at', 'updated_at', 'started_at', 'finished_at', 'heartbeat_at')
+    fieldsets = (
+        (None, {'fields': ('task', 'params', 'tenant')}),
+        ('状态信息', {'fields': ('status', 'attempts', 'max_attempts', 'worker', 'heartbeat_at', 'available_at')}),
+        ('错误信息', {'fields': ('error',), 'classes': ('collapse',)}),
+        ('时间信息', {'fields': ('created_at', 'updated_at', 'started_at', 'finished_at'), 'classes': ('collapse',)}),
+    )
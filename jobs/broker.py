@@ -0,0 +1,157 @@
+"""
+任务队列模块
+以数据库表作为消息代理，不依赖Redis等外部服务。
+worker通过行锁认领任务，认领时按租户检查并发上限，
+长时间没有心跳的运行中任务视为worker已中断，重新放回队列
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from common.models import Tenant
+from .models import Job
+from .registry import get_failure_handler, get_task
+
+logger = logging.getLogger('django')
+
+DEFAULTS = {
+    # 每个租户同时运行的任务数上限
+    'TENANT_CONCURRENCY': 2,
+    # worker心跳间隔（秒）
+    'HEARTBEAT_INTERVAL': 30,
+    # 超过该时间（秒）没有心跳的运行中任务视为中断
+    'STALE_TIMEOUT': 300,
+    # 队列为空时worker的轮询间隔（秒）
+    'POLL_INTERVAL': 2,
+    # 每次认领时检查的待处理任务数
+    'CLAIM_BATCH': 20,
+}
+
+
+def get_setting(name):
+    """
+    读取settings.JOB_QUEUE中的配置，未配置时使用默认值
+    """
+    return getattr(settings, 'JOB_QUEUE', {}).get(name, DEFAULTS[name])
+
+
+def enqueue(task, tenant=None, max_attempts=None, **params):
+    """
+    提交任务
+    :param task: 已注册的任务名
+    :param tenant: 任务所属租户，用于并发限制与设置执行时的租户上下文
+    :param max_attempts: worker中断后最多重新执行的次数
+    :param params: 任务参数，需可JSON序列化
+    :return: Job实例
+    """
+    get_task(task)
+    job = Job(task=task, tenant=tenant, params=params)
+    if max_attempts is not None:
+        job.max_attempts = max_attempts
+    job.save()
+    return job
+
+
+def requeue_stale():
+    """
+    将心跳超时的运行中任务放回队列，超过最大次数的标记为失败
+    :return: 放回队列的任务数
+    """
+    deadline = timezone.now() - timedelta(seconds=get_setting('STALE_TIMEOUT'))
+    stale = Job.objects.filter(status='running', heartbeat_at__lt=deadline)
+    now = timezone.now()
+    error = 'worker中断且已达到最大执行次数'
+    exhausted = list(stale.filter(attempts__gte=F('max_attempts')))
+    if exhausted:
+        Job.objects.filter(pk__in=[job.pk for job in exhausted], status='running').update(
+            status='failed', error=error, finished_at=now, updated_at=now
+        )
+        for job in exhausted:
+            handle_failure(job, error)
+    count = stale.update(status='pending', worker='', updated_at=now)
+    if count:
+        logger.warning(f"{count}个中断的任务已重新放回队列")
+    return count
+
+
+def claim(worker_id):
+    """
+    认领一个可执行的任务
+    按提交顺序检查待处理任务，跳过已达到并发上限的租户。
+    租户行加锁后再统计运行中任务数，保证多个worker同时认领时不会超过上限
+    :param worker_id: worker标识
+    :return: Job实例或None
+    """
+    requeue_stale()
+    limit = get_setting('TENANT_CONCURRENCY')
+    now = timezone.now()
+    with transaction.atomic():
+        candidates = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', available_at__lte=now)
+            .order_by('available_at', 'id')[:get_setting('CLAIM_BATCH')]
+        )
+        full_tenants = set()
+        for job in candidates:
+            if job.tenant_id in full_tenants:
+                continue
+            if job.tenant_id is not None:
+                list(Tenant.objects.select_for_update().filter(pk=job.tenant_id))
+                running = Job.objects.filter(tenant_id=job.tenant_id, status='running').count()
+                if running >= limit:
+                    full_tenants.add(job.tenant_id)
+                    continue
+
+            job.status = 'running'
+            job.worker = worker_id
+            job.attempts += 1
+            job.started_at = job.heartbeat_at = now
+            job.save(update_fields=['status', 'worker', 'attempts', 'started_at', 'heartbeat_at', 'updated_at'])
+            return job
+    return None
+
+
+def heartbeat(job, worker_id):
+    """
+    刷新任务心跳
+    :return: 任务是否仍由该worker持有
+    """
+    now = timezone.now()
+    return bool(Job.objects.filter(pk=job.pk, status='running', worker=worker_id).update(
+        heartbeat_at=now, updated_at=now
+    ))
+
+
+def complete(job):
+    """
+    标记任务完成
+    """
+    now = timezone.now()
+    Job.objects.filter(pk=job.pk).update(status='completed', finished_at=now, updated_at=now)
+
+
+def fail(job, error):
+    """
+    标记任务失败
+    任务函数抛出的异常不重试，重试只用于worker中断的情况
+    """
+    now = timezone.now()
+    Job.objects.filter(pk=job.pk).update(status='failed', error=error, finished_at=now, updated_at=now)
+    handle_failure(job, error)
+
+
+def handle_failure(job, error):
+    """
+    调用任务登记的失败处理函数，更新任务关联的业务记录；处理函数出错只记录日志
+    """
+    handler = get_failure_handler(job.task)
+    if handler is None:
+        return
+    try:
+        handler(error=error, **job.params)
+    except Exception:
+        logger.exception(f"任务失败处理出错 {job}")
@@ -0,0 +1,26 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = '启动后台任务worker，从数据库任务队列中认领并执行导入导出等任务'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--worker-id', type=str, help='worker标识，默认为 主机名:进程号')
+        parser.add_argument('--poll-interval', type=float, help='队列为空时的轮询间隔（秒）')
+        parser.add_argument('--once', action='store_true', help='执行完队列中可执行的任务后退出')
+
+    def handle(self, *args, **options):
+        worker = Worker(worker_id=options['worker_id'], poll_interval=options['poll_interval'])
+
+        # 收到终止信号时执行完当前任务再退出，便于滚动部署
+        def shutdown(signum, frame):
+            self.stdout.write(self.style.WARNING('收到终止信号，当前任务完成后退出'))
+            worker.stop()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        worker.run(once=options['once'])
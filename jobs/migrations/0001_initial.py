@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:13
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('common', '0003_tenant_is_deleted'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(help_text='已注册的任务名', max_length=100)),
+                ('params', models.JSONField(blank=True, default=dict, help_text='任务参数')),
+                ('status', models.CharField(choices=[('pending', '待处理'), ('running', '运行中'), ('completed', '已完成'), ('failed', '失败')], default='pending', max_length=20)),
+                ('attempts', models.IntegerField(default=0, help_text='已认领次数')),
+                ('max_attempts', models.IntegerField(default=3, help_text='worker中断后最多重新执行的次数')),
+                ('worker', models.CharField(blank=True, help_text='当前处理该任务的worker标识', max_length=100)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, help_text='最早可执行时间')),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='common.tenant')),
+            ],
+            options={
+                'verbose_name': '后台任务',
+                'verbose_name_plural': '后台任务',
+                'db_table': 'jobs',
+                'indexes': [models.Index(fields=['status', 'available_at'], name='jobs_status_6e4bf5_idx'), models.Index(fields=['tenant', 'status'], name='jobs_tenant__a46df1_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import models
+from django.utils import timezone
+from common.models import Tenant
+
+
+class Job(models.Model):
+    """
+    后台任务
+    数据库表即任务队列，worker进程轮询认领待处理的任务
+    """
+    STATUS_CHOICES = (
+        ('pending', '待处理'),
+        ('running', '运行中'),
+        ('completed', '已完成'),
+        ('failed', '失败'),
+    )
+
+    task = models.CharField(max_length=100, help_text="已注册的任务名")
+    params = models.JSONField(default=dict, blank=True, help_text="任务参数")
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0, help_text="已认领次数")
+    max_attempts = models.IntegerField(default=3, help_text="worker中断后最多重新执行的次数")
+    worker = models.CharField(max_length=100, blank=True, help_text="当前处理该任务的worker标识")
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now, help_text="最早可执行时间")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'jobs'
+        verbose_name = '后台任务'
+        verbose_name_plural = '后台任务'
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+            models.Index(fields=['tenant', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.task}#{self.pk} ({self.status})"
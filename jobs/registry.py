@@ -0,0 +1,43 @@
+"""
+任务注册模块
+各应用在tasks模块中用register装饰器登记可由worker执行的函数，
+任务表中只保存任务名，避免执行任意导入路径
+"""
+
+_tasks = {}
+_failure_handlers = {}
+
+
+def register(name, on_failure=None):
+    """
+    注册任务的装饰器
+    :param name: 任务名，例如 "imports.woocommerce"
+    :param on_failure: 任务最终失败时调用的函数，参数为任务参数与error，
+                       用于更新任务关联的业务记录（如导入历史），需可重复调用
+    """
+    def decorator(func):
+        if name in _tasks and _tasks[name] is not func:
+            raise ValueError(f"任务 {name} 重复注册")
+        _tasks[name] = func
+        if on_failure is not None:
+            _failure_handlers[name] = on_failure
+        return func
+    return decorator
+
+
+def get_failure_handler(name):
+    """
+    获取任务的失败处理函数，未登记时返回None
+    """
+    return _failure_handlers.get(name)
+
+
+def get_task(name):
+    """
+    按名称获取任务函数
+    :raises KeyError: 任务未注册
+    """
+    try:
+        return _tasks[name]
+    except KeyError:
+        raise KeyError(f"任务 {name} 未注册")
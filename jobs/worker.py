@@ -0,0 +1,100 @@
+"""
+任务执行模块
+worker进程循环认领并执行任务，执行期间由后台线程定时刷新心跳
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+
+from django.db import close_old_connections, connection
+
+from common.tenant_middleware import tenant_context
+from . import broker
+from .registry import get_task
+
+logger = logging.getLogger('django')
+
+
+class Heartbeat(threading.Thread):
+    """
+    心跳线程，在独立的数据库连接中定时刷新任务心跳
+    """
+
+    def __init__(self, job, worker_id, interval):
+        super().__init__(daemon=True)
+        self.job = job
+        self.worker_id = worker_id
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                broker.heartbeat(self.job, self.worker_id)
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class Worker:
+    """
+    任务worker
+    用法：Worker().run()
+    """
+
+    def __init__(self, worker_id=None, poll_interval=None):
+        """
+        :param worker_id: worker标识，默认为 主机名:进程号
+        :param poll_interval: 队列为空时的轮询间隔（秒）
+        """
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_interval = poll_interval or broker.get_setting('POLL_INTERVAL')
+        self.stopped = False
+
+    def run(self, once=False):
+        """
+        循环认领并执行任务
+        :param once: 为True时执行完当前队列中可执行的任务后退出
+        """
+        logger.info(f"worker {self.worker_id} 已启动")
+        while not self.stopped:
+            close_old_connections()
+            job = broker.claim(self.worker_id)
+            if job is None:
+                if once:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+            self.execute(job)
+        logger.info(f"worker {self.worker_id} 已退出")
+
+    def stop(self):
+        """
+        当前任务执行完后退出
+        """
+        self.stopped = True
+
+    def execute(self, job):
+        """
+        执行单个任务，在任务所属租户的上下文中运行
+        """
+        logger.info(f"开始执行任务 {job}")
+        heartbeat = Heartbeat(job, self.worker_id, broker.get_setting('HEARTBEAT_INTERVAL'))
+        heartbeat.start()
+        try:
+            with tenant_context(job.tenant):
+                get_task(job.task)(**job.params)
+        except Exception:
+            logger.exception(f"任务执行失败 {job}")
+            broker.fail(job, traceback.format_exc())
+        else:
+            broker.complete(job)
+            logger.info(f"任务执行完成 {job}")
+        finally:
+            heartbeat.stop()
@@ -52,6 +52,8 @@ INSTALLED_APPS = [
     'products',
     'exports',
     'imports',
+    'jobs',
+    'search',
     'django_json_widget',
 ]
 
@@ -213,7 +215,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'common.renderers.FastJSONRenderer',  # orjson渲染器，未安装orjson时回退到JSONRenderer
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_PAGINATION_CLASS': 'common.pagination.StandardPagination',
@@ -221,7 +223,7 @@ REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'common.middleware.custom_exception_handler',
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',  # 使用drf-spectacular
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'common.parsers.FastJSONParser',  # orjson解析器，未安装orjson时回退到JSONParser
         'rest_framework.parsers.FormParser',
         'rest_framework.parsers.MultiPartParser',
     ],
@@ -324,3 +326,63 @@ CORS_ALLOW_HEADERS = [
     'x-csrftoken',
     'x-requested-with',
 ]
+
+# 后台任务队列配置（数据库表作为消息代理）
+JOB_QUEUE = {
+    'TENANT_CONCURRENCY': 2,  # 每个租户同时运行的任务数上限
+    'HEARTBEAT_INTERVAL': 30,  # worker心跳间隔（秒）
+    'STALE_TIMEOUT': 300,  # 超过该时间没有心跳的任务视为worker中断，重新放回队列
+    'POLL_INTERVAL': 2,  # 队列为空时的轮询间隔（秒）
+}
+
+# 导出文件缓存配置（按内容寻址复用已生成的导出文件）
+EXPORT_ARTIFACTS = {
+    'DIR': os.path.join('exports', 'artifacts'),  # 存放目录（相对MEDIA_ROOT）
+    'COMPRESS': True,  # 同时保存gzip副本，下载时按Accept-Encoding返回
+}
+
+# JWT令牌验证缓存配置
+AUTH_TOKEN_CACHE = {
+    'LOCAL_TTL': 60,  # 进程内缓存条目有效期（秒）
+    'LOCAL_MAX_ENTRIES': 10000,  # 进程内最多缓存的令牌数
+    'SHARED_ALIAS': None,  # 共享缓存别名（CACHES中的键，如Redis），多进程部署时配置后令牌失效立即生效
+    'SHARED_TTL': 300,  # 共享缓存条目有效期上限（秒）
+}
+
+# JWT认证模式配置
+JWT_AUTH = {
+    'STATELESS': False,  # 无状态模式：令牌不写入user_tokens表，只校验签名、过期时间与吊销列表
+    'REVOCATION_SYNC_INTERVAL': 30,  # 无状态模式下吊销列表的同步间隔（秒）
+    'TOKEN_RETENTION_DAYS': 7,  # 令牌记录过期后的保留天数，超过后由purge_tokens命令清理
+    'SESSION_LOGIN': True,  # 登录时同时建立Django会话；纯令牌客户端可关闭，减少会话表写入
+}
+
+# 租户缓存配置
+TENANT_CACHE = {
+    'LOCAL_TTL': 60,  # 进程内租户缓存有效期（秒）
+    'LOCAL_MAX_ENTRIES': 1000,  # 进程内最多缓存的租户数
+    'SHARED_ALIAS': None,  # 保存租户版本号的缓存别名，多进程部署时配置后租户状态变更立即生效
+}
+
+# API响应中间件配置
+API_RESPONSE = {
+    'WRAP_MAX_BYTES': 1024 * 1024,  # 超过该字节数的JsonResponse原样返回，不转换为标准格式
+}
+
+# 分页计数缓存配置
+COUNT_CACHE = {
+    'ALIAS': 'default',  # 使用的缓存别名，多进程部署时应为共享缓存（如Redis）
+    'TTL': 30,  # 计数缓存有效期（秒），不触发信号的批量写入最多在此时间后反映到总数
+}
+
+# 产品搜索配置
+PRODUCT_SEARCH = {
+    'BACKEND': None,  # 搜索后端类路径，为None时MySQL使用FULLTEXT（ngram）后端，其他数据库使用LIKE后端
+    'MAX_TERMS': 10,  # 查询最多使用的词数
+    # 以下用于search.inverted_index.InvertedIndexBackend（进程内倒排索引）
+    'INDEX_SNAPSHOT_DIR': os.path.join(BASE_DIR, 'search_index'),  # 快照目录，worker启动后从快照加载
+    'INDEX_SNAPSHOT_INTERVAL': 600,  # 索引有更新时重写快照的最短间隔（秒）
+    'INDEX_SYNC_INTERVAL': 30,  # 倒排索引与分面索引从文档表增量同步的间隔（秒）
+    'INDEX_MAX_IDS': 5000,  # 匹配产品超过该数量时改用文档表查询
+    'FACET_PRICE_RANGES': (0, 100, 500, 1000, 5000, 10000),  # 分面统计的价格区间下限
+}
@@ -43,6 +43,12 @@ urlpatterns = [
     # 通用模块（包含租户管理）
     path(f'{API_V1_PREFIX}common/', include('common.urls')),
     
+    # 产品模块
+    path(f'{API_V1_PREFIX}products/', include('products.urls')),
+    
+    # 导出模块
+    path(f'{API_V1_PREFIX}exports/', include('exports.urls')),
+    
     # 其他应用
     path('doclist/', include('docs.urls')),  # 文档应用路径改为/doclist
     
@@ -2,6 +2,9 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.db.models import Count
 from mptt.admin import MPTTModelAdmin, DraggableMPTTAdmin
+from search.backends import get_search_backend
+from search.indexing import index_products
+from .categories import category_product_counts
 from .models import (
     Category, Tag, Product, ProductImage, 
     Attribute, AttributeValue, ProductAttribute, 
@@ -64,8 +67,9 @@ class CategoryAdmin(DraggableMPTTAdmin):
     readonly_fields = ('created_at', 'updated_at')
 
     def get_product_count(self, obj):
-        return obj.products.count()
-    get_product_count.short_description = '产品数量'
+        # 按租户缓存的统计，整页只计算一次
+        return category_product_counts(obj.tenant_id).get(obj.pk, 0)
+    get_product_count.short_description = '产品数量（含子分类）'
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
@@ -87,6 +91,7 @@ class TagAdmin(admin.ModelAdmin):
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('name', 'sku', 'get_categories', 'type', 'status', 'price', 'stock_status', 'get_images_count', 'get_variations_count', 'featured', 'created_at')
     list_filter = ('type', 'status', 'featured', 'catalog_visibility', 'stock_status', 'categories', 'tags', 'created_at', 'updated_at')
+    # 实际搜索由get_search_results使用搜索后端完成，此处用于显示搜索框
     search_fields = ('name', 'sku', 'vl_id', 'short_description', 'description', 'categories__name', 'tags__name')
     prepopulated_fields = {'slug': ('name',)}
     date_hierarchy = 'created_at'
@@ -96,6 +101,14 @@ class ProductAdmin(admin.ModelAdmin):
     list_per_page = 50
     actions = ['make_published', 'make_draft', 'mark_as_featured', 'unmark_as_featured']
     
+    def get_search_results(self, request, queryset, search_term):
+        """
+        使用搜索后端查询产品搜索文档，不再逐字段icontains并连接分类、标签表
+        """
+        if not search_term:
+            return queryset, False
+        return get_search_backend().filter(queryset, search_term), False
+
     fieldsets = (
         ('基本信息', {
             'fields': ('name', 'slug', 'sku', 'vl_id', 'type', 'status', 'featured', 'get_primary_image')
@@ -157,18 +170,22 @@ class ProductAdmin(admin.ModelAdmin):
 
     def make_published(self, request, queryset):
         queryset.update(status='published')
+        index_products(queryset.values_list('pk', flat=True))
     make_published.short_description = "将所选产品标记为已发布"
 
     def make_draft(self, request, queryset):
         queryset.update(status='draft')
+        index_products(queryset.values_list('pk', flat=True))
     make_draft.short_description = "将所选产品标记为草稿"
 
     def mark_as_featured(self, request, queryset):
         queryset.update(featured=True)
+        index_products(queryset.values_list('pk', flat=True))
     mark_as_featured.short_description = "将所选产品标记为精选"
 
     def unmark_as_featured(self, request, queryset):
         queryset.update(featured=False)
+        index_products(queryset.values_list('pk', flat=True))
     unmark_as_featured.short_description = "取消所选产品的精选标记"
 
 @admin.register(ProductImage)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
+
+    def ready(self):
+        # 注册分类移动时使分类产品数缓存失效的信号处理
+        from . import categories  # noqa: F401
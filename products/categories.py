@@ -0,0 +1,106 @@
+"""
+分类树查询模块
+按分类过滤产品时包含全部子孙分类：MPTT中子孙分类与祖先在同一棵树（tree_id）中，
+lft落在祖先的[lft, rght]范围内，因此通过分类多对多关系表连接分类表、按范围过滤即可，
+不需要在Python中遍历get_descendants()
+"""
+import logging
+
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.dispatch import receiver
+from mptt.signals import node_moved
+
+from common.count_cache import count_cache, get_setting
+
+from .models import Category, Product
+
+logger = logging.getLogger('django')
+
+KEY_PREFIX = 'category_counts'
+
+
+def subtree_condition(categories, prefix=''):
+    """
+    分类及其子孙分类的条件
+    :param categories: 分类实例列表，需已加载tree_id、lft、rght
+    :param prefix: 分类字段的前缀，如'category__'
+    :return: Q对象，categories为空时返回None
+    """
+    condition = None
+    for category in categories:
+        q = Q(**{
+            f'{prefix}tree_id': category.tree_id,
+            f'{prefix}lft__gte': category.lft,
+            f'{prefix}lft__lte': category.rght,
+        })
+        condition = q if condition is None else condition | q
+    return condition
+
+
+def filter_by_categories(queryset, categories):
+    """
+    过滤属于指定分类或其子孙分类的产品
+    使用关系表子查询，产品属于多个子孙分类时不产生重复行
+    :param categories: 分类实例列表
+    """
+    condition = subtree_condition(categories, 'category__')
+    if condition is None:
+        return queryset.none()
+    return queryset.filter(pk__in=Product.categories.through.objects.filter(condition).values('product_id'))
+
+
+def subtree_category_ids(categories):
+    """
+    分类及其子孙分类的ID列表，categories为空时返回空列表
+    """
+    condition = subtree_condition(categories)
+    if condition is None:
+        return []
+    return list(Category.objects.filter(condition).values_list('pk', flat=True))
+
+
+def subtree_product_count():
+    """
+    分类含子孙分类的产品数注解，同一产品只计一次
+    """
+    counts = (
+        Product.categories.through.objects.filter(
+            category__tree_id=OuterRef('tree_id'),
+            category__lft__gte=OuterRef('lft'),
+            category__lft__lte=OuterRef('rght'),
+        )
+        .order_by().values('category__tree_id')
+        .annotate(count=Count('product_id', distinct=True)).values('count')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def category_product_counts(tenant_id):
+    """
+    租户各分类含子孙分类的产品数，使用计数缓存
+    产品、分类以及两者关系的变更使缓存失效（见common.count_cache），分类移动见下方信号处理
+    :param tenant_id: 租户ID，为None时统计不属于任何租户的分类
+    :return: {分类ID: 产品数}
+    """
+    versions = (count_cache.get_version(Product, tenant_id), count_cache.get_version(Category, tenant_id))
+    key = f'{KEY_PREFIX}:{tenant_id}'
+    cached = count_cache.cache.get(key)
+    if cached is not None and cached[0] == versions:
+        return cached[1]
+
+    counts = dict(
+        Category.objects.filter(tenant_id=tenant_id)
+        .annotate(product_count=subtree_product_count())
+        .values_list('id', 'product_count')
+    )
+    count_cache.cache.set(key, (versions, counts), get_setting('TTL'))
+    return counts
+
+
+@receiver(node_moved, sender=Category, dispatch_uid='category_counts_invalidate_on_move')
+def invalidate_counts_on_move(sender, instance, **kwargs):
+    """
+    移动分类通过批量更新lft、rght完成，不触发post_save
+    """
+    count_cache.invalidate(Category, instance.tenant_id)
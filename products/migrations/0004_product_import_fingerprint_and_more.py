@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_alter_attribute_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='import_fingerprint',
+            field=models.CharField(blank=True, editable=False, help_text='最近一次导入的CSV行摘要，用于跳过未变化的行', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='productvariation',
+            name='import_fingerprint',
+            field=models.CharField(blank=True, editable=False, help_text='最近一次导入的CSV行摘要，用于跳过未变化的行', max_length=32),
+        ),
+    ]
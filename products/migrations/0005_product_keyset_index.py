@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0003_tenant_is_deleted'),
+        ('products', '0004_product_import_fingerprint_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['tenant', 'menu_order', '-created_at', '-id'], name='products_keyset_idx'),
+        ),
+    ]
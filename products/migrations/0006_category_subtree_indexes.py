@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:22
+
+from django.db import migrations, models
+
+# 自动生成的多对多关系表不能在Meta中声明索引，由迁移直接创建
+CATEGORY_PRODUCT_INDEX = models.Index(fields=['category', 'product'], name='products_categories_cat_idx')
+
+
+def category_through(apps):
+    return apps.get_model('products', 'Product')._meta.get_field('categories').remote_field.through
+
+
+def create_category_product_index(apps, schema_editor):
+    """
+    按分类查产品时从(category_id, product_id)索引直接取得产品ID，不再回表
+    """
+    schema_editor.add_index(category_through(apps), CATEGORY_PRODUCT_INDEX)
+
+
+def drop_category_product_index(apps, schema_editor):
+    schema_editor.remove_index(category_through(apps), CATEGORY_PRODUCT_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0003_tenant_is_deleted'),
+        ('products', '0005_product_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['tree_id', 'lft'], name='categories_tree_lft_idx'),
+        ),
+        migrations.RunPython(create_category_product_index, drop_category_product_index),
+    ]
@@ -21,6 +21,10 @@ class Category(MPTTModel, BaseModel):
         db_table = 'categories'
         verbose_name = '产品分类'
         verbose_name_plural = '产品分类'
+        indexes = [
+            # 子孙分类按tree_id与lft范围查询（见products.categories），与MPTT默认添加的索引字段相同
+            models.Index(fields=['tree_id', 'lft'], name='categories_tree_lft_idx'),
+        ]
         
     class MPTTMeta:
         order_insertion_by = ['name']
@@ -74,6 +78,7 @@ class Product(BaseModel):
     slug = models.SlugField(max_length=255, unique=True)
     sku = models.CharField(max_length=100, unique=True)
     vl_id = models.CharField(max_length=100, blank=True, null=True)
+    import_fingerprint = models.CharField(max_length=32, blank=True, editable=False, help_text="最近一次导入的CSV行摘要，用于跳过未变化的行")
     type = models.CharField(max_length=20, choices=TYPE_CHOICES, default='simple')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
     featured = models.BooleanField(default=False)
@@ -113,6 +118,10 @@ class Product(BaseModel):
         verbose_name = '产品'
         verbose_name_plural = '产品'
         ordering = ['menu_order', '-created_at']
+        indexes = [
+            # 租户内按默认排序的键集分页，见common.pagination.KeysetPagination
+            models.Index(fields=['tenant', 'menu_order', '-created_at', '-id'], name='products_keyset_idx'),
+        ]
         
     def __str__(self):
         return self.name
@@ -203,6 +212,7 @@ class ProductVariation(BaseModel):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='variations')
     sku = models.CharField(max_length=100, unique=True)
     vl_id = models.CharField(max_length=100, blank=True, null=True)
+    import_fingerprint = models.CharField(max_length=32, blank=True, editable=False, help_text="最近一次导入的CSV行摘要，用于跳过未变化的行")
     name = models.CharField(max_length=255, blank=True)
     description = models.TextField(blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
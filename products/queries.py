@@ -0,0 +1,81 @@
+"""
+产品查询计划模块
+按接口定义产品查询需要加载的列、关联与注解，列表与详情的数据都在固定次数的查询内取得
+"""
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import (
+    Category, Product, ProductAttribute, ProductImage, ProductVariation, Tag, VariationAttribute,
+)
+
+# 列表接口加载的产品列，不加载描述等大文本字段
+PRODUCT_LIST_FIELDS = (
+    'id', 'tenant', 'name', 'slug', 'sku', 'type', 'status', 'featured', 'catalog_visibility',
+    'price', 'regular_price', 'sale_price', 'stock_quantity', 'stock_status', 'menu_order',
+    'created_at', 'updated_at',
+)
+
+
+def variation_count():
+    """
+    变体数量注解，使用相关子查询，避免与分类等多对多过滤的连接相乘并省去GROUP BY
+    """
+    counts = (
+        ProductVariation.original_objects.filter(product=OuterRef('pk'))
+        .order_by().values('product').annotate(count=Count('pk')).values('count')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def product_list_queryset(queryset=None):
+    """
+    列表接口的查询计划：
+    1条产品查询（含变体数量注解），分类、标签与主图各1条预取查询
+    """
+    queryset = Product.objects.all() if queryset is None else queryset
+    return queryset.only(*PRODUCT_LIST_FIELDS).annotate(
+        variation_count=variation_count(),
+    ).prefetch_related(
+        Prefetch('categories', queryset=Category.objects.only('id', 'name', 'slug')),
+        Prefetch('tags', queryset=Tag.original_objects.only('id', 'name', 'slug')),
+        Prefetch(
+            'images',
+            queryset=ProductImage.original_objects.filter(is_featured=True).only(
+                'id', 'product', 'image', 'image_url', 'alt_text', 'is_featured', 'order'
+            ),
+            to_attr='featured_images',
+        ),
+    )
+
+
+def product_detail_queryset(queryset=None):
+    """
+    详情接口的查询计划：产品、分类、标签、图片、产品属性（连同属性）、变体、
+    变体属性（连同属性与属性值）、追加销售与交叉销售各1条查询
+    """
+    queryset = Product.objects.all() if queryset is None else queryset
+    return queryset.prefetch_related(
+        Prefetch('categories', queryset=Category.objects.only('id', 'name', 'slug')),
+        Prefetch('tags', queryset=Tag.original_objects.only('id', 'name', 'slug')),
+        Prefetch('images', queryset=ProductImage.original_objects.all()),
+        Prefetch(
+            'product_attributes',
+            queryset=ProductAttribute.original_objects.select_related('attribute').only(
+                'product', 'used_for_variations', 'attribute__id', 'attribute__name', 'attribute__slug'
+            ),
+        ),
+        Prefetch(
+            'variations',
+            queryset=ProductVariation.original_objects.prefetch_related(
+                Prefetch(
+                    'attributes',
+                    queryset=VariationAttribute.original_objects.select_related('attribute', 'value').only(
+                        'variation', 'attribute__name', 'value__name'
+                    ),
+                ),
+            ),
+        ),
+        Prefetch('upsell_products', queryset=Product.original_objects.only('id')),
+        Prefetch('cross_sell_products', queryset=Product.original_objects.only('id')),
+    )
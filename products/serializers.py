@@ -0,0 +1,138 @@
+"""
+产品相关序列化器
+列表与详情使用不同的序列化器，列表只输出卡片所需的字段，
+所需数据由products.queries中对应的查询计划一次性加载
+"""
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
+from rest_framework import serializers
+
+from .models import (
+    Attribute, Category, Product, ProductAttribute, ProductImage, ProductVariation, Tag, VariationAttribute,
+)
+
+
+class CategorySummarySerializer(serializers.ModelSerializer):
+    """
+    分类摘要序列化器
+    """
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'slug']
+
+
+class TagSummarySerializer(serializers.ModelSerializer):
+    """
+    标签摘要序列化器
+    """
+    class Meta:
+        model = Tag
+        fields = ['id', 'name', 'slug']
+
+
+class ProductImageSerializer(serializers.ModelSerializer):
+    """
+    产品图片序列化器
+    """
+    url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProductImage
+        fields = ['id', 'url', 'alt_text', 'is_featured', 'order']
+
+    @extend_schema_field(OpenApiTypes.URI)
+    def get_url(self, obj):
+        """
+        上传的图片优先，否则使用导入的外部图片URL
+        """
+        return obj.image.url if obj.image else obj.image_url
+
+
+class ProductListSerializer(serializers.ModelSerializer):
+    """
+    产品列表序列化器
+    依赖查询计划提供的featured_images（预取的主图列表）与variation_count（变体数量注解）
+    """
+    categories = CategorySummarySerializer(many=True, read_only=True)
+    tags = TagSummarySerializer(many=True, read_only=True)
+    featured_image = serializers.SerializerMethodField()
+    variation_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'name', 'slug', 'sku', 'type', 'status', 'featured', 'catalog_visibility',
+            'price', 'regular_price', 'sale_price', 'stock_quantity', 'stock_status', 'menu_order',
+            'categories', 'tags', 'featured_image', 'variation_count', 'created_at', 'updated_at',
+        ]
+
+    @extend_schema_field(ProductImageSerializer(allow_null=True))
+    def get_featured_image(self, obj):
+        images = obj.featured_images
+        return ProductImageSerializer(images[0]).data if images else None
+
+
+class AttributeSummarySerializer(serializers.ModelSerializer):
+    """
+    属性摘要序列化器
+    """
+    class Meta:
+        model = Attribute
+        fields = ['id', 'name', 'slug']
+
+
+class ProductAttributeSerializer(serializers.ModelSerializer):
+    """
+    产品属性序列化器
+    """
+    attribute = AttributeSummarySerializer(read_only=True)
+
+    class Meta:
+        model = ProductAttribute
+        fields = ['attribute', 'used_for_variations']
+
+
+class VariationAttributeSerializer(serializers.ModelSerializer):
+    """
+    变体属性序列化器
+    """
+    attribute_id = serializers.IntegerField(read_only=True)
+    attribute = serializers.CharField(source='attribute.name', read_only=True)
+    value_id = serializers.IntegerField(read_only=True)
+    value = serializers.CharField(source='value.name', read_only=True)
+
+    class Meta:
+        model = VariationAttribute
+        fields = ['attribute_id', 'attribute', 'value_id', 'value']
+
+
+class ProductVariationSerializer(serializers.ModelSerializer):
+    """
+    产品变体序列化器
+    """
+    attributes = VariationAttributeSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ProductVariation
+        fields = [
+            'id', 'sku', 'name', 'description', 'price', 'regular_price', 'sale_price',
+            'sale_price_start_date', 'sale_price_end_date', 'stock_quantity', 'stock_status',
+            'weight', 'length', 'width', 'height', 'image', 'is_default', 'sort_order', 'attributes',
+        ]
+
+
+class ProductDetailSerializer(serializers.ModelSerializer):
+    """
+    产品详情序列化器
+    """
+    categories = CategorySummarySerializer(many=True, read_only=True)
+    tags = TagSummarySerializer(many=True, read_only=True)
+    images = ProductImageSerializer(many=True, read_only=True)
+    product_attributes = ProductAttributeSerializer(many=True, read_only=True)
+    variations = ProductVariationSerializer(many=True, read_only=True)
+    upsell_ids = serializers.PrimaryKeyRelatedField(source='upsell_products', many=True, read_only=True)
+    cross_sell_ids = serializers.PrimaryKeyRelatedField(source='cross_sell_products', many=True, read_only=True)
+
+    class Meta:
+        model = Product
+        exclude = ['tenant', 'is_deleted', 'import_fingerprint', 'upsell_products', 'cross_sell_products']
@@ -0,0 +1,13 @@
+"""
+产品模块URL配置
+"""
+from django.urls import path
+from . import views
+
+app_name = 'products'
+
+urlpatterns = [
+    path('', views.ProductListAPIView.as_view(), name='product_list'),
+    path('<int:pk>/', views.ProductDetailAPIView.as_view(), name='product_detail'),
+    path('categories/<int:pk>/products/', views.CategoryProductListAPIView.as_view(), name='category_product_list'),
+]
@@ -1,3 +1,325 @@
-from django.shortcuts import render
+"""
+产品模块视图
+提供产品列表与详情API
+"""
+from decimal import Decimal, InvalidOperation
 
-# Create your views here.
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
+
+from common.exceptions import ResourceNotFoundException, ValidationException
+from common.pagination import StandardPagination
+from common.permissions import IsAuthenticated
+from common.tenant_middleware import get_current_tenant
+from common.views import BaseAPIView, BaseListAPIView
+from search.backends import get_search_backend
+from search.facets import facet_index
+from users.authentication import JWTAuthentication
+
+from .categories import category_product_counts, filter_by_categories, subtree_category_ids
+from .models import AttributeValue, Category, Product, VariationAttribute
+from .queries import product_detail_queryset, product_list_queryset
+from .serializers import ProductDetailSerializer, ProductListSerializer
+
+# 列表允许的排序字段
+PRODUCT_SORT_FIELDS = ('name', 'sku', 'price', 'stock_quantity', 'menu_order', 'created_at', 'updated_at')
+
+# 列表的查询参数，分类产品列表共用
+PRODUCT_LIST_PARAMETERS = [
+    OpenApiParameter(name='page', type=OpenApiTypes.INT, description='页码，默认1', required=False),
+    OpenApiParameter(name='per_page', type=OpenApiTypes.INT, description='每页条数，默认10，最大100', required=False),
+    OpenApiParameter(name='search', type=OpenApiTypes.STR, description='搜索关键词，匹配名称、SKU、VL ID、GTIN、品牌、描述以及标签与分类名称', required=False),
+    OpenApiParameter(
+        name='type', type=OpenApiTypes.STR, required=False,
+        description=f"产品类型，可选{'、'.join(choice[0] for choice in Product.TYPE_CHOICES)}",
+    ),
+    OpenApiParameter(
+        name='status', type=OpenApiTypes.STR, required=False,
+        description=f"产品状态，可选{'、'.join(choice[0] for choice in Product.STATUS_CHOICES)}",
+    ),
+    OpenApiParameter(name='stock_status', type=OpenApiTypes.STR, description='库存状态', required=False),
+    OpenApiParameter(name='brand', type=OpenApiTypes.STR, description='品牌', required=False),
+    OpenApiParameter(name='category', type=OpenApiTypes.STR, description='分类ID，包含子孙分类的产品', required=False),
+    OpenApiParameter(name='tags', type=OpenApiTypes.STR, description='标签ID', required=False),
+    OpenApiParameter(name='attributes', type=OpenApiTypes.STR, description='变体属性值ID，不同属性之间为“且”', required=False),
+    OpenApiParameter(name='min_price', type=OpenApiTypes.NUMBER, description='最低价格', required=False),
+    OpenApiParameter(name='max_price', type=OpenApiTypes.NUMBER, description='最高价格', required=False),
+    OpenApiParameter(name='featured', type=OpenApiTypes.BOOL, description='是否推荐产品', required=False),
+    OpenApiParameter(name='facets', type=OpenApiTypes.BOOL, description='是否返回分面统计，默认false', required=False),
+    OpenApiParameter(
+        name='sort', type=OpenApiTypes.STR, required=False, enum=list(PRODUCT_SORT_FIELDS),
+        description='排序字段，默认按menu_order升序、创建时间倒序',
+    ),
+    OpenApiParameter(name='order', type=OpenApiTypes.STR, enum=['asc', 'desc'], description='排序方向，默认asc', required=False),
+]
+
+
+class ProductPagination(StandardPagination):
+    """
+    产品列表分页，每页条数参数与前端一致使用per_page
+    """
+    page_size_query_param = 'per_page'
+
+
+class ProductListAPIView(BaseListAPIView):
+    """产品列表API"""
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    serializer_class = ProductListSerializer
+    pagination_class = ProductPagination
+
+    @extend_schema(
+        tags=['产品'],
+        summary="获取产品列表",
+        description=(
+            "获取当前租户的产品列表，支持搜索、过滤、排序与分页；列表只返回摘要字段，完整信息见产品详情。"
+            "多值过滤参数以逗号分隔，同一参数的多个值为“或”，不同参数之间为“且”。"
+            "facets=true时在meta.facets中返回各过滤项的可选值及产品数，统计某一项时不应用该项自身的过滤"
+        ),
+        parameters=PRODUCT_LIST_PARAMETERS,
+        responses={
+            200: ProductListSerializer(many=True),
+            400: OpenApiResponse(description="查询参数不正确"),
+        },
+        auth=[{"Bearer": []}],
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        with_facets = self.get_bool_param('facets')
+        tenant = get_current_tenant()
+        if with_facets and tenant is None:
+            raise ValidationException(message="未指定租户时不支持分面统计")
+        response = super().list(request, *args, **kwargs)
+        if with_facets:
+            response.data['meta']['facets'] = self.get_facets(tenant)
+        return response
+
+    def get_queryset(self):
+        """
+        按查询参数过滤与排序，再套用列表查询计划
+        """
+        filters = self.get_filters()
+        queryset = Product.objects.all()
+
+        search = self.request.query_params.get('search', '').strip()
+        if search:
+            tenant = get_current_tenant()
+            queryset = get_search_backend().filter(queryset, search, tenant.pk if tenant else None)
+        for name in ('type', 'status', 'stock_status', 'brand', 'featured'):
+            if filters[name]:
+                queryset = queryset.filter(**{f'{name}__in': filters[name]})
+        # 多对多关系用子查询过滤，多个值时不产生重复行
+        if filters['category']:
+            queryset = filter_by_categories(queryset, self.get_categories())
+        if filters['tags']:
+            queryset = queryset.filter(pk__in=Product.tags.through.objects.filter(
+                tag_id__in=filters['tags']
+            ).values('product_id'))
+        if filters['attributes']:
+            # 属性值按所属属性分组，同一属性内为“或”，不同属性之间为“且”
+            groups = {}
+            for value_id, attribute_id in AttributeValue.objects.filter(
+                pk__in=filters['attributes']
+            ).values_list('id', 'attribute_id'):
+                groups.setdefault(attribute_id, []).append(value_id)
+            if sum(map(len, groups.values())) < len(set(filters['attributes'])):
+                queryset = queryset.none()
+            for value_ids in groups.values():
+                queryset = queryset.filter(pk__in=VariationAttribute.objects.filter(
+                    value_id__in=value_ids
+                ).values('variation__product_id'))
+
+        min_price = self.get_price_param('min_price')
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+        max_price = self.get_price_param('max_price')
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+
+        return product_list_queryset(queryset.order_by(*self.get_ordering()))
+
+    def get_filters(self):
+        """
+        解析过滤参数，结果同时用于列表查询与分面统计
+        :return: {过滤项: 选中的值列表}
+        """
+        if hasattr(self, '_filters'):
+            return self._filters
+        filters = {}
+        for name, choices in (('type', Product.TYPE_CHOICES), ('status', Product.STATUS_CHOICES)):
+            filters[name] = self.get_list_param(name)
+            if any(value not in dict(choices) for value in filters[name]):
+                raise ValidationException(message=f"{name}参数不正确")
+        filters['stock_status'] = self.get_list_param('stock_status')
+        filters['brand'] = self.get_list_param('brand')
+        for name, label in (('category', '分类'), ('tags', '标签'), ('attributes', '属性值')):
+            values = self.get_list_param(name)
+            if not all(value.isdigit() for value in values):
+                raise ValidationException(message=f"{name}参数必须是{label}ID，多个ID以逗号分隔")
+            filters[name] = [int(value) for value in values]
+        featured = self.get_bool_param('featured')
+        filters['featured'] = [featured] if featured is not None else []
+        self._filters = filters
+        return filters
+
+    def get_categories(self):
+        """
+        category参数选中的分类
+        """
+        if not hasattr(self, '_categories'):
+            self._categories = list(
+                Category.objects.filter(pk__in=self.get_filters()['category']).only('id', 'tree_id', 'lft', 'rght')
+            )
+        return self._categories
+
+    def get_facets(self, tenant, scope=None):
+        """
+        在分面索引中统计当前过滤条件下各过滤项的产品数
+        :param scope: 限定统计范围的过滤项，不参与“统计某项时不应用该项自身的过滤”
+        """
+        search = self.request.query_params.get('search', '').strip()
+        product_ids = None
+        if search:
+            product_ids = get_search_backend().filter(
+                Product.objects.all(), search, tenant.pk
+            ).values_list('pk', flat=True)
+        filters = self.get_filters()
+        if filters['category']:
+            # 分面索引按产品直接所属的分类建立，选中的分类展开为全部子孙分类
+            filters = dict(filters, category=subtree_category_ids(self.get_categories()))
+        return facet_index.counts(
+            tenant.pk, filters,
+            min_price=self.get_price_param('min_price'),
+            max_price=self.get_price_param('max_price'),
+            product_ids=product_ids,
+            scope=scope,
+        )
+
+    def get_list_param(self, name):
+        """
+        逗号分隔的多值参数
+        """
+        return [value.strip() for value in self.request.query_params.get(name, '').split(',') if value.strip()]
+
+    def get_bool_param(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        if value.lower() not in ('true', 'false', '1', '0'):
+            raise ValidationException(message=f"{name}参数只能为true或false")
+        return value.lower() in ('true', '1')
+
+    def get_price_param(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            return Decimal(value)
+        except InvalidOperation:
+            raise ValidationException(message=f"{name}参数必须是数字")
+
+    def get_ordering(self):
+        """
+        获取排序，末尾追加主键保证分页稳定
+        """
+        sort = self.request.query_params.get('sort')
+        if not sort:
+            return [*Product._meta.ordering, '-id']
+        if sort not in PRODUCT_SORT_FIELDS:
+            raise ValidationException(message=f"sort参数只能为{'、'.join(PRODUCT_SORT_FIELDS)}")
+        order = self.request.query_params.get('order', 'asc')
+        if order not in ('asc', 'desc'):
+            raise ValidationException(message="order参数只能为asc或desc")
+        prefix = '-' if order == 'desc' else ''
+        return [f'{prefix}{sort}', f'{prefix}id']
+
+
+class CategoryProductListAPIView(ProductListAPIView):
+    """分类产品列表API"""
+
+    @extend_schema(
+        tags=['产品'],
+        summary="获取分类下的产品列表",
+        description=(
+            "获取分类及其全部子孙分类下的产品，过滤、排序、分页与分面统计参数同产品列表；"
+            "meta.category中返回分类信息与含子孙分类的产品总数"
+        ),
+        parameters=[
+            OpenApiParameter(
+                name='include_descendants', type=OpenApiTypes.BOOL, required=False,
+                description='是否包含子孙分类的产品，默认true',
+            ),
+            *PRODUCT_LIST_PARAMETERS,
+        ],
+        responses={
+            200: ProductListSerializer(many=True),
+            400: OpenApiResponse(description="查询参数不正确"),
+            404: OpenApiResponse(description="分类不存在"),
+        },
+        auth=[{"Bearer": []}],
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        category = self.get_category()
+        response = super().list(request, *args, **kwargs)
+        response.data['meta']['category'] = {
+            'id': category.id,
+            'name': category.name,
+            'product_count': category_product_counts(category.tenant_id).get(category.id, 0),
+        }
+        return response
+
+    def get_category(self):
+        """
+        获取路径中的分类，分类管理器不按租户过滤，在此限定当前租户
+        """
+        if not hasattr(self, '_category'):
+            categories = Category.objects.all()
+            tenant = get_current_tenant()
+            if tenant is not None:
+                categories = categories.filter(tenant=tenant)
+            self._category = categories.filter(pk=self.kwargs['pk']).first()
+            if self._category is None:
+                raise ResourceNotFoundException(message="产品分类不存在")
+        return self._category
+
+    def include_descendants(self):
+        return self.get_bool_param('include_descendants') is not False
+
+    def get_queryset(self):
+        category = self.get_category()
+        queryset = super().get_queryset()
+        if self.include_descendants():
+            return filter_by_categories(queryset, [category])
+        return queryset.filter(pk__in=Product.categories.through.objects.filter(
+            category=category
+        ).values('product_id'))
+
+    def get_facets(self, tenant, scope=None):
+        category = self.get_category()
+        category_ids = subtree_category_ids([category]) if self.include_descendants() else [category.id]
+        return super().get_facets(tenant, scope={'category': category_ids})
+
+
+class ProductDetailAPIView(BaseAPIView):
+    """产品详情API"""
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=['产品'],
+        summary="获取产品详情",
+        description="获取产品的完整信息，包括分类、标签、图片、属性、变体以及追加销售与交叉销售产品ID",
+        responses={
+            200: ProductDetailSerializer,
+            404: OpenApiResponse(description="产品不存在"),
+        },
+        auth=[{"Bearer": []}],
+    )
+    def get(self, request, pk):
+        product = self.get_object_or_404(product_detail_queryset(), pk=pk)
+        return self.success(data=ProductDetailSerializer(product).data, message="获取产品详情成功")
@@ -0,0 +1,273 @@
+"""
+WooCommerce CSV格式模块
+定义WooCommerce产品CSV的列名以及单元格的解析工具函数，供导入导出共用
+"""
+import hashlib
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.utils import timezone
+from django.utils.text import slugify
+
+
+# WooCommerce产品CSV的固定列（属性列按数量动态追加）
+WOOCOMMERCE_BASE_COLUMNS = (
+    'Type', 'SKU', 'GTIN, UPC, EAN, or ISBN', 'Name', 'Published', 'Is featured?',
+    'Visibility in catalog', 'Short description', 'Description',
+    'Date sale price starts', 'Date sale price ends', 'Tax status', 'Tax class',
+    'In stock?', 'Stock', 'Low stock amount', 'Backorders allowed?', 'Sold individually?',
+    'Weight (kg)', 'Length (cm)', 'Width (cm)', 'Height (cm)', 'Allow customer reviews?',
+    'Purchase note', 'Sale price', 'Regular price', 'Categories', 'Tags', 'Shipping class',
+    'Images', 'Download limit', 'Download expiry days', 'Parent', 'Grouped products',
+    'Upsells', 'Cross-sells', 'External URL', 'Button text', 'Position', 'Brands',
+)
+
+# 每个属性占用的列
+ATTRIBUTE_COLUMN_TEMPLATES = (
+    'Attribute {n} name', 'Attribute {n} value(s)', 'Attribute {n} visible', 'Attribute {n} global',
+)
+
+# 分类路径分隔符，例如 "家具 > 餐桌"
+CATEGORY_PATH_SEPARATOR = '>'
+
+# 变体行的类型标识
+VARIATION_TYPE = 'variation'
+
+
+def get_columns(attribute_count=2):
+    """
+    获取完整的CSV列名
+    :param attribute_count: 属性数量
+    :return: 列名元组
+    """
+    columns = list(WOOCOMMERCE_BASE_COLUMNS)
+    for n in range(1, attribute_count + 1):
+        columns.extend(template.format(n=n) for template in ATTRIBUTE_COLUMN_TEMPLATES)
+    return tuple(columns)
+
+
+def clean(value):
+    """
+    清理单元格内容
+    :param value: 原始值
+    :return: 去除首尾空白的字符串
+    """
+    return (value or '').strip()
+
+
+def parse_bool(value):
+    """
+    解析布尔值单元格（1/0、yes/no）
+    """
+    return clean(value).lower() in ('1', 'yes', 'true', 'notify')
+
+
+def parse_int(value, default=0):
+    """
+    解析整数单元格
+    :raises ValueError: 格式不正确
+    """
+    value = clean(value)
+    if not value:
+        return default
+    try:
+        return int(Decimal(value))
+    except InvalidOperation:
+        raise ValueError(f"无效的整数: {value}")
+
+
+def parse_decimal(value):
+    """
+    解析金额、尺寸等小数单元格
+    :raises ValueError: 格式不正确
+    """
+    value = clean(value)
+    if not value:
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"无效的数字: {value}")
+
+
+def parse_datetime(value):
+    """
+    解析日期单元格，支持 YYYY-MM-DD 与 YYYY-MM-DD HH:MM:SS
+    :raises ValueError: 格式不正确
+    """
+    value = clean(value)
+    if not value:
+        return None
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+        try:
+            return timezone.make_aware(datetime.strptime(value, fmt))
+        except ValueError:
+            continue
+    raise ValueError(f"无效的日期: {value}")
+
+
+def parse_list(value, separator=','):
+    """
+    解析以分隔符分隔的列表单元格
+    """
+    return [item.strip() for item in clean(value).split(separator) if item.strip()]
+
+
+def parse_category_paths(value):
+    """
+    解析分类单元格，返回分类路径列表
+    例如 "家具 > 餐桌, 新品" -> [('家具', '餐桌'), ('新品',)]
+    """
+    return [
+        tuple(part.strip() for part in path.split(CATEGORY_PATH_SEPARATOR) if part.strip())
+        for path in parse_list(value)
+    ]
+
+
+def build_category_paths(rows):
+    """
+    由分类的 (id, parent_id, name) 拼接出每个分类从根节点开始的名称路径
+    :param rows: (id, parent_id, name) 可迭代对象
+    :return: {id: ('家具', '餐桌')}
+    """
+    nodes = {pk: (parent_id, name) for pk, parent_id, name in rows}
+    paths = {}
+
+    def path_of(pk):
+        if pk not in paths:
+            parent_id, name = nodes[pk]
+            parent_path = path_of(parent_id) if parent_id in nodes else ()
+            paths[pk] = parent_path + (name,)
+        return paths[pk]
+
+    for pk in nodes:
+        path_of(pk)
+    return paths
+
+
+def parse_published(value):
+    """
+    解析发布状态：1为已发布，-1为草稿，其余视为草稿
+    """
+    return 'published' if clean(value) == '1' else 'draft'
+
+
+def parse_stock_status(value):
+    """
+    解析库存状态
+    """
+    value = clean(value).lower()
+    if value == 'backorder':
+        return 'onbackorder'
+    return 'instock' if value in ('', '1', 'yes') else 'outofstock'
+
+
+def parse_attributes(row):
+    """
+    解析行中的属性列
+    :param row: CSV行字典
+    :return: [(属性名, [属性值, ...]), ...]
+    """
+    attributes = []
+    n = 1
+    while f'Attribute {n} name' in row:
+        name = clean(row.get(f'Attribute {n} name'))
+        values = parse_list(row.get(f'Attribute {n} value(s)'))
+        if name and values:
+            attributes.append((name, values))
+        n += 1
+    return attributes
+
+
+def format_bool(value):
+    """
+    格式化布尔值单元格
+    """
+    return '1' if value else '0'
+
+
+def format_decimal(value):
+    """
+    格式化金额、尺寸等小数单元格，去除多余的小数位0
+    """
+    if value is None:
+        return ''
+    text = f"{value:f}"
+    return text.rstrip('0').rstrip('.') if '.' in text else text
+
+
+def format_datetime(value):
+    """
+    格式化日期单元格
+    """
+    if not value:
+        return ''
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def format_list(values, separator=', '):
+    """
+    格式化列表单元格
+    """
+    return separator.join(str(value) for value in values if value)
+
+
+def format_category_paths(paths):
+    """
+    格式化分类单元格，parse_category_paths的逆操作
+    例如 [('家具', '餐桌'), ('新品',)] -> "家具 > 餐桌, 新品"
+    """
+    return format_list(f" {CATEGORY_PATH_SEPARATOR} ".join(path) for path in paths)
+
+
+def format_published(status):
+    """
+    格式化发布状态：已发布为1，其余为-1
+    """
+    return '1' if status == 'published' else '-1'
+
+
+def format_stock_status(status):
+    """
+    格式化库存状态，parse_stock_status的逆操作
+    """
+    if status == 'onbackorder':
+        return 'backorder'
+    return '1' if status == 'instock' else '0'
+
+
+def make_slug(value, max_length=100):
+    """
+    生成支持中文的slug，无法生成时使用摘要代替
+    """
+    slug = slugify(value, allow_unicode=True)
+    if not slug:
+        slug = hashlib.md5(value.encode('utf-8')).hexdigest()[:12]
+    return slug[:max_length]
+
+
+def row_fingerprint(row):
+    """
+    计算CSV行内容的摘要，列顺序不影响结果
+    :param row: CSV行字典
+    :return: 32位十六进制字符串
+    """
+    content = '\x1e'.join(
+        f"{key}\x1f{clean(value)}" for key, value in sorted(
+            (str(key), value) for key, value in row.items() if isinstance(value, str)
+        )
+    )
+    return hashlib.md5(content.encode('utf-8')).hexdigest()
+
+
+def variation_sku(parent_sku, attributes):
+    """
+    为未填写SKU的变体生成稳定的SKU
+    同一父产品下按属性值组合生成，重复导入同一文件时保持不变
+    :param parent_sku: 父产品SKU
+    :param attributes: parse_attributes的返回值
+    :return: SKU字符串
+    """
+    key = '|'.join(f"{name}={','.join(values)}" for name, values in attributes)
+    digest = hashlib.md5(key.encode('utf-8')).hexdigest()[:8]
+    return f"{parent_sku[:90]}-{digest}"
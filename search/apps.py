@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'search'
+    verbose_name = '产品搜索'
+
+    def ready(self):
+        # 注册产品、标签、分类变更时更新搜索文档的信号处理
+        from . import signals  # noqa: F401
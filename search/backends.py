@@ -0,0 +1,179 @@
+"""
+产品搜索后端模块
+搜索只查询产品搜索文档表（见search.models.ProductSearchDocument）：
+MySQLFulltextBackend使用ngram解析器的FULLTEXT索引，支持中文；
+SimpleSearchBackend在文档表上逐词LIKE匹配，用于SQLite等开发与测试环境；
+search.inverted_index.InvertedIndexBackend在进程内存中维护倒排索引，用于无法使用FULLTEXT的部署。
+通过settings.PRODUCT_SEARCH['BACKEND']指定后端类路径，未指定时按数据库类型选择
+"""
+import logging
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import ProductSearchDocument
+
+logger = logging.getLogger('django')
+
+DEFAULTS = {
+    # 搜索后端类路径，为None时MySQL使用MySQLFulltextBackend，其他数据库使用SimpleSearchBackend
+    'BACKEND': None,
+    # 查询最多使用的词数
+    'MAX_TERMS': 10,
+    # 内存倒排索引的快照目录，为None时不写快照，进程启动后从文档表加载
+    'INDEX_SNAPSHOT_DIR': None,
+    # 内存倒排索引有更新时重写快照的最短间隔（秒），使快照不落后太多，进程启动时需要同步的文档较少
+    'INDEX_SNAPSHOT_INTERVAL': 600,
+    # 内存倒排索引与分面索引从文档表增量同步的间隔（秒）
+    'INDEX_SYNC_INTERVAL': 30,
+    # 内存倒排索引匹配的产品超过该数量时改用文档表查询，避免过长的IN列表
+    'INDEX_MAX_IDS': 5000,
+    # 分面统计的价格区间下限，区间左闭右开，最后一个区间没有上限
+    'FACET_PRICE_RANGES': (0, 100, 500, 1000, 5000, 10000),
+}
+
+
+def get_setting(name):
+    """
+    读取settings.PRODUCT_SEARCH中的配置，未配置时使用默认值
+    """
+    return getattr(settings, 'PRODUCT_SEARCH', {}).get(name, DEFAULTS[name])
+
+
+def parse_terms(query):
+    """
+    将查询拆分为词，按空白分隔，去掉重复与全文检索的运算符
+    """
+    terms = []
+    for term in re.sub(r'[+\-<>()~*"@]+', ' ', query or '').split():
+        if term not in terms:
+            terms.append(term)
+    return terms[:get_setting('MAX_TERMS')]
+
+
+class BaseSearchBackend:
+    """
+    搜索后端基类
+    filter用于在产品查询集上叠加搜索条件，search返回按相关度排序的产品ID；
+    各后端都读取同一张搜索文档表，默认按LIKE匹配，子类可改用其他匹配方式
+    """
+
+    def matching_documents(self, query, tenant_id=None):
+        """
+        匹配查询的搜索文档查询集，不排序：每个词都需在关键词或正文中出现
+        """
+        documents = self.base_documents(tenant_id)
+        for term in parse_terms(query):
+            documents = documents.filter(Q(keywords__icontains=term) | Q(content__icontains=term))
+        return documents
+
+    def documents(self, query, tenant_id=None):
+        """
+        按相关度排序的匹配文档查询集，默认按产品ID降序
+        """
+        return self.matching_documents(query, tenant_id).order_by('-product_id')
+
+    def filter(self, queryset, query, tenant_id=None):
+        """
+        将产品查询集限制为匹配查询的产品
+        :param queryset: 产品查询集
+        :param query: 查询字符串
+        :param tenant_id: 租户ID，为None时不限制租户
+        """
+        if not parse_terms(query):
+            return queryset
+        # 作为子查询使用，不需要排序与相关度
+        return queryset.filter(pk__in=self.matching_documents(query, tenant_id).values('product_id'))
+
+    def search(self, query, tenant_id=None, limit=20):
+        """
+        搜索产品
+        :return: 按相关度排序的产品ID列表
+        """
+        if not parse_terms(query):
+            return []
+        return list(self.documents(query, tenant_id).values_list('product_id', flat=True)[:limit])
+
+    def update_documents(self, documents):
+        """
+        搜索文档写入的事务提交后调用，在进程内维护索引的后端在此更新
+        :param documents: 已写入的ProductSearchDocument列表
+        """
+
+    def remove_products(self, tenant_id, product_ids):
+        """
+        产品删除的事务提交后调用，在进程内维护索引的后端在此移除
+        """
+
+    def base_documents(self, tenant_id):
+        documents = ProductSearchDocument.objects.all()
+        if tenant_id is not None:
+            documents = documents.filter(tenant_id=tenant_id)
+        return documents
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """
+    基于LIKE的搜索后端，使用基类的匹配方式，非MySQL数据库的默认后端
+    """
+
+
+class MySQLFulltextBackend(BaseSearchBackend):
+    """
+    基于MySQL FULLTEXT索引（ngram解析器）的搜索后端
+    使用布尔模式，每个词作为短语必须出现；关键词列的匹配得分加倍
+    """
+    # 与迁移中ngram_token_size（MySQL默认为2）一致，短于该长度的词按前缀匹配
+    ngram_token_size = 2
+
+    def boolean_query(self, query):
+        parts = []
+        for term in parse_terms(query):
+            if len(term) < self.ngram_token_size:
+                parts.append(f'+{term}*')
+            else:
+                parts.append(f'+"{term}"')
+        return ' '.join(parts)
+
+    def matching_documents(self, query, tenant_id=None):
+        """
+        条件中只使用一个MATCH，才能使用(keywords, content)上的FULLTEXT索引
+        """
+        return self.base_documents(tenant_id).extra(
+            where=['MATCH (keywords, content) AGAINST (%s IN BOOLEAN MODE)'],
+            params=[self.boolean_query(query)],
+        )
+
+    def documents(self, query, tenant_id=None):
+        """
+        加权得分只用于排序
+        """
+        boolean_query = self.boolean_query(query)
+        return self.matching_documents(query, tenant_id).annotate(
+            score=RawSQL(
+                'MATCH (keywords, content) AGAINST (%s IN BOOLEAN MODE)'
+                ' + MATCH (keywords) AGAINST (%s IN BOOLEAN MODE)',
+                (boolean_query, boolean_query),
+            ),
+        ).order_by('-score')
+
+
+_backends = {}
+
+
+def get_search_backend(using=None):
+    """
+    获取搜索后端实例
+    :param using: 数据库别名，默认使用搜索文档表所在的数据库
+    """
+    path = get_setting('BACKEND')
+    if path is None:
+        vendor = connections[using or ProductSearchDocument.objects.db].vendor
+        path = 'search.backends.MySQLFulltextBackend' if vendor == 'mysql' else 'search.backends.SimpleSearchBackend'
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
@@ -0,0 +1,76 @@
+"""
+搜索文档构建模块
+从产品及其标签、分类生成搜索文档文本，并批量写入搜索文档表
+"""
+import logging
+from functools import partial
+
+from django.db import connections, transaction
+from django.db.models import Prefetch
+from django.utils.html import strip_tags
+
+from products.models import Category, Product, Tag
+
+from .backends import get_search_backend
+from .models import ProductSearchDocument
+
+logger = logging.getLogger('django')
+
+# 构建文档需要加载的产品列
+DOCUMENT_FIELDS = ('id', 'tenant', 'name', 'sku', 'vl_id', 'gtin', 'brand', 'short_description', 'description')
+
+INDEX_BATCH_SIZE = 500
+
+
+def document_text(product):
+    """
+    生成产品的搜索文本
+    :param product: 已预取tags与categories的产品
+    :return: (keywords, content) 元组
+    """
+    keywords = [product.name, product.sku, product.vl_id or '', product.gtin, product.brand]
+    keywords += [tag.name for tag in product.tags.all()]
+    keywords += [category.name for category in product.categories.all()]
+    content = [strip_tags(product.short_description), strip_tags(product.description)]
+    return ' '.join(filter(None, keywords)), ' '.join(filter(None, content))
+
+
+def iter_document_products(product_ids, batch_size=INDEX_BATCH_SIZE):
+    """
+    按批次加载构建文档所需的产品数据
+    """
+    product_ids = list(product_ids)
+    for start in range(0, len(product_ids), batch_size):
+        yield list(
+            Product.original_objects.filter(pk__in=product_ids[start:start + batch_size])
+            .only(*DOCUMENT_FIELDS)
+            .prefetch_related(
+                Prefetch('tags', queryset=Tag.original_objects.only('id', 'name')),
+                Prefetch('categories', queryset=Category.objects.only('id', 'name')),
+            )
+        )
+
+
+def save_documents(products):
+    """
+    批量写入产品的搜索文档，已存在的文档覆盖更新
+    """
+    documents = []
+    for product in products:
+        keywords, content = document_text(product)
+        documents.append(ProductSearchDocument(
+            product_id=product.pk, tenant_id=product.tenant_id, keywords=keywords, content=content,
+        ))
+    if not documents:
+        return
+    connection = connections[ProductSearchDocument.objects.db]
+    # MySQL的ON DUPLICATE KEY UPDATE不能指定冲突字段
+    unique_fields = ['product'] if connection.features.supports_update_conflicts_with_target else None
+    ProductSearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=['tenant', 'keywords', 'content', 'updated_at'],
+    )
+    # 事务回滚时不更新进程内索引，回滚的文本不会被搜索到
+    transaction.on_commit(partial(get_search_backend().update_documents, documents))
@@ -0,0 +1,399 @@
+"""
+分面索引模块
+产品列表过滤侧栏的分面统计：每个进程按租户在内存中维护“分面值 → 产品位图”的索引，
+统计时在内存中求交集并计数，不再按分面分别执行GROUP BY查询。
+产品按加载顺序分配位置，位图是以位置为下标的Python整数，求交集用&，计数用int.bit_count。
+
+索引的维护：
+- 进程首次统计某租户时从数据库加载；
+- search.indexing.index_products（产品保存、标签与分类关系变更、变体属性变更以及导入都会调用）
+  将产品在所属租户的索引中标记为待更新，下次统计前重新加载这些产品；
+- 按INDEX_SYNC_INTERVAL间隔从搜索文档表拉取其他进程更新的产品；产品数与数据库不一致时移除已删除的产品
+"""
+import bisect
+import logging
+import threading
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+from django.utils import timezone
+
+from products.models import Product, VariationAttribute
+
+from .backends import get_setting
+from .documents import INDEX_BATCH_SIZE
+from .inverted_index import SYNC_OVERLAP
+from .models import ProductSearchDocument
+
+logger = logging.getLogger('django')
+
+# 取值为产品字段的分面
+FIELD_FACETS = ('type', 'status', 'stock_status', 'brand', 'featured')
+# 取值为多对多关联ID的分面
+RELATION_FACETS = ('category', 'tags')
+
+
+def price_range_label(low, high):
+    return f'{low}-{high}' if high is not None else f'{low}-'
+
+
+def positions_bitmap(positions):
+    """
+    位置集合的位图，先在bytearray中逐位设置，再一次转换为整数
+    """
+    positions = list(positions)
+    if not positions:
+        return 0
+    flags = bytearray((max(positions) >> 3) + 1)
+    for position in positions:
+        flags[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(flags, 'little')
+
+
+class TenantFacets:
+    """
+    单个租户的分面索引，由FacetIndex加锁访问
+    """
+
+    def __init__(self, price_ranges):
+        # 价格区间的下限，区间左闭右开，最后一个区间没有上限
+        self.price_ranges = list(price_ranges)
+        self.price_bounds = [Decimal(str(low)) for low in price_ranges]
+        # {产品ID: 位置}，位置 -> 产品ID，以及删除后空出的位置
+        self.positions = {}
+        self.product_ids = []
+        self.free = []
+        # 全部在用位置的位图
+        self.alive = 0
+        # {分面: {分面值: 位图}}，变体属性的分面为('attribute', 属性ID)
+        self.bitmaps = defaultdict(dict)
+        # {位置: [(分面, 分面值)]}，移除产品时用于定位位图
+        self.values = {}
+        # {位置: 价格}，用于任意价格范围的过滤
+        self.prices = {}
+        # 待重新加载的产品ID
+        self.dirty = set()
+        self.synced_at = None
+        self.checked_at = None
+
+    def __len__(self):
+        return len(self.positions)
+
+    def price_bucket(self, price):
+        i = bisect.bisect_right(self.price_bounds, price) - 1
+        return i if i >= 0 else None
+
+    def add(self, product_id, values, price):
+        """
+        添加或替换单个产品
+        :param values: (分面, 分面值) 列表
+        """
+        self.add_many([(product_id, values, price)])
+
+    def add_many(self, rows):
+        """
+        批量添加或替换产品
+        位图是不可变的大整数，每次位运算都复制整个位图，因此先收集每个分面值的全部新位置，
+        每个分面值只合并一次，加载N个产品的开销为O(N)而不是O(N²)
+        :param rows: (产品ID, [(分面, 分面值)], 价格) 列表
+        """
+        rows = list(rows)
+        self.remove_many([row[0] for row in rows])
+        added = defaultdict(list)
+        positions = []
+        for product_id, values, price in rows:
+            if self.free:
+                position = self.free.pop()
+                self.product_ids[position] = product_id
+            else:
+                position = len(self.product_ids)
+                self.product_ids.append(product_id)
+            self.positions[product_id] = position
+            positions.append(position)
+
+            values = list(values)
+            if price is not None:
+                self.prices[position] = price
+                bucket = self.price_bucket(price)
+                if bucket is not None:
+                    values.append(('price', bucket))
+            for key in values:
+                added[key].append(position)
+            self.values[position] = values
+
+        for (facet, value), value_positions in added.items():
+            bitmaps = self.bitmaps[facet]
+            bitmaps[value] = bitmaps.get(value, 0) | positions_bitmap(value_positions)
+        self.alive |= positions_bitmap(positions)
+
+    def remove(self, product_id):
+        self.remove_many([product_id])
+
+    def remove_many(self, product_ids):
+        """
+        批量移除产品，不在索引中的ID忽略；与add_many相同，每个分面值只合并一次
+        """
+        removed = defaultdict(list)
+        positions = []
+        for product_id in product_ids:
+            position = self.positions.pop(product_id, None)
+            if position is None:
+                continue
+            positions.append(position)
+            for key in self.values.pop(position):
+                removed[key].append(position)
+            self.prices.pop(position, None)
+            self.product_ids[position] = None
+        if not positions:
+            return
+
+        for (facet, value), value_positions in removed.items():
+            bitmaps = self.bitmaps[facet]
+            bitmap = bitmaps[value] & ~positions_bitmap(value_positions)
+            if bitmap:
+                bitmaps[value] = bitmap
+            else:
+                del bitmaps[value]
+                if not bitmaps:
+                    del self.bitmaps[facet]
+        self.alive &= ~positions_bitmap(positions)
+        self.free.extend(positions)
+
+    def bitmap(self, product_ids):
+        """
+        产品ID集合的位图，不在索引中的ID忽略
+        """
+        return positions_bitmap(
+            position for position in map(self.positions.get, product_ids) if position is not None
+        )
+
+    def price_bitmap(self, min_price=None, max_price=None):
+        """
+        价格在[min_price, max_price]内的产品位图
+        """
+        return positions_bitmap(
+            position for position, price in self.prices.items()
+            if (min_price is None or price >= min_price) and (max_price is None or price <= max_price)
+        )
+
+    def union(self, facet, values):
+        bitmaps = self.bitmaps.get(facet, {})
+        bitmap = 0
+        for value in values:
+            bitmap |= bitmaps.get(value, 0)
+        return bitmap
+
+    def counts(self, filters, min_price=None, max_price=None, product_ids=None, scope=None):
+        """
+        统计各分面值的产品数
+        同一分面内的多个值为“或”，不同分面之间为“且”；统计某个分面时不应用该分面自身的过滤，
+        侧栏中同一分面的其他值仍显示可选数量
+        :param filters: {分面: 选中的值列表}，分面为FIELD_FACETS、RELATION_FACETS或attributes（属性值ID）
+        :param product_ids: 只统计这些产品（如搜索结果），为None时不限制
+        :param scope: 限定统计范围的{分面: 值列表}（如分类页的分类及其子孙分类），统计该分面时同样应用
+        :return: 分面统计字典，只包含数量不为0的值
+        """
+        base = self.alive
+        if product_ids is not None:
+            base &= self.bitmap(product_ids)
+        for facet, values in (scope or {}).items():
+            base &= self.union(facet, values)
+
+        masks = {}
+        for facet in FIELD_FACETS + RELATION_FACETS:
+            if filters.get(facet):
+                masks[facet] = self.union(facet, filters[facet])
+        # 属性值按所属属性分组，不同属性之间为“且”
+        selected = defaultdict(list)
+        for value_id in filters.get('attributes') or ():
+            for facet in self.attribute_facets():
+                if value_id in self.bitmaps[facet]:
+                    selected[facet].append(value_id)
+                    break
+            else:
+                # 未被任何产品使用的属性值，过滤结果为空
+                masks[('attribute', None)] = 0
+        for facet, value_ids in selected.items():
+            masks[facet] = self.union(facet, value_ids)
+        if min_price is not None or max_price is not None:
+            masks['price'] = self.price_bitmap(min_price, max_price)
+
+        def restrict(excluded):
+            bitmap = base
+            for key, mask in masks.items():
+                if key != excluded:
+                    bitmap &= mask
+            return bitmap
+
+        result = {facet: self.value_counts(facet, restrict(facet)) for facet in FIELD_FACETS + RELATION_FACETS}
+
+        mask = restrict('price')
+        result['price'] = []
+        for bucket, low in enumerate(self.price_ranges):
+            count = (self.bitmaps.get('price', {}).get(bucket, 0) & mask).bit_count()
+            if count:
+                high = self.price_ranges[bucket + 1] if bucket + 1 < len(self.price_ranges) else None
+                result['price'].append({
+                    'value': price_range_label(low, high), 'min': low, 'max': high, 'count': count,
+                })
+
+        result['attributes'] = []
+        for facet in sorted(self.attribute_facets(), key=lambda facet: facet[1]):
+            values = self.value_counts(facet, restrict(facet))
+            if values:
+                result['attributes'].append({'attribute': facet[1], 'values': values})
+        return result
+
+    def attribute_facets(self):
+        return [facet for facet in self.bitmaps if isinstance(facet, tuple)]
+
+    def value_counts(self, facet, mask):
+        counts = []
+        for value, bitmap in self.bitmaps.get(facet, {}).items():
+            count = (bitmap & mask).bit_count()
+            if count:
+                counts.append({'value': value, 'count': count})
+        counts.sort(key=lambda item: (-item['count'], str(item['value'])))
+        return counts
+
+
+def load_products(facets, tenant_id, product_ids=None):
+    """
+    从数据库加载租户的产品到分面索引，全部批次读取完成后一次写入索引
+    :param product_ids: 只加载这些产品，为None时加载全部
+    """
+    if product_ids is None:
+        batches = [None]
+    else:
+        product_ids = list(product_ids)
+        batches = [product_ids[i:i + INDEX_BATCH_SIZE] for i in range(0, len(product_ids), INDEX_BATCH_SIZE)]
+
+    rows = []
+    for batch in batches:
+        products = Product.original_objects.filter(tenant_id=tenant_id)
+        categories = Product.categories.through.objects.filter(product__tenant_id=tenant_id)
+        tags = Product.tags.through.objects.filter(product__tenant_id=tenant_id)
+        attributes = VariationAttribute.original_objects.filter(variation__product__tenant_id=tenant_id)
+        if batch is not None:
+            products = products.filter(pk__in=batch)
+            categories = categories.filter(product_id__in=batch)
+            tags = tags.filter(product_id__in=batch)
+            attributes = attributes.filter(variation__product_id__in=batch)
+
+        values = defaultdict(set)
+        for product_id, category_id in categories.values_list('product_id', 'category_id'):
+            values[product_id].add(('category', category_id))
+        for product_id, tag_id in tags.values_list('product_id', 'tag_id'):
+            values[product_id].add(('tags', tag_id))
+        for product_id, attribute_id, value_id in attributes.values_list(
+            'variation__product_id', 'attribute_id', 'value_id'
+        ):
+            values[product_id].add((('attribute', attribute_id), value_id))
+
+        product_rows = products.order_by('pk').values_list('pk', 'price', *FIELD_FACETS)
+        for product_id, price, *fields in product_rows.iterator(chunk_size=2000):
+            facet_values = [(facet, value) for facet, value in zip(FIELD_FACETS, fields) if value not in (None, '')]
+            facet_values.extend(values.get(product_id, ()))
+            rows.append((product_id, facet_values, price))
+    facets.add_many(rows)
+
+
+class FacetIndex:
+    """
+    进程内按租户的分面索引
+    每个租户有各自的锁，加载或同步一个租户时不阻塞其他租户的统计
+    用法：
+        facets = facet_index.counts(tenant_id, {'type': ['variable'], 'attributes': [12]}, product_ids=search_ids)
+        facet_index.invalidate(tenant_id, product_ids)
+    """
+
+    def __init__(self):
+        self._tenants = {}
+        self._locks = {}
+        # 只保护_tenants与_locks两个字典
+        self._lock = threading.Lock()
+
+    def tenant_lock(self, tenant_id):
+        with self._lock:
+            lock = self._locks.get(tenant_id)
+            if lock is None:
+                lock = self._locks[tenant_id] = threading.RLock()
+            return lock
+
+    def get(self, tenant_id):
+        """
+        获取租户的分面索引，首次使用时加载，超过同步间隔时增量同步，并重新加载待更新的产品
+        """
+        with self.tenant_lock(tenant_id):
+            facets = self._tenants.get(tenant_id)
+            if facets is None:
+                facets = self.build(tenant_id)
+                with self._lock:
+                    self._tenants[tenant_id] = facets
+            elif time.monotonic() - facets.checked_at >= get_setting('INDEX_SYNC_INTERVAL'):
+                self.sync(facets, tenant_id)
+            self.reload(facets, tenant_id)
+            return facets
+
+    def build(self, tenant_id):
+        facets = TenantFacets(get_setting('FACET_PRICE_RANGES'))
+        facets.synced_at = timezone.now()
+        facets.checked_at = time.monotonic()
+        load_products(facets, tenant_id)
+        return facets
+
+    def reload(self, facets, tenant_id):
+        """
+        重新加载待更新的产品，已删除或已转移到其他租户的产品不再加载
+        """
+        if facets.dirty:
+            product_ids, facets.dirty = facets.dirty, set()
+            facets.remove_many(product_ids)
+            load_products(facets, tenant_id, product_ids)
+
+    def sync(self, facets, tenant_id):
+        """
+        重新加载上次同步以来文档有更新的产品；
+        产品数与数据库不一致时说明有产品被其他进程删除或转移到其他租户，此时才读取全部产品ID移除这些产品
+        """
+        now = timezone.now()
+        facets.dirty.update(ProductSearchDocument.objects.filter(
+            tenant_id=tenant_id, updated_at__gte=facets.synced_at - SYNC_OVERLAP,
+        ).values_list('product_id', flat=True))
+        self.reload(facets, tenant_id)
+        products = Product.original_objects.filter(tenant_id=tenant_id)
+        if products.count() != len(facets):
+            current = set(products.values_list('pk', flat=True))
+            facets.remove_many([product_id for product_id in facets.positions if product_id not in current])
+        facets.synced_at = now
+        facets.checked_at = time.monotonic()
+
+    def counts(self, tenant_id, filters, min_price=None, max_price=None, product_ids=None, scope=None):
+        """
+        统计租户的分面，参数见TenantFacets.counts
+        """
+        with self.tenant_lock(tenant_id):
+            return self.get(tenant_id).counts(filters, min_price, max_price, product_ids, scope)
+
+    def invalidate(self, tenant_id, product_ids):
+        """
+        标记租户的产品待更新，已加载该租户时在下次统计前重新加载这些产品；
+        转移到其他租户的产品由原租户的下次同步移除
+        """
+        with self._lock:
+            facets = self._tenants.get(tenant_id)
+        if facets is None:
+            return
+        with self.tenant_lock(tenant_id):
+            facets.dirty.update(product_ids)
+
+    def clear(self):
+        """
+        清空进程内的索引，下次使用时重新加载，用于测试
+        """
+        with self._lock:
+            self._tenants.clear()
+
+
+facet_index = FacetIndex()
@@ -0,0 +1,54 @@
+"""
+搜索索引维护模块
+产品及其标签、分类、变体属性变更后调用index_products更新对应产品的搜索文档与分面索引；
+导入等不触发信号的批量写入在写入后显式调用
+"""
+import logging
+from collections import defaultdict
+
+from products.models import Product
+
+from .documents import INDEX_BATCH_SIZE, iter_document_products, save_documents
+from .facets import facet_index
+from .models import ProductSearchDocument
+
+logger = logging.getLogger('django')
+
+
+def index_products(product_ids):
+    """
+    重建指定产品的搜索文档，并标记分面索引待更新
+    :param product_ids: 产品ID的可迭代对象
+    """
+    tenant_product_ids = defaultdict(set)
+    for products in iter_document_products(set(product_ids)):
+        save_documents(products)
+        for product in products:
+            tenant_product_ids[product.tenant_id].add(product.pk)
+    for tenant_id, ids in tenant_product_ids.items():
+        facet_index.invalidate(tenant_id, ids)
+
+
+def rebuild_index(tenant=None, batch_size=INDEX_BATCH_SIZE):
+    """
+    重建全部（或指定租户）产品的搜索文档，按主键分批处理
+    :param tenant: 租户，为None时处理全部租户
+    :return: 处理的产品数
+    """
+    products = Product.original_objects.all()
+    documents = ProductSearchDocument.objects.all()
+    if tenant is not None:
+        products = products.filter(tenant=tenant)
+        documents = documents.filter(tenant=tenant)
+    # 删除产品已不存在或已转移到其他租户的文档
+    documents.exclude(product__in=products.values('pk')).delete()
+
+    total = 0
+    last_id = 0
+    while True:
+        ids = list(products.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return total
+        index_products(ids)
+        total += len(ids)
+        last_id = ids[-1]
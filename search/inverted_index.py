@@ -0,0 +1,406 @@
+"""
+内存倒排索引模块
+不依赖外部搜索服务的产品搜索：每个进程按租户在内存中维护产品搜索文档（见search.models）的倒排索引。
+中日韩文字按相邻两字（bigram）切分，字母数字按连续串切分；倒排表为按产品ID升序的array，每个ID占4字节。
+查询中的每个词按前缀匹配索引中的词（在有序词表上二分查找），如“sofa-0”匹配SKU“SOFA-001”；
+词中间的片段（如“fa-001”）不匹配，需要子串匹配时使用LIKE或FULLTEXT后端。
+
+索引的维护：
+- 进程首次搜索某租户时从磁盘快照加载，没有快照时从搜索文档表全量加载并写入快照；
+- 本进程写入搜索文档（见search.documents.save_documents）或删除产品的事务提交后更新，回滚时不更新；
+- 按INDEX_SYNC_INTERVAL间隔从文档表拉取更新时间晚于上次同步的文档，其他进程的写入在同步后可见；
+- 索引有更新时按INDEX_SNAPSHOT_INTERVAL间隔重写快照，从快照加载后需要同步的文档不会越积越多。
+其他进程删除的产品不会从本进程的索引中移除，但搜索结果总是与产品查询集取交集，不会返回已删除的产品
+"""
+import base64
+import bisect
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import unicodedata
+import zlib
+from array import array
+from collections import defaultdict
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .backends import SimpleSearchBackend, get_setting, parse_terms
+from .models import ProductSearchDocument
+
+logger = logging.getLogger('django')
+
+# 倒排表元素类型，4字节无符号整数
+TYPECODE = 'I'
+
+SNAPSHOT_FORMAT = 2
+
+# 增量同步时向前多取的时间，覆盖服务器间的时钟偏差与写入事务提交的延迟
+SYNC_OVERLAP = timedelta(seconds=5)
+
+# 平假名、片假名、中日韩统一表意文字（含扩展A）、韩文音节、兼容表意文字
+CJK_CHARS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff'
+TOKEN_PATTERN = re.compile(f'[{CJK_CHARS}]+|[0-9a-z]+')
+CJK_PATTERN = re.compile(f'[{CJK_CHARS}]')
+
+
+# 词表前缀范围的上界
+MAX_CHAR = chr(sys.maxunicode)
+
+
+def tokenize(text, document=False):
+    """
+    切分文本：中日韩文字的连续串按相邻两字切分（单个字保留为一个词），字母数字的连续串整体作为一个词
+    :param document: 切分的是文档而不是查询时，中日韩文字串的最后一个字也作为一个词，
+                     每个字都是某个词的开头，查询单个字时按前缀查找即可
+    :return: 词的生成器，可能有重复
+    """
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    for run in TOKEN_PATTERN.findall(text):
+        if len(run) > 1 and CJK_PATTERN.match(run):
+            for i in range(len(run) - 1):
+                yield run[i:i + 2]
+            if document:
+                yield run[-1]
+        else:
+            yield run
+
+
+def contains(posting, product_id):
+    """
+    有序倒排表中是否包含产品ID
+    """
+    i = bisect.bisect_left(posting, product_id)
+    return i < len(posting) and posting[i] == product_id
+
+
+class TenantIndex:
+    """
+    单个租户的倒排索引，由InvertedIndex加锁访问
+    """
+
+    def __init__(self):
+        # {词: 产品ID升序的array}
+        self.postings = {}
+        # {产品ID: 词元组}，更新、移除文档时用于定位倒排表
+        self.doc_tokens = {}
+        # 有序词表，用于前缀查找
+        self.vocabulary = []
+        # 已同步到的文档更新时间
+        self.synced_at = None
+        # 上次同步的时间（time.monotonic）
+        self.checked_at = None
+        # 上次写入快照的时间（time.monotonic），为None时表示索引自加载后还没有写入过快照
+        self.snapshot_at = None
+        # 上次写入快照后更新的文档数
+        self.changes = 0
+
+    def __len__(self):
+        return len(self.doc_tokens)
+
+    def add(self, product_id, text):
+        """
+        添加或替换产品的文档
+        """
+        self.remove(product_id)
+        self.changes += 1
+        tokens = tuple(sys.intern(token) for token in set(tokenize(text, document=True)))
+        for token in tokens:
+            posting = self.postings.get(token)
+            if posting is None:
+                self.postings[token] = array(TYPECODE, [product_id])
+                bisect.insort(self.vocabulary, token)
+            else:
+                posting.insert(bisect.bisect_left(posting, product_id), product_id)
+        self.doc_tokens[product_id] = tokens
+
+    def remove(self, product_id):
+        """
+        移除产品的文档
+        """
+        if product_id in self.doc_tokens:
+            self.changes += 1
+        for token in self.doc_tokens.pop(product_id, ()):
+            posting = self.postings[token]
+            del posting[bisect.bisect_left(posting, product_id)]
+            if not posting:
+                del self.postings[token]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+
+    def lookup(self, token):
+        """
+        以token为前缀的全部词的倒排表的并集
+        """
+        start = bisect.bisect_left(self.vocabulary, token)
+        end = bisect.bisect_right(self.vocabulary, token + MAX_CHAR, lo=start)
+        keys = self.vocabulary[start:end]
+        if len(keys) == 1:
+            return self.postings[keys[0]]
+        product_ids = set()
+        for key in keys:
+            product_ids.update(self.postings[key])
+        return array(TYPECODE, sorted(product_ids))
+
+    def match(self, tokens):
+        """
+        包含全部词的产品
+        :return: 产品ID列表，按ID降序
+        """
+        postings = sorted((self.lookup(token) for token in set(tokens)), key=len)
+        if not postings:
+            return []
+        # 从最短的倒排表出发，在其余倒排表中二分查找
+        first, rest = postings[0], postings[1:]
+        return [product_id for product_id in reversed(first) if all(contains(p, product_id) for p in rest)]
+
+    def to_snapshot(self):
+        return {
+            'format': SNAPSHOT_FORMAT,
+            'typecode': TYPECODE,
+            'itemsize': array(TYPECODE).itemsize,
+            'byteorder': sys.byteorder,
+            'synced_at': self.synced_at.isoformat(),
+            'postings': {
+                token: base64.b64encode(posting.tobytes()).decode('ascii')
+                for token, posting in self.postings.items()
+            },
+        }
+
+    @classmethod
+    def from_snapshot(cls, data):
+        """
+        从快照恢复索引，快照格式或字节序与当前进程不一致时抛出ValueError
+        """
+        layout = (data['format'], data['typecode'], data['itemsize'], data['byteorder'])
+        if layout != (SNAPSHOT_FORMAT, TYPECODE, array(TYPECODE).itemsize, sys.byteorder):
+            raise ValueError(f"快照格式不兼容: {layout}")
+        index = cls()
+        doc_tokens = defaultdict(list)
+        for token, encoded in data['postings'].items():
+            token = sys.intern(token)
+            posting = array(TYPECODE)
+            posting.frombytes(base64.b64decode(encoded))
+            index.postings[token] = posting
+            for product_id in posting:
+                doc_tokens[product_id].append(token)
+        index.doc_tokens = {product_id: tuple(tokens) for product_id, tokens in doc_tokens.items()}
+        index.vocabulary = sorted(index.postings)
+        index.synced_at = parse_datetime(data['synced_at'])
+        return index
+
+
+class InvertedIndex:
+    """
+    进程内按租户的倒排索引
+    用法：
+        product_ids = inverted_index.search(tenant_id, '布艺沙发')
+        inverted_index.update(documents)
+        inverted_index.remove(tenant_id, product_ids)
+    """
+
+    def __init__(self):
+        self._tenants = {}
+        self._lock = threading.RLock()
+
+    def get(self, tenant_id):
+        """
+        获取租户的索引，首次使用时加载，超过同步间隔时增量同步并按需重写快照
+        """
+        with self._lock:
+            index = self._tenants.get(tenant_id)
+            if index is None:
+                index = self._tenants[tenant_id] = self.load(tenant_id)
+            elif time.monotonic() - index.checked_at >= get_setting('INDEX_SYNC_INTERVAL'):
+                self.sync(index, tenant_id)
+                self.refresh_snapshot(tenant_id, index)
+            return index
+
+    def search(self, tenant_id, query):
+        """
+        搜索租户的产品，查询中的每个词都需匹配
+        :return: 产品ID列表，按ID降序
+        """
+        tokens = [token for term in parse_terms(query) for token in tokenize(term)]
+        if not tokens:
+            return []
+        with self._lock:
+            return self.get(tenant_id).match(tokens)
+
+    def update(self, documents):
+        """
+        本进程写入搜索文档后更新已加载的租户索引，未加载的租户在首次使用时从文档表加载
+        """
+        with self._lock:
+            for document in documents:
+                for tenant_id, index in self._tenants.items():
+                    if tenant_id == document.tenant_id:
+                        index.add(document.product_id, f'{document.keywords} {document.content}')
+                    else:
+                        # 产品转移到其他租户
+                        index.remove(document.product_id)
+
+    def remove(self, tenant_id, product_ids):
+        """
+        从租户索引中移除已删除的产品
+        """
+        with self._lock:
+            index = self._tenants.get(tenant_id)
+            if index is not None:
+                for product_id in product_ids:
+                    index.remove(product_id)
+
+    def load(self, tenant_id):
+        """
+        加载租户的索引：优先读取快照并增量同步，没有可用快照时从文档表全量构建
+        """
+        index = self.read_snapshot(tenant_id)
+        if index is not None:
+            index.changes = 0
+            self.sync(index, tenant_id)
+            self.refresh_snapshot(tenant_id, index)
+            return index
+        index = self.build(tenant_id)
+        self.write_snapshot(tenant_id, index)
+        return index
+
+    def build(self, tenant_id):
+        """
+        从搜索文档表全量构建租户的索引
+        """
+        index = TenantIndex()
+        index.synced_at = timezone.now()
+        index.checked_at = time.monotonic()
+        rows = (
+            ProductSearchDocument.objects.filter(tenant_id=tenant_id)
+            .order_by('product_id')
+            .values_list('product_id', 'keywords', 'content')
+        )
+        for product_id, keywords, content in rows.iterator(chunk_size=2000):
+            index.add(product_id, f'{keywords} {content}')
+        return index
+
+    def sync(self, index, tenant_id):
+        """
+        拉取上次同步以来更新的文档
+        """
+        now = timezone.now()
+        rows = ProductSearchDocument.objects.filter(
+            tenant_id=tenant_id, updated_at__gte=index.synced_at - SYNC_OVERLAP,
+        ).values_list('product_id', 'keywords', 'content')
+        for product_id, keywords, content in rows.iterator(chunk_size=2000):
+            index.add(product_id, f'{keywords} {content}')
+        index.synced_at = now
+        index.checked_at = time.monotonic()
+
+    def snapshot_path(self, tenant_id):
+        """
+        租户快照文件路径，未配置快照目录时返回None
+        """
+        directory = get_setting('INDEX_SNAPSHOT_DIR')
+        if not directory:
+            return None
+        return os.path.join(directory, f'tenant-{tenant_id}.idx')
+
+    def read_snapshot(self, tenant_id):
+        path = self.snapshot_path(tenant_id)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return TenantIndex.from_snapshot(json.loads(zlib.decompress(f.read())))
+        except (OSError, ValueError, KeyError, TypeError, zlib.error) as e:
+            logger.warning(f"读取搜索索引快照失败 {path}: {e}")
+            return None
+
+    def refresh_snapshot(self, tenant_id, index):
+        """
+        快照写入后索引有更新且超过INDEX_SNAPSHOT_INTERVAL时重写快照；
+        从快照加载后同步到更新时立即重写，下次启动的进程不必重放同样的文档
+        """
+        if not index.changes:
+            return
+        if index.snapshot_at is None or time.monotonic() - index.snapshot_at >= get_setting('INDEX_SNAPSHOT_INTERVAL'):
+            self.write_snapshot(tenant_id, index)
+
+    def write_snapshot(self, tenant_id, index):
+        """
+        写入租户快照，先写临时文件再替换，读取方不会读到写了一半的文件
+        """
+        path = self.snapshot_path(tenant_id)
+        if path is None:
+            return
+        index.snapshot_at = time.monotonic()
+        index.changes = 0
+        directory = os.path.dirname(path)
+        data = zlib.compress(json.dumps(index.to_snapshot(), ensure_ascii=False).encode('utf-8'))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tenant-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except OSError:
+                os.unlink(temp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"写入搜索索引快照失败 {path}: {e}")
+
+    def save_snapshot(self, tenant_id):
+        """
+        从文档表构建租户索引并写入快照，供重建搜索文档后各进程加载
+        """
+        self.write_snapshot(tenant_id, self.build(tenant_id))
+
+    def clear(self):
+        """
+        清空进程内的索引，下次使用时重新加载，用于测试
+        """
+        with self._lock:
+            self._tenants.clear()
+
+
+inverted_index = InvertedIndex()
+
+
+class InvertedIndexBackend(SimpleSearchBackend):
+    """
+    基于进程内倒排索引的搜索后端，无需外部搜索服务
+    未指定租户（超级管理员跨租户搜索）或匹配的产品超过INDEX_MAX_IDS时，退回到文档表上的LIKE匹配
+    """
+
+    def match(self, query, tenant_id):
+        """
+        在倒排索引中搜索，需要退回LIKE匹配时返回None
+        """
+        if tenant_id is None:
+            return None
+        product_ids = inverted_index.search(tenant_id, query)
+        if len(product_ids) > get_setting('INDEX_MAX_IDS'):
+            return None
+        return product_ids
+
+    def filter(self, queryset, query, tenant_id=None):
+        if not parse_terms(query):
+            return queryset
+        product_ids = self.match(query, tenant_id)
+        if product_ids is None:
+            return super().filter(queryset, query, tenant_id)
+        return queryset.filter(pk__in=product_ids)
+
+    def search(self, query, tenant_id=None, limit=20):
+        if tenant_id is None:
+            return super().search(query, tenant_id, limit)
+        return inverted_index.search(tenant_id, query)[:limit]
+
+    def update_documents(self, documents):
+        inverted_index.update(documents)
+
+    def remove_products(self, tenant_id, product_ids):
+        inverted_index.remove(tenant_id, product_ids)
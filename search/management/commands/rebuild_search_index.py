@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from common.models import Tenant
+from search.backends import get_setting
+from search.documents import INDEX_BATCH_SIZE
+from search.indexing import rebuild_index
+from search.inverted_index import inverted_index
+from search.models import ProductSearchDocument
+
+
+class Command(BaseCommand):
+    help = '分批重建产品搜索文档'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='只重建指定租户ID的产品')
+        parser.add_argument('--batch-size', type=int, help='每批处理的产品数', default=INDEX_BATCH_SIZE)
+        parser.add_argument('--snapshot', action='store_true', help='重建后写入内存倒排索引的快照')
+
+    def handle(self, *args, **options):
+        if options['snapshot'] and not get_setting('INDEX_SNAPSHOT_DIR'):
+            raise CommandError("未配置PRODUCT_SEARCH['INDEX_SNAPSHOT_DIR']")
+        tenant = None
+        if options['tenant']:
+            tenant = Tenant.objects.filter(pk=options['tenant']).first()
+            if tenant is None:
+                raise CommandError(f"租户{options['tenant']}不存在")
+        total = rebuild_index(tenant=tenant, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"已重建{total}个产品的搜索文档"))
+
+        if options['snapshot']:
+            if tenant is not None:
+                tenant_ids = [tenant.pk]
+            else:
+                tenant_ids = list(
+                    ProductSearchDocument.objects.exclude(tenant=None)
+                    .order_by().values_list('tenant_id', flat=True).distinct()
+                )
+            for tenant_id in tenant_ids:
+                inverted_index.save_snapshot(tenant_id)
+            self.stdout.write(self.style.SUCCESS(f"已写入{len(tenant_ids)}个租户的索引快照"))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('common', '0003_tenant_is_deleted'),
+        ('products', '0005_product_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchDocument',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='products.product')),
+                ('keywords', models.TextField(blank=True, help_text='名称、SKU、VL ID、GTIN、品牌、标签与分类名称')),
+                ('content', models.TextField(blank=True, help_text='简短描述与描述的纯文本')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='common.tenant')),
+            ],
+            options={
+                'verbose_name': '产品搜索文档',
+                'verbose_name_plural': '产品搜索文档',
+                'db_table': 'product_search_documents',
+            },
+        ),
+    ]
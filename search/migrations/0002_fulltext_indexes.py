@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+def create_fulltext_indexes(apps, schema_editor):
+    """
+    MySQL下创建ngram解析器的FULLTEXT索引，其他数据库使用LIKE后端，不需要索引
+    """
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(
+        'ALTER TABLE product_search_documents '
+        'ADD FULLTEXT INDEX product_search_fulltext (keywords, content) WITH PARSER ngram, '
+        'ADD FULLTEXT INDEX product_search_keywords (keywords) WITH PARSER ngram'
+    )
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(
+        'ALTER TABLE product_search_documents '
+        'DROP INDEX product_search_fulltext, DROP INDEX product_search_keywords'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_indexes, drop_fulltext_indexes),
+    ]
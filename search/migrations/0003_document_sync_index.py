@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0003_tenant_is_deleted'),
+        ('products', '0005_product_keyset_index'),
+        ('search', '0002_fulltext_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productsearchdocument',
+            index=models.Index(fields=['tenant', 'updated_at'], name='search_doc_tenant_updated_idx'),
+        ),
+    ]
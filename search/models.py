@@ -0,0 +1,32 @@
+"""
+搜索模块模型
+"""
+from django.db import models
+
+from common.models import Tenant
+from products.models import Product
+
+
+class ProductSearchDocument(models.Model):
+    """
+    产品搜索文档
+    每个产品一行，把产品及其标签、分类中参与搜索的文本合并为两列，搜索时只查询本表，不再连接多对多表。
+    MySQL下两列上建有ngram解析器的FULLTEXT索引，见迁移0001
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, null=True, related_name='+')
+    keywords = models.TextField(blank=True, help_text="名称、SKU、VL ID、GTIN、品牌、标签与分类名称")
+    content = models.TextField(blank=True, help_text="简短描述与描述的纯文本")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'product_search_documents'
+        verbose_name = '产品搜索文档'
+        verbose_name_plural = '产品搜索文档'
+        indexes = [
+            # 内存倒排索引按租户增量同步
+            models.Index(fields=['tenant', 'updated_at'], name='search_doc_tenant_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}的搜索文档"
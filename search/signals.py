@@ -0,0 +1,131 @@
+"""
+搜索文档更新信号处理
+产品保存、标签与分类关系变更、标签与分类改名或删除后，重建受影响产品的搜索文档；
+产品删除时文档随外键级联删除，并在事务提交后通知搜索后端移除，同时标记分面索引；
+变体属性的变更在事务提交后合并处理
+"""
+import threading
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from products.models import Category, Product, ProductVariation, Tag, VariationAttribute
+
+from .backends import get_search_backend
+from .facets import facet_index
+from .indexing import index_products
+
+# 当前线程中待处理的变体ID与产品ID
+_pending = threading.local()
+
+# 标签、分类在产品上的多对多字段名
+LABEL_FIELDS = {Tag: 'tags', Category: 'categories'}
+
+
+def label_product_ids(label):
+    """
+    标签或分类关联的全部产品ID，不受当前租户上下文影响
+    """
+    return list(Product.original_objects.filter(**{LABEL_FIELDS[type(label)]: label}).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Product, dispatch_uid='search_index_product')
+def index_saved_product(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product, dispatch_uid='search_remove_product')
+def remove_deleted_product(sender, instance, **kwargs):
+    transaction.on_commit(partial(get_search_backend().remove_products, instance.tenant_id, [instance.pk]))
+    facet_index.invalidate(instance.tenant_id, [instance.pk])
+
+
+@receiver(m2m_changed, sender=Product.tags.through, dispatch_uid='search_index_product_tags')
+@receiver(m2m_changed, sender=Product.categories.through, dispatch_uid='search_index_product_categories')
+def index_relation_changes(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    正向变更（product.tags.add）时重建该产品；反向变更（tag.products.add）时重建涉及的产品，
+    反向清空时在清空前记录产品ID
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            index_products([instance.pk])
+        return
+    if action == 'pre_clear':
+        instance._search_product_ids = label_product_ids(instance)
+    elif action == 'post_clear':
+        index_products(getattr(instance, '_search_product_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        index_products(pk_set or [])
+
+
+@receiver(post_save, sender=Tag, dispatch_uid='search_index_tag_products')
+@receiver(post_save, sender=Category, dispatch_uid='search_index_category_products')
+def index_renamed_label(sender, instance, created, raw=False, **kwargs):
+    """
+    标签或分类保存后重建其产品的文档，新建时还没有产品
+    """
+    if not created and not raw:
+        index_products(label_product_ids(instance))
+
+
+@receiver(pre_delete, sender=Tag, dispatch_uid='search_collect_tag_products')
+@receiver(pre_delete, sender=Category, dispatch_uid='search_collect_category_products')
+def collect_label_products(sender, instance, **kwargs):
+    instance._search_product_ids = label_product_ids(instance)
+
+
+@receiver(post_delete, sender=Tag, dispatch_uid='search_index_deleted_tag_products')
+@receiver(post_delete, sender=Category, dispatch_uid='search_index_deleted_category_products')
+def index_deleted_label_products(sender, instance, **kwargs):
+    index_products(getattr(instance, '_search_product_ids', []))
+
+
+def index_pending():
+    """
+    重建待处理变体所属产品的文档；已不存在的变体与产品忽略。
+    事务回滚时留下的ID在下次处理时一并处理
+    """
+    variation_ids = getattr(_pending, 'variation_ids', None)
+    product_ids = getattr(_pending, 'product_ids', None)
+    if not variation_ids and not product_ids:
+        return
+    _pending.variation_ids, _pending.product_ids = set(), set()
+    if variation_ids:
+        product_ids = set(product_ids or ()) | set(
+            ProductVariation.original_objects.filter(pk__in=variation_ids).values_list('product_id', flat=True)
+        )
+    index_products(product_ids)
+
+
+def mark_pending(variation_id=None, product_id=None):
+    """
+    记录待处理的变体或产品，在事务提交后合并处理
+    """
+    if variation_id is not None:
+        _pending.__dict__.setdefault('variation_ids', set()).add(variation_id)
+    if product_id is not None:
+        _pending.__dict__.setdefault('product_ids', set()).add(product_id)
+    # 每次都登记回调，第一个执行的回调处理全部记录，其余的直接返回
+    transaction.on_commit(index_pending)
+
+
+@receiver(post_save, sender=VariationAttribute, dispatch_uid='search_index_variation_attribute_saved')
+@receiver(post_delete, sender=VariationAttribute, dispatch_uid='search_index_variation_attribute_deleted')
+def index_variation_attribute(sender, instance, raw=False, **kwargs):
+    """
+    变体属性变更影响所属产品的属性分面；导入会批量删除变体属性，因此不在此处逐个查询
+    """
+    if not raw:
+        mark_pending(variation_id=instance.variation_id)
+
+
+@receiver(post_delete, sender=ProductVariation, dispatch_uid='search_index_deleted_variation')
+def index_deleted_variation(sender, instance, **kwargs):
+    """
+    删除变体后其属性随之删除，所属产品的属性分面需要更新
+    """
+    mark_pending(product_id=instance.product_id)
@@ -0,0 +1,133 @@
+import csv
+import gzip
+import io
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.http import FileResponse
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from exports.models import ExportList, ExportListItem, ExportTemplate
+from imports.importer import WooCommerceImporter
+from imports.models import ImportHistory
+from products.models import Product
+from tests.factories.user_factories import UserFactory
+
+
+SAMPLE_CSV = os.path.join(settings.BASE_DIR, 'vSimpleNew2.csv')
+
+
+class ExportDownloadAPITest(APITestCase):
+    """测试导出清单流式下载"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.user = UserFactory()
+        history = ImportHistory.objects.create(user=self.user, file_name='v.csv', file_path=SAMPLE_CSV)
+        WooCommerceImporter(history).run()
+
+        self.export_list = ExportList.objects.create(user=self.user, name='餐桌清单')
+        product = Product.original_objects.get(sku='VL-EXCL-DT-056')
+        for variation in product.variations.all():
+            ExportListItem.objects.create(export_list=self.export_list, variation=variation)
+        ExportListItem.objects.create(export_list=self.export_list, product=product)
+        self.url = reverse('exports:export_list_download', args=[self.export_list.pk])
+        self.client.force_authenticate(user=self.user)
+
+    def test_download_streams_woocommerce_csv(self):
+        """测试下载内容为流式响应，表头与WooCommerce模板一致"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        rows = list(csv.reader(io.StringIO(content)))
+
+        with open(SAMPLE_CSV, newline='', encoding='utf-8-sig') as f:
+            self.assertEqual(rows[0], next(csv.reader(f)))
+        self.assertEqual([row[0] for row in rows[1:]], ['variable', 'variation', 'variation', 'variation'])
+
+    def test_exported_file_can_be_reimported(self):
+        """测试导出的文件重新导入时内容不变"""
+        response = self.client.get(self.url)
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'wb') as f:
+            f.writelines(response.streaming_content)
+        self.addCleanup(os.remove, path)
+
+        history = ImportHistory.objects.create(user=self.user, file_name='export.csv', file_path=path)
+        history = WooCommerceImporter(history).run()
+        self.assertEqual(history.error_rows, 0)
+        self.assertEqual((history.created_rows, history.processed_rows), (0, 4))
+
+    def test_other_users_list_not_found(self):
+        """测试不能下载其他用户的导出清单"""
+        self.client.force_authenticate(user=UserFactory())
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_download_with_template_columns(self):
+        """测试指定导出模板时只导出模板配置的列"""
+        template = ExportTemplate.objects.create(
+            user=UserFactory(), name='简易', is_public=True,
+            fields={'columns': ['Type', 'SKU', {'column': 'Regular price', 'header': '价格'}]},
+        )
+        response = self.client.get(self.url, {'template': template.pk})
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], ['Type', 'SKU', '价格'])
+        self.assertEqual(rows[1][:2], ['variable', 'VL-EXCL-DT-056'])
+
+    def test_invalid_template_columns(self):
+        """测试模板包含未知列时返回参数错误，其他用户的私有模板不可用"""
+        template = ExportTemplate.objects.create(user=self.user, name='错误', fields={'columns': ['Unknown']})
+        response = self.client.get(self.url, {'template': template.pk})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        private = ExportTemplate.objects.create(user=UserFactory(), name='私有', fields={'columns': ['SKU']})
+        response = self.client.get(self.url, {'template': private.pk})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unchanged_list_served_from_artifact(self):
+        """测试内容未变化时直接返回已生成的文件，支持gzip与ETag"""
+        first = self.client.get(self.url)
+        content = b''.join(first.streaming_content)
+        self.assertNotIsInstance(first, FileResponse)
+
+        second = self.client.get(self.url)
+        self.assertIsInstance(second, FileResponse)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(b''.join(second.streaming_content), content)
+
+        compressed = self.client.get(self.url, HTTP_ACCEPT_ENCODING='br, gzip;q=0.8')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        self.assertEqual(gzip.decompress(b''.join(compressed.streaming_content)), content)
+
+        not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_modified_product_regenerates_artifact(self):
+        """测试清单中的产品被修改后重新生成文件"""
+        first = self.client.get(self.url)
+        b''.join(first.streaming_content)
+
+        product = Product.original_objects.get(sku='VL-EXCL-DT-056')
+        product.name = '新名称'
+        product.save()
+        second = self.client.get(self.url)
+        self.assertNotIsInstance(second, FileResponse)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        content = b''.join(second.streaming_content).decode('utf-8-sig')
+        self.assertIn('新名称', content)
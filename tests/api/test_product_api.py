@@ -0,0 +1,249 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from common.tenant_cache import tenant_cache
+from common.tenant_middleware import set_current_tenant
+from products.categories import category_product_counts
+from search.facets import facet_index
+from products.models import (
+    Attribute, AttributeValue, Category, Product, ProductImage, ProductVariation, Tag, VariationAttribute,
+)
+from tests.factories.tenant_factories import TenantFactory
+from tests.factories.user_factories import UserFactory
+from users.authentication import TokenManager
+from users.token_cache import token_cache
+
+
+class ProductAPITest(APITestCase):
+    """测试产品列表与详情API"""
+
+    def setUp(self):
+        set_current_tenant(None)
+        cache.clear()
+        token_cache.clear()
+        tenant_cache.clear()
+        facet_index.clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(set_current_tenant, None)
+        self.addCleanup(facet_index.clear)
+
+        self.tenant = TenantFactory()
+        self.user = UserFactory(tenant=self.tenant)
+        self.sofa = Category.objects.create(tenant=self.tenant, name='沙发', slug='sofa')
+        self.table = Category.objects.create(tenant=self.tenant, name='餐桌', slug='table')
+        self.tag = Tag.objects.create(tenant=self.tenant, name='木质', slug='wood')
+        self.color = Attribute.objects.create(tenant=self.tenant, name='颜色', slug='color')
+        self.red = AttributeValue.objects.create(tenant=self.tenant, attribute=self.color, name='红色', slug='red')
+        for i in range(3):
+            self.create_product(i)
+
+        other = TenantFactory()
+        Product.objects.create(tenant=other, name='其他租户产品', slug='other', sku='OTHER', price=Decimal('1'))
+
+        access_token, _, _, _ = TokenManager.generate_tokens(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        self.url = reverse('products:product_list')
+
+    def create_product(self, i):
+        product = Product.objects.create(
+            tenant=self.tenant, name=f'布艺沙发{i}', slug=f'sofa-{i}', sku=f'SOFA-{i}',
+            type='variable', status='published', price=Decimal(100 * (i + 1)), featured=i == 0,
+            description='很长的描述' * 100,
+        )
+        product.categories.add(self.sofa if i % 2 == 0 else self.table)
+        product.tags.add(self.tag)
+        ProductImage.objects.create(tenant=self.tenant, product=product, image_url=f'https://img/{i}.jpg', is_featured=True)
+        ProductImage.objects.create(tenant=self.tenant, product=product, image_url=f'https://img/{i}-2.jpg', order=1)
+        for j in range(2):
+            variation = ProductVariation.objects.create(tenant=self.tenant, product=product, sku=f'SOFA-{i}-{j}')
+            VariationAttribute.objects.create(tenant=self.tenant, variation=variation, attribute=self.color, value=self.red)
+        return product
+
+    def test_list_returns_tenant_products_with_summary_fields(self):
+        """测试列表只返回当前租户的产品，包含分类、标签、主图与变体数量"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        items = response.data['data']
+        self.assertEqual([item['sku'] for item in items], ['SOFA-2', 'SOFA-1', 'SOFA-0'])
+        self.assertEqual(response.data['meta']['pagination']['total'], 3)
+        item = items[2]
+        self.assertEqual(item['categories'], [{'id': self.sofa.id, 'name': '沙发', 'slug': 'sofa'}])
+        self.assertEqual(item['tags'][0]['slug'], 'wood')
+        self.assertEqual(item['featured_image']['url'], 'https://img/0.jpg')
+        self.assertEqual(item['variation_count'], 2)
+        self.assertNotIn('description', item)
+
+    def test_list_filters_and_sorting(self):
+        """测试搜索、过滤与排序参数"""
+        def skus(**params):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return [item['sku'] for item in response.data['data']]
+
+        self.assertEqual(skus(search='sofa-1'), ['SOFA-1'])
+        self.assertEqual(skus(category=self.sofa.id, sort='price'), ['SOFA-0', 'SOFA-2'])
+        self.assertEqual(skus(min_price='150', max_price='300', sort='price', order='desc'), ['SOFA-2', 'SOFA-1'])
+        self.assertEqual(skus(featured='true'), ['SOFA-0'])
+        self.assertEqual(skus(status='draft'), [])
+        self.assertEqual(skus(sort='name', per_page=2), ['SOFA-0', 'SOFA-1'])
+        for params in ({'sort': 'description'}, {'min_price': 'abc'}, {'type': 'unknown'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_query_count_is_constant(self):
+        """测试列表的查询次数固定，不随产品数量增加"""
+        self.client.get(self.url)
+        # 用户、产品分页、分类、标签、主图各1条；令牌、租户与总数来自缓存
+        with self.assertNumQueries(5):
+            self.client.get(self.url)
+
+        for i in range(3, 8):
+            self.create_product(i)
+        self.client.get(self.url)
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data['data']), 8)
+
+    def test_list_facets(self):
+        """测试分面统计：同一过滤项内为“或”，统计某项时不应用该项自身的过滤，产品变更后统计随之更新"""
+        def facets(**params):
+            response = self.client.get(self.url, {'facets': 'true', **params})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return response.data['meta']['facets']
+
+        result = facets()
+        self.assertEqual(result['type'], [{'value': 'variable', 'count': 3}])
+        self.assertEqual(result['category'], [{'value': self.sofa.id, 'count': 2}, {'value': self.table.id, 'count': 1}])
+        self.assertEqual(result['featured'], [{'value': False, 'count': 2}, {'value': True, 'count': 1}])
+        self.assertEqual(result['price'], [{'value': '100-500', 'min': 100, 'max': 500, 'count': 3}])
+        self.assertEqual(result['attributes'], [{'attribute': self.color.id, 'values': [{'value': self.red.id, 'count': 3}]}])
+
+        result = facets(category=self.sofa.id)
+        self.assertEqual(result['category'], [{'value': self.sofa.id, 'count': 2}, {'value': self.table.id, 'count': 1}])
+        self.assertEqual(result['tags'], [{'value': self.tag.id, 'count': 2}])
+        self.assertEqual(facets(search='sofa-1')['type'], [{'value': 'variable', 'count': 1}])
+        self.assertEqual(facets(max_price='150')['tags'], [{'value': self.tag.id, 'count': 1}])
+
+        # 变体属性在事务提交后更新
+        blue = AttributeValue.objects.create(tenant=self.tenant, attribute=self.color, name='蓝色', slug='blue')
+        variation = ProductVariation.objects.get(sku='SOFA-1-0')
+        variation_attribute = VariationAttribute.objects.get(variation=variation)
+        variation_attribute.value = blue
+        with self.captureOnCommitCallbacks(execute=True):
+            variation_attribute.save()
+        response = self.client.get(self.url, {'facets': 'true', 'attributes': blue.id})
+        self.assertEqual([item['sku'] for item in response.data['data']], ['SOFA-1'])
+        result = response.data['meta']['facets']
+        self.assertEqual(result['attributes'][0]['values'], [
+            {'value': self.red.id, 'count': 3}, {'value': blue.id, 'count': 1},
+        ])
+        self.assertEqual(result['category'], [{'value': self.table.id, 'count': 1}])
+
+        product = Product.objects.get(sku='SOFA-0')
+        product.status = 'draft'
+        product.save()
+        self.assertEqual(facets()['status'], [{'value': 'published', 'count': 2}, {'value': 'draft', 'count': 1}])
+        product.delete()
+        self.assertEqual(facets()['status'], [{'value': 'published', 'count': 2}])
+
+    def test_list_facets_add_no_queries(self):
+        """测试分面索引加载后，返回分面统计不增加查询"""
+        params = {'facets': 'true', 'tags': self.tag.id, 'type': 'variable,simple'}
+        self.client.get(self.url, params)
+        # 与不返回分面统计时相同：用户、产品分页、分类、标签、主图各1条
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url, params)
+        self.assertEqual(len(response.data['data']), 3)
+        self.assertEqual(response.data['meta']['facets']['tags'], [{'value': self.tag.id, 'count': 3}])
+
+    def test_list_category_includes_descendants(self):
+        """测试按分类过滤包含子孙分类的产品，产品属于多个子孙分类时只返回一次"""
+        sofa_set = Category.objects.create(tenant=self.tenant, name='组合沙发', slug='sofa-set', parent=self.sofa)
+        corner = Category.objects.create(tenant=self.tenant, name='转角沙发', slug='corner', parent=sofa_set)
+        product = Product.objects.get(sku='SOFA-1')
+        product.categories.add(sofa_set, corner)
+
+        response = self.client.get(self.url, {'category': self.sofa.id})
+        self.assertEqual([item['sku'] for item in response.data['data']], ['SOFA-2', 'SOFA-1', 'SOFA-0'])
+        self.assertEqual(response.data['meta']['pagination']['total'], 3)
+        response = self.client.get(self.url, {'category': corner.id, 'facets': 'true'})
+        self.assertEqual([item['sku'] for item in response.data['data']], ['SOFA-1'])
+        self.assertEqual(response.data['meta']['facets']['tags'], [{'value': self.tag.id, 'count': 1}])
+
+    def test_list_unknown_filter_values(self):
+        """测试不存在的分类与属性值返回空列表"""
+        for params in ({'category': 999999}, {'attributes': 999999}, {'category': 999999, 'facets': 'true'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['data'], [])
+            self.assertEqual(response.data['meta']['pagination']['total'], 0)
+
+    def test_category_products(self):
+        """测试分类产品列表：默认包含子孙分类，返回含子孙分类的产品数，其他租户的分类返回404"""
+        child = Category.objects.create(tenant=self.tenant, name='布艺沙发', slug='fabric', parent=self.sofa)
+        product = Product.objects.get(sku='SOFA-1')
+        product.categories.add(child)
+        url = reverse('products:category_product_list', args=[self.sofa.id])
+
+        response = self.client.get(url, {'facets': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['sku'] for item in response.data['data']], ['SOFA-2', 'SOFA-1', 'SOFA-0'])
+        self.assertEqual(response.data['meta']['category'], {'id': self.sofa.id, 'name': '沙发', 'product_count': 3})
+        # 分面统计限定在分类范围内，不统计分类外的产品
+        self.assertEqual(response.data['meta']['facets']['category'], [
+            {'value': self.sofa.id, 'count': 2}, {'value': self.table.id, 'count': 1}, {'value': child.id, 'count': 1},
+        ])
+        self.assertEqual(response.data['meta']['facets']['type'], [{'value': 'variable', 'count': 3}])
+
+        response = self.client.get(url, {'include_descendants': 'false', 'status': 'published'})
+        self.assertEqual([item['sku'] for item in response.data['data']], ['SOFA-2', 'SOFA-0'])
+
+        other = Category.objects.create(tenant=TenantFactory(), name='其他', slug='other')
+        response = self.client.get(reverse('products:category_product_list', args=[other.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_category_product_counts(self):
+        """测试含子孙分类的产品数只查询一次并缓存，产品、分类关系变更与分类移动后失效"""
+        child = Category.objects.create(tenant=self.tenant, name='布艺沙发', slug='fabric', parent=self.sofa)
+        grandchild = Category.objects.create(tenant=self.tenant, name='小户型', slug='small', parent=child)
+        product = Product.objects.get(sku='SOFA-1')
+        product.categories.add(child, grandchild)
+
+        with self.assertNumQueries(1):
+            counts = category_product_counts(self.tenant.id)
+        self.assertEqual(counts, {self.sofa.id: 3, child.id: 1, grandchild.id: 1, self.table.id: 1})
+        with self.assertNumQueries(0):
+            category_product_counts(self.tenant.id)
+
+        Product.objects.get(sku='SOFA-2').categories.add(grandchild)
+        self.assertEqual(category_product_counts(self.tenant.id)[child.id], 2)
+
+        child.move_to(self.table)
+        counts = category_product_counts(self.tenant.id)
+        self.assertEqual(counts[self.sofa.id], 2)
+        self.assertEqual(counts[self.table.id], 2)
+
+    def test_detail(self):
+        """测试详情返回完整信息，查询次数固定"""
+        product = Product.objects.get(sku='SOFA-0')
+        url = reverse('products:product_detail', args=[product.id])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # 用户、产品与8个预取查询
+        self.assertEqual(len(queries), 10)
+        data = response.data['data']
+        self.assertEqual(len(data['images']), 2)
+        self.assertEqual(len(data['variations']), 2)
+        self.assertEqual(data['variations'][0]['attributes'][0]['value'], '红色')
+        self.assertTrue(data['description'])
+
+        other = Product.original_objects.get(sku='OTHER')
+        response = self.client.get(reverse('products:product_detail', args=[other.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -2,9 +2,12 @@ from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from common.models import Tenant
 from tests.factories.tenant_factories import TenantFactory
 from tests.factories.user_factories import SuperAdminFactory, TenantAdminFactory, UserFactory
+from users.models import UserToken
 import json
 import time
 
@@ -420,3 +423,34 @@ class UserTenantAssignAPITest(APITestCase):
         # 验证用户未被分配
         self.user_without_tenant.refresh_from_db()
         self.assertIsNone(self.user_without_tenant.tenant)
+
+
+class LoginTokenIssuanceTest(APITestCase):
+    """测试登录时令牌的签发写入"""
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.url = reverse('users:login')
+
+    def login(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                self.url, {'username': self.user.username, 'password': 'password'}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [query['sql'] for query in queries]
+
+    def test_tokens_issued_in_one_batch(self):
+        """测试令牌失效只执行一次UPDATE，令牌对只执行一次INSERT，最后登录时间只更新一次"""
+        self.login()
+        queries = self.login()
+
+        token_updates = [sql for sql in queries if sql.startswith('UPDATE "user_tokens"')]
+        token_inserts = [sql for sql in queries if sql.startswith('INSERT INTO "user_tokens"')]
+        user_updates = [sql for sql in queries if sql.startswith('UPDATE "users"')]
+        self.assertEqual((len(token_updates), len(token_inserts), len(user_updates)), (1, 1, 1))
+
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+        self.assertEqual(UserToken.objects.filter(user=self.user, is_valid=True).count(), 2)
+        self.assertEqual(UserToken.objects.filter(user=self.user).count(), 4)
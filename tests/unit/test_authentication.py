@@ -0,0 +1,275 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+import jwt
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from common.exceptions import TokenException
+from common.tenant_cache import tenant_cache
+from common.tenant_middleware import set_current_tenant
+from users.authentication import TokenManager
+from users.models import TokenRevocation, UserToken
+from users.revocation import revocation_list
+from users.token_cache import token_cache
+from tests.factories.tenant_factories import TenantFactory
+from tests.factories.user_factories import UserFactory
+
+
+class CachedJWTAuthenticationTest(TestCase):
+    """测试JWT认证的令牌验证缓存"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.user = UserFactory()
+        self.access_token, self.refresh_token, _, _ = TokenManager.generate_tokens(self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+        self.url = reverse('users:profile')
+
+    def get_profile(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        token_queries = [query for query in queries if 'user_tokens' in query['sql']]
+        return response, token_queries
+
+    def test_cached_token_skips_token_table(self):
+        """测试令牌验证后再次请求不查询令牌表"""
+        response, token_queries = self.get_profile()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(token_queries), 1)
+
+        response, token_queries = self.get_profile()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(token_queries, [])
+
+    def test_invalidated_tokens_are_rejected(self):
+        """测试令牌失效、重新登录后缓存的令牌不再可用"""
+        self.get_profile()
+        with self.captureOnCommitCallbacks(execute=True):
+            TokenManager.invalidate_user_tokens(self.user)
+        response, _ = self.get_profile()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        access_token, _, _, _ = TokenManager.generate_tokens(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        self.assertEqual(self.get_profile()[0].status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(token_cache.get(access_token))
+        with self.captureOnCommitCallbacks(execute=True):
+            TokenManager.generate_tokens(self.user)
+        self.assertIsNone(token_cache.get(access_token))
+
+    def test_revocation_version_changes_after_commit(self):
+        """测试外层事务中使令牌失效时，吊销版本号在事务提交后才递增，回滚时不递增"""
+        version = token_cache.get_version(self.user.id)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                TokenManager.generate_tokens(self.user)
+                TokenManager.invalidate_user_tokens(self.user)
+                self.assertEqual(token_cache.get_version(self.user.id), version)
+            self.assertEqual(token_cache.get_version(self.user.id), version)
+        self.assertEqual(len(callbacks), 2)
+        self.assertEqual(token_cache.get_version(self.user.id), version + 2)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    TokenManager.invalidate_user_tokens(self.user)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(token_cache.get_version(self.user.id), version + 2)
+
+    @override_settings(
+        CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'auth': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'auth-test'},
+        },
+        AUTH_TOKEN_CACHE={'SHARED_ALIAS': 'auth'},
+    )
+    def test_shared_tier_revocation(self):
+        """测试共享层：本地层清空后从共享层命中，吊销版本号在共享层递增"""
+        self.addCleanup(caches['auth'].clear)
+        self.get_profile()
+        token_cache.clear()
+        response, token_queries = self.get_profile()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(token_queries, [])
+
+        TokenManager.invalidate_token(self.access_token)
+        self.assertEqual(self.get_profile()[0].status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(JWT_AUTH={'STATELESS': True, 'REVOCATION_SYNC_INTERVAL': 30})
+class StatelessJWTAuthenticationTest(TestCase):
+    """测试无状态JWT模式"""
+
+    def setUp(self):
+        revocation_list.clear()
+        self.addCleanup(revocation_list.clear)
+        self.user = UserFactory()
+        self.access_token, self.refresh_token, access_obj, _ = TokenManager.generate_tokens(self.user)
+        self.assertIsNone(access_obj)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
+        self.url = reverse('users:profile')
+
+    def test_tokens_are_not_stored(self):
+        """测试令牌不写入令牌表，认证不查询令牌表，载荷包含jti与租户ID"""
+        self.assertFalse(UserToken.objects.exists())
+        payload = jwt.decode(self.access_token, settings.SECRET_KEY, algorithms=['HS256'])
+        self.assertEqual(payload['tenant_id'], self.user.tenant_id)
+        self.assertTrue(payload['jti'])
+
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in queries if 'user_tokens' in query['sql']])
+        self.assertFalse([query for query in queries if 'token_revocations' in query['sql']])
+
+    def test_revoked_tokens_are_rejected(self):
+        """测试吊销单个令牌与用户全部令牌，其他进程同步后同样生效"""
+        self.assertTrue(TokenManager.invalidate_token(self.access_token))
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        access_token, refresh_token, _, _ = TokenManager.generate_tokens(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+        TokenManager.invalidate_user_tokens(self.user)
+        # 模拟其他进程：清空进程内列表后从数据库同步
+        revocation_list.clear()
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+        with self.assertRaises(TokenException):
+            TokenManager.verify_token(refresh_token, is_refresh=True)
+
+    def test_revocation_during_sync_is_kept(self):
+        """测试同步读取数据库之后本进程新增的吊销在替换时保留"""
+        payload = jwt.decode(self.access_token, settings.SECRET_KEY, algorithms=['HS256'])
+        filter_revocations = TokenRevocation.objects.filter
+
+        def read_then_revoke(*args, **kwargs):
+            # 先读出数据库中的记录，再模拟另一个线程吊销令牌
+            rows = list(filter_revocations(*args, **kwargs).values_list(
+                'jti', 'user_id', 'token_type', 'revoked_at'
+            ))
+            TokenManager.invalidate_token(self.access_token)
+            TokenManager.invalidate_user_tokens(UserFactory())
+            result = mock.Mock()
+            result.values_list.return_value.iterator.return_value = iter(rows)
+            return result
+
+        with mock.patch.object(TokenRevocation.objects, 'filter', side_effect=read_then_revoke):
+            revocation_list.sync()
+        self.assertTrue(revocation_list.is_revoked(payload))
+        # 下一次同步从数据库读到这些记录，不再保留本进程的记录
+        revocation_list.sync()
+        self.assertTrue(revocation_list.is_revoked(payload))
+        self.assertEqual(revocation_list._log, [])
+
+    def test_refresh_revokes_previous_access_token(self):
+        """测试刷新访问令牌后旧访问令牌失效，刷新令牌仍可使用"""
+        access_token, _ = TokenManager.refresh_access_token(self.refresh_token)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        TokenManager.verify_token(self.refresh_token, is_refresh=True)
+
+
+class TenantResolutionTest(TestCase):
+    """测试认证时从令牌租户ID与租户缓存取得租户"""
+
+    def setUp(self):
+        token_cache.clear()
+        tenant_cache.clear()
+        set_current_tenant(None)
+        self.addCleanup(token_cache.clear)
+        self.addCleanup(tenant_cache.clear)
+        self.addCleanup(set_current_tenant, None)
+        self.tenant = TenantFactory()
+        self.user = UserFactory(tenant=self.tenant)
+        access_token, _, _, _ = TokenManager.generate_tokens(self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        self.url = reverse('users:profile')
+
+    def get_profile(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        tenant_queries = [query for query in queries if 'tenants' in query['sql']]
+        return response, tenant_queries
+
+    def test_cached_tenant_skips_tenant_table(self):
+        """测试租户缓存后再次请求不查询租户表"""
+        response, tenant_queries = self.get_profile()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(tenant_queries), 1)
+
+        response, tenant_queries = self.get_profile()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(tenant_queries, [])
+
+    def test_suspended_tenant_is_rejected(self):
+        """测试租户暂停后缓存失效，该租户用户被拒绝，恢复后可以访问"""
+        self.get_profile()
+        self.tenant.status = 'suspended'
+        self.tenant.save()
+        self.assertEqual(self.get_profile()[0].status_code, status.HTTP_403_FORBIDDEN)
+
+        self.tenant.status = 'active'
+        self.tenant.save()
+        self.assertEqual(self.get_profile()[0].status_code, status.HTTP_200_OK)
+
+    @override_settings(JWT_AUTH={'STATELESS': True})
+    def test_stateless_token_uses_tenant_claim(self):
+        """测试无状态模式下按令牌中的租户ID取得租户"""
+        revocation_list.clear()
+        self.addCleanup(revocation_list.clear)
+        access_token, _, _, _ = TokenManager.generate_tokens(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        self.get_profile()
+        response, tenant_queries = self.get_profile()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(tenant_queries, [])
+
+
+class TokenRetentionTest(TestCase):
+    """测试令牌记录的摘要存储与过期清理"""
+
+    def test_token_stored_as_hash(self):
+        """测试令牌表只保存定长摘要"""
+        user = UserFactory()
+        access_token, _, access_obj, _ = TokenManager.generate_tokens(user)
+        self.assertEqual(len(access_obj.token_hash), 64)
+        self.assertEqual(access_obj.token_hash, UserToken.hash_token(access_token))
+
+    def test_purge_deletes_expired_rows_in_batches(self):
+        """测试清理命令只删除过期超过保留期的记录"""
+        user = UserFactory()
+        now = timezone.now()
+        for i in range(5):
+            UserToken.objects.create(
+                user=user, token_hash=f'{i:064d}', is_valid=False, expired_at=now - timedelta(days=10)
+            )
+        kept = UserToken.objects.create(user=user, token_hash='a' * 64, expired_at=now - timedelta(days=1))
+        TokenRevocation.objects.create(jti='old', revoked_at=now, expires_at=now - timedelta(minutes=1))
+        TokenRevocation.objects.create(jti='new', revoked_at=now, expires_at=now + timedelta(hours=1))
+
+        out = io.StringIO()
+        call_command('purge_tokens', '--retention-days', '7', '--batch-size', '2', stdout=out)
+
+        self.assertEqual(list(UserToken.objects.values_list('pk', flat=True)), [kept.pk])
+        self.assertEqual(list(TokenRevocation.objects.values_list('jti', flat=True)), ['new'])
+        self.assertIn('5', out.getvalue())
@@ -0,0 +1,173 @@
+import csv
+import io
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from exports.artifacts import artifact_key, content_version
+from exports.exporter import WooCommerceCSVStream
+from exports.models import ExportContentVersion, ExportList, ExportListItem, ExportTemplate
+from products.models import (
+    Attribute, AttributeValue, Category, Product, ProductAttribute, ProductImage,
+    ProductVariation, Tag, VariationAttribute,
+)
+from tests.factories.user_factories import UserFactory
+
+
+class ExportQueryCountTest(TestCase):
+    """测试导出的查询次数不随行数增长"""
+
+    SIZES = (1, 100, 10000)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserFactory()
+        tenant = cls.user.tenant
+        count = max(cls.SIZES)
+
+        furniture = Category.objects.create(tenant=tenant, name='家具', slug='furniture')
+        table = Category.objects.create(tenant=tenant, name='餐桌', slug='table', parent=furniture)
+        tag = Tag.original_objects.create(tenant=tenant, name='木质', slug='wood')
+        color = Attribute.original_objects.create(tenant=tenant, name='颜色', slug='color')
+        red = AttributeValue.original_objects.create(tenant=tenant, attribute=color, name='红色', slug='red')
+
+        Product.original_objects.bulk_create([
+            Product(tenant=tenant, name=f'产品{i}', slug=f'p-{i}', sku=f'P-{i}', type='variable')
+            for i in range(count)
+        ])
+        products = list(Product.original_objects.order_by('id'))
+        ProductVariation.original_objects.bulk_create([
+            ProductVariation(tenant=tenant, product=product, sku=f'{product.sku}-RED') for product in products
+        ])
+        variations = list(ProductVariation.original_objects.order_by('id'))
+
+        Product.categories.through.objects.bulk_create([
+            Product.categories.through(product_id=product.id, category_id=table.id) for product in products
+        ])
+        Product.tags.through.objects.bulk_create([
+            Product.tags.through(product_id=product.id, tag_id=tag.id) for product in products
+        ])
+        Product.upsell_products.through.objects.bulk_create([
+            Product.upsell_products.through(from_product_id=product.id, to_product_id=products[0].id)
+            for product in products[1:]
+        ])
+        ProductImage.original_objects.bulk_create([
+            ProductImage(tenant=tenant, product=product, image_url=f'https://example.com/{product.sku}.png')
+            for product in products
+        ])
+        ProductAttribute.original_objects.bulk_create([
+            ProductAttribute(tenant=tenant, product=product, attribute=color) for product in products
+        ])
+        VariationAttribute.original_objects.bulk_create([
+            VariationAttribute(tenant=tenant, variation=variation, attribute=color, value=red)
+            for variation in variations
+        ])
+
+        cls.export_lists = {}
+        for size in cls.SIZES:
+            export_list = ExportList.objects.create(user=cls.user, name=f'清单{size}')
+            ExportListItem.objects.bulk_create(
+                [ExportListItem(export_list=export_list, product=product) for product in products[:size]]
+                + [ExportListItem(export_list=export_list, variation=variation) for variation in variations[:size]]
+            )
+            cls.export_lists[size] = export_list
+
+    def export(self, size, template=None):
+        export_list = ExportList.objects.get(pk=self.export_lists[size].pk)
+        stream = WooCommerceCSVStream(export_list, template=template, chunk_size=2 * max(self.SIZES))
+        with CaptureQueriesContext(connection) as queries:
+            content = ''.join(stream)
+        return content, queries
+
+    def test_query_count_is_constant(self):
+        """测试1、100、10000个产品的导出查询次数相同"""
+        counts = {}
+        for size in self.SIZES:
+            content, queries = self.export(size)
+            counts[size] = len(queries)
+            rows = list(csv.DictReader(io.StringIO(content.lstrip('\ufeff'))))
+            self.assertEqual(len(rows), 2 * size)
+        self.assertEqual(len(set(counts.values())), 1, counts)
+
+    def test_rows_contain_related_data(self):
+        """测试导出行包含分类路径、标签、图片、属性与关联产品"""
+        content, _ = self.export(100)
+        rows = list(csv.DictReader(io.StringIO(content.lstrip('\ufeff'))))
+        product = rows[1]
+        self.assertEqual(product['SKU'], 'P-1')
+        self.assertEqual(product['Categories'], '家具 > 餐桌')
+        self.assertEqual(product['Tags'], '木质')
+        self.assertEqual(product['Images'], 'https://example.com/P-1.png')
+        self.assertEqual(product['Upsells'], 'P-0')
+        self.assertEqual((product['Attribute 1 name'], product['Attribute 1 value(s)']), ('颜色', '红色'))
+
+        variation = rows[100]
+        self.assertEqual((variation['Type'], variation['Parent']), ('variation', 'P-0'))
+        self.assertEqual(variation['Attribute 1 value(s)'], '红色')
+
+    def test_template_projection_loads_only_needed_columns(self):
+        """测试6列模板只读取需要的字段与关联数据，不加载描述"""
+        template = ExportTemplate.objects.create(user=self.user, name='简易', fields={'columns': [
+            'Type', 'SKU', 'Name', 'Regular price', 'Parent', {'column': 'Tags', 'header': '标签'},
+        ]})
+        content, queries = self.export(100, template=template)
+        rows = list(csv.reader(io.StringIO(content.lstrip('\ufeff'))))
+        self.assertEqual(rows[0], ['Type', 'SKU', 'Name', 'Regular price', 'Parent', '标签'])
+        self.assertEqual(rows[2], ['variable', 'P-1', '产品1', '', '', '木质'])
+        self.assertEqual(rows[101][:2], ['variation', 'P-0-RED'])
+        self.assertEqual(rows[101][4], 'P-0')
+
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn('product_images', sql)
+        self.assertNotIn('variation_attributes', sql)
+
+
+class ArtifactKeyTest(TestCase):
+    """测试导出文件内容键随关联数据变化"""
+
+    def setUp(self):
+        self.user = UserFactory()
+        tenant = self.user.tenant
+        self.tag = Tag.original_objects.create(tenant=tenant, name='木质', slug='wood')
+        self.category = Category.objects.create(tenant=tenant, name='餐桌', slug='table')
+        self.product = Product.original_objects.create(tenant=tenant, name='餐桌', slug='t', sku='T-1')
+        self.export_list = ExportList.objects.create(user=self.user, name='清单')
+        ExportListItem.objects.create(export_list=self.export_list, product=self.product)
+
+    def assert_key_changes(self, change):
+        before = artifact_key(self.export_list)
+        self.assertEqual(artifact_key(self.export_list), before)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.assertNotEqual(artifact_key(self.export_list), before)
+
+    def test_relation_changes_change_key(self):
+        """测试多对多关系变更、标签改名（含不触发信号的批量更新）后键变化"""
+        self.assert_key_changes(lambda: self.product.tags.add(self.tag))
+        self.assert_key_changes(lambda: self.product.categories.add(self.category))
+
+        def rename_tag():
+            self.tag.name = '实木'
+            self.tag.save()
+        self.assert_key_changes(rename_tag)
+        self.assert_key_changes(lambda: Category.objects.filter(pk=self.category.pk).update(
+            name='桌子', updated_at=timezone.now(),
+        ))
+        self.assert_key_changes(lambda: ProductImage.original_objects.create(
+            tenant=self.user.tenant, product=self.product, image_url='https://img/1.jpg',
+        ))
+
+    def test_version_changes_after_commit(self):
+        """测试内容版本在事务提交后才递增，保存在数据库中"""
+        tenant_id = self.user.tenant_id
+        version = content_version(tenant_id)
+        before = artifact_key(self.export_list)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.tags.add(self.tag)
+            self.assertEqual(artifact_key(self.export_list), before)
+        self.assertEqual(content_version(tenant_id), version + 1)
+        self.assertEqual(ExportContentVersion.objects.get(tenant_id=tenant_id).version, version + 1)
+        self.assertNotEqual(artifact_key(self.export_list), before)
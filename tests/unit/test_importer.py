@@ -0,0 +1,257 @@
+import csv
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from imports.importer import CSVReader, WooCommerceImporter
+from imports.lookups import ImportLookupCache
+from imports.models import ImportHistory
+from imports.parallel import import_shard, iter_shard_rows, partition_rows
+from products import woocommerce as wc
+from products.models import Category, Product, ProductImage, ProductVariation, Tag, VariationAttribute
+from tests.factories.user_factories import UserFactory
+
+
+SAMPLE_CSV = os.path.join(settings.BASE_DIR, 'vSimpleNew2.csv')
+
+
+class WooCommerceImporterTest(TestCase):
+    """测试WooCommerce CSV导入"""
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.tenant = self.user.tenant
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def write_csv(self, rows, name='products.csv'):
+        """写入测试CSV文件，rows为列名到值的字典列表"""
+        path = os.path.join(self.tmpdir, name)
+        columns = wc.get_columns()
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+        return path
+
+    def run_import(self, path, **kwargs):
+        history = ImportHistory.objects.create(
+            user=self.user, file_name=os.path.basename(path), file_path=path
+        )
+        return WooCommerceImporter(history, **kwargs).run()
+
+    def test_import_sample_file(self):
+        """测试导入示例文件中的变体产品"""
+        history = self.run_import(SAMPLE_CSV)
+
+        self.assertEqual(history.status, 'completed')
+        self.assertEqual(history.total_rows, 7)
+        self.assertEqual(history.processed_rows, 7)
+        self.assertEqual(history.success_rows, 7)
+        self.assertEqual(history.error_rows, 0)
+        self.assertEqual(history.product_count, 1)
+        # 重复的变体行按SKU合并
+        self.assertEqual(history.variation_count, 3)
+
+        product = Product.original_objects.get(sku='VL-EXCL-DT-056')
+        self.assertEqual(product.tenant, self.tenant)
+        self.assertEqual(product.type, 'variable')
+        self.assertEqual(product.status, 'published')
+        self.assertEqual(list(product.categories.values_list('name', flat=True)), ['Uncategorized'])
+        self.assertEqual(ProductImage.original_objects.filter(product=product).count(), 2)
+
+        variations = ProductVariation.original_objects.filter(product=product)
+        self.assertEqual(variations.count(), 3)
+        chair = variations.get(sku='P01#餐椅')
+        self.assertEqual(chair.regular_price, 5000)
+        self.assertEqual(chair.image.image_url, 'https://dev3.grandeurdesignz.com/wp-content/uploads/2025/03/001-3.png')
+        self.assertEqual(
+            VariationAttribute.original_objects.filter(variation=chair).count(), 2
+        )
+
+    def test_batches_update_progress(self):
+        """测试小批次导入时计数按批次累加"""
+        history = self.run_import(SAMPLE_CSV, batch_size=2)
+
+        self.assertEqual(history.processed_rows, 7)
+        self.assertEqual(history.success_rows, 7)
+        self.assertEqual(ProductVariation.original_objects.count(), 3)
+
+    def test_category_paths_and_tags(self):
+        """测试分类路径与标签的创建"""
+        path = self.write_csv([
+            {'Type': 'simple', 'SKU': 'S-1', 'Name': '餐桌', 'Categories': '家具 > 餐桌, 新品', 'Tags': '木质, 北欧'},
+            {'Type': 'simple', 'SKU': 'S-2', 'Name': '餐椅', 'Categories': '家具 > 餐椅', 'Tags': '木质'},
+        ])
+        self.run_import(path)
+
+        furniture = Category.objects.get(tenant=self.tenant, name='家具', parent=None)
+        self.assertEqual(
+            sorted(furniture.get_children().values_list('name', flat=True)), ['餐桌', '餐椅']
+        )
+        self.assertEqual(Tag.original_objects.filter(tenant=self.tenant).count(), 2)
+        product = Product.original_objects.get(sku='S-1')
+        self.assertEqual(product.categories.count(), 2)
+        self.assertEqual(product.tags.count(), 2)
+
+    def test_lookups_created_once_per_batch(self):
+        """测试查找项按批次批量创建，查询数不随单元格数量增长"""
+        def rows(count):
+            return [
+                {'Type': 'simple', 'SKU': f'S-{i}', 'Name': f'产品{i}', 'Categories': f'家具 > 系列{i}', 'Tags': f'标签{i}'}
+                for i in range(count)
+            ]
+
+        lookups = ImportLookupCache(self.tenant)
+        items = [{'categories': wc.parse_category_paths(row['Categories']), 'tags': [row['Tags']], 'attributes': []}
+                 for row in rows(20)]
+        lookups.resolve_items(items[:1])
+        with CaptureQueriesContext(connection) as small:
+            lookups.resolve_items(items[1:3])
+        with CaptureQueriesContext(connection) as large:
+            lookups.resolve_items(items[3:])
+        self.assertEqual(len(small), len(large))
+
+        lookups.rebuild_tree()
+        furniture = Category.objects.get(tenant=self.tenant, name='家具')
+        self.assertEqual(furniture.get_children().count(), 20)
+        self.assertEqual(ImportLookupCache(self.tenant).category_id(('家具', '系列7')), lookups.category_id(('家具', '系列7')))
+
+    def test_invalid_rows_are_reported(self):
+        """测试错误行被记录且不影响其他行"""
+        path = self.write_csv([
+            {'Type': 'simple', 'SKU': '', 'Name': '缺少SKU'},
+            {'Type': 'simple', 'SKU': 'S-1', 'Name': '价格错误', 'Regular price': 'abc'},
+            {'Type': 'variation', 'Name': '孤儿变体', 'Parent': 'NOT-EXISTS'},
+            {'Type': 'simple', 'SKU': 'S-2', 'Name': '正常产品', 'Regular price': '10.5'},
+        ])
+        history = self.run_import(path)
+
+        self.assertEqual(history.status, 'completed')
+        self.assertEqual(history.processed_rows, 4)
+        self.assertEqual(history.success_rows, 1)
+        self.assertEqual(history.error_rows, 3)
+        self.assertIn('第1行', history.error_log)
+        self.assertIn('NOT-EXISTS', history.error_log)
+        self.assertTrue(Product.original_objects.filter(sku='S-2').exists())
+
+    def test_reimport_updates_existing_products(self):
+        """测试重复导入时更新已有产品而不是重复创建"""
+        path = self.write_csv([{'Type': 'simple', 'SKU': 'S-1', 'Name': '旧名称', 'Regular price': '10'}])
+        self.run_import(path)
+        path = self.write_csv([{'Type': 'simple', 'SKU': 'S-1', 'Name': '新名称', 'Regular price': '12'}], 'v2.csv')
+        history = self.run_import(path)
+
+        self.assertEqual(history.product_count, 0)
+        product = Product.original_objects.get(sku='S-1')
+        self.assertEqual(product.name, '新名称')
+        self.assertEqual(product.regular_price, 12)
+        self.assertEqual(history.updated_rows, 1)
+
+    def test_reimport_skips_unchanged_rows(self):
+        """测试重复导入时跳过未变化的行，变化的行只更新有差异的字段"""
+        first = self.run_import(SAMPLE_CSV)
+        self.assertEqual(first.created_rows, 4)
+
+        history = self.run_import(SAMPLE_CSV)
+        self.assertEqual(history.success_rows, 7)
+        self.assertEqual((history.created_rows, history.updated_rows, history.skipped_rows), (0, 0, 4))
+
+        path = self.write_csv([
+            {'Type': 'simple', 'SKU': 'S-1', 'Name': '产品', 'Regular price': '10', 'Description': '描述'},
+            {'Type': 'simple', 'SKU': 'S-2', 'Name': '产品', 'Regular price': '10'},
+        ])
+        self.run_import(path)
+        path = self.write_csv([
+            {'Type': 'simple', 'SKU': 'S-1', 'Name': '产品', 'Regular price': '12', 'Description': '描述'},
+            {'Type': 'simple', 'SKU': 'S-2', 'Name': '产品', 'Regular price': '10'},
+        ], 'v2.csv')
+        with CaptureQueriesContext(connection) as queries:
+            history = self.run_import(path)
+
+        self.assertEqual((history.created_rows, history.updated_rows, history.skipped_rows), (0, 1, 1))
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "products"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"regular_price"', updates[0])
+        self.assertNotIn('"description"', updates[0])
+        self.assertEqual(Product.original_objects.get(sku='S-1').regular_price, 12)
+
+    def test_reader_resumes_from_offset(self):
+        """测试读取器从偏移量继续时不重复也不遗漏行，支持跨行的引号字段"""
+        path = self.write_csv([
+            {'Type': 'simple', 'SKU': 'S-1', 'Description': '第一行\n第二行'},
+            {'Type': 'simple', 'SKU': 'S-2'},
+            {'Type': 'simple', 'SKU': 'S-3'},
+        ])
+        reader = CSVReader(path)
+        rows = iter(reader)
+        row_number, row = next(rows)
+        self.assertEqual((row_number, row['Description']), (1, '第一行\n第二行'))
+
+        resumed = list(CSVReader(path, offset=reader.offset, row_number=reader.row_number))
+        self.assertEqual([(n, row['SKU']) for n, row in resumed], [(2, 'S-2'), (3, 'S-3')])
+
+    def test_interrupted_import_resumes_from_checkpoint(self):
+        """测试中断的导入从最近提交的批次之后继续"""
+        class InterruptedImporter(WooCommerceImporter):
+            def import_batch(self, batch, checkpoint=None):
+                if batch[0][0] > 2:
+                    raise SystemExit('worker killed')
+                super().import_batch(batch, checkpoint)
+
+        history = ImportHistory.objects.create(user=self.user, file_name='v.csv', file_path=SAMPLE_CSV)
+        with self.assertRaises(SystemExit):
+            InterruptedImporter(history, batch_size=2).run()
+        history.refresh_from_db()
+        self.assertEqual(history.status, 'processing')
+        self.assertEqual((history.checkpoint_row, history.processed_rows), (2, 2))
+
+        history = WooCommerceImporter(history, batch_size=2).run()
+        self.assertEqual(history.status, 'completed')
+        self.assertEqual(history.processed_rows, 7)
+        self.assertEqual(history.checkpoint_row, 7)
+        # 已提交批次的计数被保留，且这些行没有被重新处理
+        self.assertEqual(history.created_rows, 4)
+        self.assertEqual(history.variation_count, 3)
+
+
+class ParallelPartitionTest(TestCase):
+    """测试并行导入的分片"""
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_variations_stay_with_parent(self):
+        """测试同一父产品的行位于同一分片并保留原始行号"""
+        paths, vocabulary = partition_rows(SAMPLE_CSV, 4, self.tmpdir)
+
+        shards = [list(iter_shard_rows(path)) for path in paths]
+        non_empty = [rows for rows in shards if rows]
+        self.assertEqual(len(non_empty), 1)
+        self.assertEqual([row_number for row_number, _ in non_empty[0]], list(range(1, 8)))
+        self.assertEqual(vocabulary['categories'], {('Uncategorized',)})
+        self.assertIn(('type', 'Dining Chair'), vocabulary['attribute_values'])
+
+    def test_shards_merge_into_one_history(self):
+        """测试多个分片的计数累加到同一条导入历史"""
+        history = ImportHistory.objects.create(user=self.user, file_name='v.csv', file_path=SAMPLE_CSV)
+        paths, _ = partition_rows(SAMPLE_CSV, 2, self.tmpdir)
+        for path in paths:
+            import_shard(history.pk, path, 3)
+
+        history.refresh_from_db()
+        self.assertEqual(history.processed_rows, 7)
+        self.assertEqual(history.success_rows, 7)
+        self.assertEqual(history.variation_count, 3)
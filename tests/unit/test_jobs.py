@@ -0,0 +1,169 @@
+import csv
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from exports.exporter import WooCommerceExporter
+from exports.models import ExportHistory, ExportList, ExportListItem
+from exports.tasks import enqueue_export
+from imports.models import ImportHistory
+from imports.tasks import enqueue_import
+from jobs import broker
+from jobs.models import Job
+from jobs.registry import register
+from jobs.worker import Worker
+from products.models import Product
+from tests.factories.user_factories import UserFactory
+
+
+SAMPLE_CSV = os.path.join(settings.BASE_DIR, 'vSimpleNew2.csv')
+
+
+@register('tests.noop')
+def noop_task(**params):
+    pass
+
+
+@register('tests.fail')
+def failing_task():
+    raise RuntimeError('任务出错')
+
+
+class JobQueueTest(TestCase):
+    """测试数据库任务队列"""
+
+    def setUp(self):
+        self.user = UserFactory()
+        self.tenant = self.user.tenant
+        self.media_root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_import_job_drives_history_status(self):
+        """测试导入任务由worker执行，导入历史从pending变为completed"""
+        history = ImportHistory.objects.create(user=self.user, file_name='v.csv', file_path=SAMPLE_CSV)
+        job = enqueue_import(history)
+        history.refresh_from_db()
+        self.assertEqual(history.status, 'pending')
+
+        Worker(worker_id='test').run(once=True)
+
+        job.refresh_from_db()
+        history.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(history.status, 'completed')
+        self.assertEqual(history.variation_count, 3)
+
+    def test_export_job_writes_file(self):
+        """测试导出任务生成WooCommerce格式文件"""
+        history = ImportHistory.objects.create(user=self.user, file_name='v.csv', file_path=SAMPLE_CSV)
+        enqueue_import(history)
+        Worker(worker_id='test').run(once=True)
+
+        export_list = ExportList.objects.create(user=self.user, name='清单')
+        product = Product.original_objects.get(sku='VL-EXCL-DT-056')
+        ExportListItem.objects.create(export_list=export_list, variation=product.variations.first())
+        ExportListItem.objects.create(export_list=export_list, product=product)
+        export = ExportHistory.objects.create(user=self.user, export_list=export_list, file_name='out.csv')
+        enqueue_export(export)
+
+        with override_settings(MEDIA_ROOT=self.media_root):
+            Worker(worker_id='test').run(once=True)
+
+        export.refresh_from_db()
+        self.assertEqual(export.status, 'completed')
+        self.assertEqual((export.product_count, export.variation_count), (1, 1))
+        with open(export.file_path, newline='', encoding='utf-8-sig') as f:
+            rows = list(csv.DictReader(f))
+        # 父产品排在变体之前
+        self.assertEqual([row['Type'] for row in rows], ['variable', 'variation'])
+        self.assertEqual(rows[1]['Parent'], 'VL-EXCL-DT-056')
+
+    def test_unchanged_export_reuses_artifact(self):
+        """测试相同内容的导出复用已生成的文件"""
+        export_list = ExportList.objects.create(user=self.user, name='清单')
+        product = Product.objects.create(tenant=self.tenant, name='餐桌', slug='table', sku='T-1')
+        ExportListItem.objects.create(export_list=export_list, product=product)
+
+        with override_settings(MEDIA_ROOT=self.media_root):
+            first = WooCommerceExporter(
+                ExportHistory.objects.create(user=self.user, export_list=export_list, file_name='a.csv')
+            ).run()
+            second = WooCommerceExporter(
+                ExportHistory.objects.create(user=self.user, export_list=export_list, file_name='b.csv')
+            ).run()
+            self.assertEqual(second.file_path, first.file_path)
+            self.assertEqual(second.product_count, 1)
+
+            product.save()
+            third = WooCommerceExporter(
+                ExportHistory.objects.create(user=self.user, export_list=export_list, file_name='c.csv')
+            ).run()
+        self.assertNotEqual(third.artifact_key, first.artifact_key)
+        self.assertTrue(os.path.exists(third.file_path + '.gz'))
+
+    def test_failed_task(self):
+        """测试任务异常时标记为失败并记录错误"""
+        job = broker.enqueue('tests.fail', tenant=self.tenant)
+        Worker(worker_id='test').run(once=True)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('任务出错', job.error)
+
+    def test_tenant_concurrency_limit(self):
+        """测试达到租户并发上限时跳过该租户的任务"""
+        other_tenant = UserFactory().tenant
+        for _ in range(2):
+            Job.objects.create(task='tests.noop', tenant=self.tenant, status='running', heartbeat_at=timezone.now())
+        blocked = broker.enqueue('tests.noop', tenant=self.tenant)
+        allowed = broker.enqueue('tests.noop', tenant=other_tenant)
+
+        with override_settings(JOB_QUEUE={'TENANT_CONCURRENCY': 2}):
+            job = broker.claim('test')
+            self.assertEqual(job.pk, allowed.pk)
+            self.assertIsNone(broker.claim('test'))
+        blocked.refresh_from_db()
+        self.assertEqual(blocked.status, 'pending')
+
+    def test_stale_job_is_requeued(self):
+        """测试心跳超时的任务被重新放回队列，超过最大次数的标记为失败"""
+        stale_time = timezone.now() - timedelta(hours=1)
+        retry = Job.objects.create(task='tests.noop', status='running', attempts=1, heartbeat_at=stale_time)
+        exhausted = Job.objects.create(
+            task='tests.noop', status='running', attempts=3, max_attempts=3, heartbeat_at=stale_time
+        )
+
+        self.assertEqual(broker.requeue_stale(), 1)
+        retry.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual(retry.status, 'pending')
+        self.assertEqual(exhausted.status, 'failed')
+
+    def test_exhausted_jobs_fail_linked_history(self):
+        """测试达到最大执行次数的任务将关联的导入、导出历史标记为失败"""
+        import_history = ImportHistory.objects.create(
+            user=self.user, file_name='v.csv', file_path=SAMPLE_CSV, status='processing'
+        )
+        export_list = ExportList.objects.create(user=self.user, name='导出清单')
+        export_history = ExportHistory.objects.create(
+            user=self.user, export_list=export_list, file_name='e.csv', status='processing'
+        )
+        stale_time = timezone.now() - timedelta(hours=1)
+        for job in (enqueue_import(import_history), enqueue_export(export_history)):
+            Job.objects.filter(pk=job.pk).update(status='running', attempts=3, max_attempts=3, heartbeat_at=stale_time)
+
+        self.assertEqual(broker.requeue_stale(), 0)
+        import_history.refresh_from_db()
+        export_history.refresh_from_db()
+        self.assertEqual(import_history.status, 'failed')
+        self.assertIn('worker中断', import_history.error_log)
+        self.assertEqual(export_history.status, 'failed')
+        self.assertIn('worker中断', export_history.error_log)
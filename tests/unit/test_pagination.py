@@ -0,0 +1,163 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from rest_framework.exceptions import NotFound
+
+from common.exceptions import ValidationException
+from common.pagination import KeysetPagination, StandardLimitOffsetPagination, StandardPagination
+from common.tenant_middleware import set_current_tenant
+from products.models import Product
+from tests.factories.tenant_factories import TenantFactory
+
+
+class KeysetPaginationTest(TestCase):
+    """测试键集分页"""
+
+    def setUp(self):
+        set_current_tenant(None)
+        self.tenant = TenantFactory()
+        # menu_order有重复值，同一排序值内按创建时间倒序、主键倒序
+        for i in range(7):
+            Product.objects.create(tenant=self.tenant, name=f'产品{i}', slug=f'p-{i}', sku=f'SKU-{i}', menu_order=i % 3)
+        self.expected = list(Product.objects.order_by('menu_order', '-created_at', '-id').values_list('id', flat=True))
+
+    def paginate(self, url):
+        paginator = KeysetPagination()
+        request = Request(APIRequestFactory().get(url))
+        rows = paginator.paginate_queryset(Product.objects.all(), request)
+        response = paginator.get_paginated_response([row.id for row in rows])
+        return response.data['data'], response.data['meta']['pagination']
+
+    def test_forward_and_backward_traversal(self):
+        """测试逐页向后遍历覆盖全部数据，上一页链接返回相同的数据"""
+        seen, pages = [], []
+        url = '/api/v1/products/?page_size=3'
+        while url:
+            ids, pagination = self.paginate(url)
+            seen.extend(ids)
+            pages.append((ids, pagination['links']['previous']))
+            url = pagination['links']['next']
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0][1])
+        self.assertIsNone(pagination['total'])
+
+        # 从最后一页向前翻页
+        ids, pagination = self.paginate(pages[2][1])
+        self.assertEqual(ids, pages[1][0])
+        ids, pagination = self.paginate(pagination['links']['previous'])
+        self.assertEqual(ids, pages[0][0])
+        self.assertIsNone(pagination['links']['previous'])
+        self.assertIsNotNone(pagination['links']['next'])
+
+    def test_seek_without_offset_or_count(self):
+        """测试翻页不使用OFFSET，默认不计算总数"""
+        _, pagination = self.paginate('/api/v1/products/?page_size=3')
+        with CaptureQueriesContext(connection) as queries:
+            self.paginate(pagination['links']['next'])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('OFFSET', queries[0]['sql'].upper())
+
+    def test_count_modes(self):
+        """测试精确计数、估计计数与无效参数"""
+        _, pagination = self.paginate('/api/v1/products/?count=exact')
+        self.assertEqual(pagination['total'], 7)
+        _, pagination = self.paginate('/api/v1/products/?count=estimate')
+        self.assertEqual(pagination['count_mode'], 'estimate')
+        self.assertIsNotNone(pagination['total'])
+        with self.assertRaises(ValidationException):
+            self.paginate('/api/v1/products/?count=all')
+        with self.assertRaises(ValidationException):
+            self.paginate('/api/v1/products/?cursor=invalid')
+
+
+class CountModeTest(TestCase):
+    """测试标准分页的计数缓存与计数方式"""
+
+    def setUp(self):
+        set_current_tenant(None)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.tenant = TenantFactory()
+        for i in range(5):
+            Product.objects.create(tenant=self.tenant, name=f'产品{i}', slug=f'p-{i}', sku=f'SKU-{i}')
+
+    def paginate(self, url, paginator_class=StandardPagination, queryset=None):
+        paginator = paginator_class()
+        request = Request(APIRequestFactory().get(url))
+        if queryset is None:
+            queryset = Product.objects.filter(tenant=self.tenant)
+        with CaptureQueriesContext(connection) as queries:
+            rows = paginator.paginate_queryset(queryset, request)
+        response = paginator.get_paginated_response([row.id for row in rows])
+        counts = [query for query in queries if 'COUNT(' in query['sql'].upper()]
+        return response.data, counts
+
+    def test_count_cached_until_write(self):
+        """测试计数缓存命中时不执行COUNT，写入后失效"""
+        data, counts = self.paginate('/api/v1/products/?page_size=2')
+        self.assertEqual(data['meta']['pagination']['total'], 5)
+        self.assertEqual(data['meta']['pagination']['total_pages'], 3)
+        self.assertEqual(len(counts), 1)
+
+        data, counts = self.paginate('/api/v1/products/?page=2&page_size=2')
+        self.assertEqual(data['meta']['pagination']['total'], 5)
+        self.assertEqual(counts, [])
+
+        Product.objects.create(tenant=self.tenant, name='新产品', slug='p-new', sku='SKU-NEW')
+        data, counts = self.paginate('/api/v1/products/?page_size=2')
+        self.assertEqual(data['meta']['pagination']['total'], 6)
+        self.assertEqual(len(counts), 1)
+
+        # 精确计数总是重新计数
+        data, counts = self.paginate('/api/v1/products/?page_size=2&count=exact')
+        self.assertEqual(len(counts), 1)
+
+    def test_uncounted_page_numbers(self):
+        """测试count=none时不计数，多取一行判断下一页"""
+        data, counts = self.paginate('/api/v1/products/?page=2&page_size=2&count=none')
+        pagination = data['meta']['pagination']
+        self.assertEqual(counts, [])
+        self.assertEqual(len(data['data']), 2)
+        self.assertIsNone(pagination['total'])
+        self.assertIsNotNone(pagination['links']['next'])
+        self.assertIsNotNone(pagination['links']['previous'])
+
+        data, _ = self.paginate('/api/v1/products/?page=3&page_size=2&count=none')
+        self.assertEqual(len(data['data']), 1)
+        self.assertIsNone(data['meta']['pagination']['links']['next'])
+        with self.assertRaises(NotFound):
+            self.paginate('/api/v1/products/?page=4&page_size=2&count=none')
+
+        data, _ = self.paginate('/api/v1/products/?page_size=2&count=estimate')
+        self.assertEqual(data['meta']['pagination']['total'], 5)
+
+    def test_limit_offset_modes(self):
+        """测试偏移量分页的计数缓存与不计数模式"""
+        data, counts = self.paginate('/api/v1/products/?limit=2', StandardLimitOffsetPagination)
+        self.assertEqual(data['meta']['pagination']['total'], 5)
+        self.assertEqual(len(counts), 1)
+        data, counts = self.paginate('/api/v1/products/?limit=2&offset=2', StandardLimitOffsetPagination)
+        self.assertEqual(counts, [])
+
+        data, counts = self.paginate('/api/v1/products/?limit=2&offset=4&count=none', StandardLimitOffsetPagination)
+        self.assertEqual(counts, [])
+        self.assertEqual(len(data['data']), 1)
+        self.assertIsNone(data['meta']['pagination']['total'])
+        self.assertIsNone(data['meta']['pagination']['links']['next'])
+        data, _ = self.paginate('/api/v1/products/?limit=2&offset=2&count=none', StandardLimitOffsetPagination)
+        self.assertIsNotNone(data['meta']['pagination']['links']['next'])
+
+    def test_empty_querysets(self):
+        """测试none()与空IN列表的查询集总数为0，不执行查询"""
+        for queryset in (Product.objects.none(), Product.objects.filter(pk__in=[])):
+            for paginator_class in (StandardPagination, StandardLimitOffsetPagination):
+                for url in ('/api/v1/products/', '/api/v1/products/?count=exact', '/api/v1/products/?count=estimate'):
+                    data, counts = self.paginate(url, paginator_class, queryset)
+                    self.assertEqual(data['data'], [])
+                    self.assertEqual(data['meta']['pagination']['total'], 0)
+                    self.assertEqual(counts, [])
@@ -0,0 +1,52 @@
+import datetime
+import json
+import uuid
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from common import parsers, renderers
+from common.parsers import FastJSONParser
+from common.renderers import FastJSONRenderer
+
+
+class FastJSONRendererTest(SimpleTestCase):
+    """测试orjson渲染器与解析器"""
+
+    def setUp(self):
+        self.data = {
+            'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'price': Decimal('1299.50'),
+            'created_at': datetime.datetime(2024, 5, 1, 8, 30, tzinfo=datetime.timezone.utc),
+            'date': datetime.date(2024, 5, 1),
+            'tags': {'木质'},
+            'name': '沙发\u2028',
+            1: None,
+        }
+
+    def test_output_matches_json_renderer(self):
+        """测试输出与DRF JSONRenderer一致，覆盖UUID、Decimal、时间、集合类型"""
+        self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_indent_and_missing_orjson_fall_back(self):
+        """测试请求缩进输出或未安装orjson时回退到JSONRenderer"""
+        data = {'created_at': timezone.now(), 'price': Decimal('1')}
+        expected = JSONRenderer().render(data, 'application/json; indent=4')
+        self.assertEqual(FastJSONRenderer().render(data, 'application/json; indent=4'), expected)
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_parser(self):
+        """测试解析器解析UTF-8请求体，格式错误时抛出ParseError"""
+        body = json.dumps({'name': '沙发\u2028', 'price': 1.5}).encode('utf-8')
+        self.assertEqual(FastJSONParser().parse(BytesIO(body)), {'name': '沙发\u2028', 'price': 1.5})
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"name": '))
+        with mock.patch.object(parsers, 'orjson', None):
+            self.assertEqual(FastJSONParser().parse(BytesIO(body)), {'name': '沙发\u2028', 'price': 1.5})
@@ -0,0 +1,61 @@
+import json
+from unittest import mock
+
+from django.http import JsonResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from common.middleware import APIResponseMiddleware
+from common.response import mark_formatted
+
+
+class APIResponseMiddlewareTest(SimpleTestCase):
+    """测试API响应中间件的标准格式转换"""
+
+    def process(self, response, path='/api/v1/items/'):
+        middleware = APIResponseMiddleware(lambda request: response)
+        return middleware(RequestFactory().get(path))
+
+    def test_json_response_wrapped_without_decoding(self):
+        """测试JsonResponse按原始字节嵌入标准格式，不解码响应体"""
+        response = JsonResponse({'items': [1, 2], 'name': '沙发'}, status=201)
+        with mock.patch('common.middleware.json.loads') as loads:
+            result = self.process(response)
+        loads.assert_not_called()
+
+        body = json.loads(result.content)
+        self.assertEqual(body['data'], {'items': [1, 2], 'name': '沙发'})
+        self.assertTrue(body['success'])
+        self.assertEqual(body['code'], 201)
+        self.assertEqual(body['message'], '创建成功')
+        self.assertIn('timestamp', body['meta'])
+        self.assertEqual(result.status_code, 201)
+
+        # 已转换的响应不会被再次包装
+        self.assertEqual(self.process(result).content, result.content)
+
+    def test_marked_and_non_api_responses_untouched(self):
+        """测试已标记的响应与非API路径的响应原样返回"""
+        envelope = {'success': True, 'code': 200, 'message': '成功', 'data': None}
+        response = mark_formatted(JsonResponse(envelope))
+        self.assertEqual(json.loads(self.process(response).content), envelope)
+
+        response = JsonResponse({'a': 1})
+        self.assertEqual(json.loads(self.process(response, path='/admin/').content), {'a': 1})
+
+    def test_hand_built_envelope_not_wrapped_again(self):
+        """测试未标记但已是标准格式的JsonResponse原样返回，不被重复包装"""
+        envelope = {'success': False, 'code': 1001, 'message': '参数错误', 'data': {'field': ['必填']}}
+        result = self.process(JsonResponse(envelope, status=400))
+        self.assertEqual(json.loads(result.content), envelope)
+        self.assertEqual(result.status_code, 400)
+
+        # 只在data中出现标准字段名的响应仍然包装
+        data = {'items': [{'success': True, 'code': 1, 'message': 'x'}]}
+        self.assertEqual(json.loads(self.process(JsonResponse(data)).content)['data'], data)
+
+    @override_settings(API_RESPONSE={'WRAP_MAX_BYTES': 64})
+    def test_large_response_bypasses_middleware(self):
+        """测试超过阈值的响应不做转换"""
+        response = JsonResponse({'items': list(range(100))})
+        content = response.content
+        self.assertIs(self.process(response).content, content)
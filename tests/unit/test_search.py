@@ -0,0 +1,347 @@
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from common.tenant_middleware import set_current_tenant
+from imports.importer import WooCommerceImporter
+from imports.models import ImportHistory
+from products.models import Category, Product, Tag
+from search.backends import MySQLFulltextBackend, get_search_backend, parse_terms
+from search.facets import TenantFacets, facet_index
+from search.inverted_index import inverted_index, tokenize
+from search.models import ProductSearchDocument
+from tests.factories.tenant_factories import TenantFactory
+from tests.factories.user_factories import UserFactory
+
+
+class ProductSearchTest(TestCase):
+    """测试产品搜索文档的维护与搜索后端"""
+
+    def setUp(self):
+        set_current_tenant(None)
+        self.addCleanup(set_current_tenant, None)
+        self.tenant = TenantFactory()
+        self.tag = Tag.objects.create(tenant=self.tenant, name='实木', slug='solid-wood')
+        self.category = Category.objects.create(tenant=self.tenant, name='客厅家具', slug='living-room')
+        self.sofa = Product.objects.create(
+            tenant=self.tenant, name='北欧布艺沙发', slug='sofa', sku='SOFA-001', price=Decimal('100'),
+            description='<p>适合<b>小户型</b>的三人沙发</p>',
+        )
+        self.table = Product.objects.create(
+            tenant=self.tenant, name='岩板餐桌', slug='table', sku='TABLE-001', price=Decimal('200'),
+        )
+        self.sofa.tags.add(self.tag)
+        self.table.categories.add(self.category)
+
+    def search(self, query, tenant_id=None):
+        return sorted(get_search_backend().filter(Product.original_objects.all(), query, tenant_id)
+                      .values_list('sku', flat=True))
+
+    def test_documents_follow_product_changes(self):
+        """测试产品保存、标签与分类关系变更以及改名后文档随之更新"""
+        document = ProductSearchDocument.objects.get(product=self.sofa)
+        self.assertEqual(document.tenant, self.tenant)
+        self.assertIn('SOFA-001', document.keywords)
+        self.assertIn('实木', document.keywords)
+        self.assertEqual(document.content, '适合小户型的三人沙发')
+
+        self.tag.name = '橡木'
+        self.tag.save()
+        self.assertIn('橡木', ProductSearchDocument.objects.get(product=self.sofa).keywords)
+
+        self.category.products.add(self.sofa)
+        self.assertIn('客厅家具', ProductSearchDocument.objects.get(product=self.sofa).keywords)
+        self.category.products.clear()
+        self.assertNotIn('客厅家具', ProductSearchDocument.objects.get(product=self.table).keywords)
+
+        self.tag.delete()
+        self.assertNotIn('橡木', ProductSearchDocument.objects.get(product=self.sofa).keywords)
+        self.sofa.delete()
+        self.assertFalse(ProductSearchDocument.objects.filter(product_id=self.sofa.pk).exists())
+
+    def test_search_matches_text_sku_and_labels(self):
+        """测试按中文、SKU、标签与分类名称搜索，多个词需同时匹配"""
+        self.assertEqual(self.search('沙发'), ['SOFA-001'])
+        self.assertEqual(self.search('table-001'), ['TABLE-001'])
+        self.assertEqual(self.search('实木'), ['SOFA-001'])
+        self.assertEqual(self.search('客厅 餐桌'), ['TABLE-001'])
+        self.assertEqual(self.search('小户型'), ['SOFA-001'])
+        self.assertEqual(self.search('沙发 餐桌'), [])
+        self.assertEqual(self.search('  '), ['SOFA-001', 'TABLE-001'])
+
+    def test_search_is_tenant_scoped(self):
+        """测试指定租户时只匹配该租户的文档"""
+        other = TenantFactory()
+        Product.objects.create(tenant=other, name='皮质沙发', slug='other-sofa', sku='OTHER-SOFA', price=Decimal('1'))
+        self.assertEqual(self.search('沙发', self.tenant.pk), ['SOFA-001'])
+        self.assertEqual(self.search('沙发'), ['OTHER-SOFA', 'SOFA-001'])
+
+    def test_rebuild_command(self):
+        """测试重建命令补全缺失的文档并删除多余的文档"""
+        ProductSearchDocument.objects.all().delete()
+        ProductSearchDocument.objects.create(product=self.table, tenant=TenantFactory(), keywords='旧', content='')
+        out = io.StringIO()
+        call_command('rebuild_search_index', '--tenant', str(self.tenant.pk), '--batch-size', '1', stdout=out)
+        self.assertEqual(
+            sorted(ProductSearchDocument.objects.values_list('product_id', flat=True)),
+            [self.sofa.pk, self.table.pk],
+        )
+        self.assertEqual(ProductSearchDocument.objects.get(product=self.table).tenant, self.tenant)
+        self.assertIn('2', out.getvalue())
+
+    def test_mysql_boolean_query(self):
+        """测试MySQL后端的布尔查询：去掉运算符，短词按前缀匹配"""
+        self.assertEqual(parse_terms('+沙发 -"餐桌" 沙发'), ['沙发', '餐桌'])
+        self.assertEqual(MySQLFulltextBackend().boolean_query('布艺沙发 A'), '+"布艺沙发" +A*')
+
+    def test_mysql_single_match_condition(self):
+        """测试MySQL后端的条件只含一个MATCH，加权得分只出现在排序中"""
+        backend = MySQLFulltextBackend()
+        where_sql = str(backend.filter(Product.original_objects.all(), '沙发').query).split(' WHERE ', 1)[1]
+        self.assertEqual(where_sql.count('MATCH'), 1)
+        select_sql, where_sql = str(backend.documents('沙发').query).split(' WHERE ', 1)
+        self.assertIn('MATCH (keywords) AGAINST', select_sql)
+        self.assertEqual(where_sql.split(' ORDER BY ')[0].count('MATCH'), 1)
+
+
+class InvertedIndexTest(TestCase):
+    """测试进程内倒排索引后端"""
+
+    def setUp(self):
+        set_current_tenant(None)
+        self.addCleanup(set_current_tenant, None)
+        inverted_index.clear()
+        self.addCleanup(inverted_index.clear)
+        self.snapshot_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.snapshot_dir, ignore_errors=True)
+        settings_override = override_settings(PRODUCT_SEARCH={
+            'BACKEND': 'search.inverted_index.InvertedIndexBackend',
+            'INDEX_SNAPSHOT_DIR': self.snapshot_dir,
+            'INDEX_SYNC_INTERVAL': 0,
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.tenant = TenantFactory()
+        self.tag = Tag.objects.create(tenant=self.tenant, name='实木', slug='solid-wood')
+        self.sofa = Product.objects.create(
+            tenant=self.tenant, name='北欧布艺沙发', slug='sofa', sku='SOFA-001', price=Decimal('100'),
+        )
+        self.chair = Product.objects.create(
+            tenant=self.tenant, name='实木餐椅', slug='chair', sku='CHAIR-001', price=Decimal('50'),
+        )
+        other = TenantFactory()
+        Product.objects.create(tenant=other, name='皮质沙发', slug='other-sofa', sku='OTHER-SOFA', price=Decimal('1'))
+
+    def search(self, query):
+        return sorted(get_search_backend().filter(Product.original_objects.all(), query, self.tenant.pk)
+                      .values_list('sku', flat=True))
+
+    def test_tokenize(self):
+        """测试中文按相邻两字切分，字母数字按连续串切分并转为小写"""
+        self.assertEqual(
+            list(tokenize('北欧布艺沙发 ＳＯＦＡ-001 椅')),
+            ['北欧', '欧布', '布艺', '艺沙', '沙发', 'sofa', '001', '椅'],
+        )
+        self.assertEqual(list(tokenize('餐椅 sofa', document=True)), ['餐椅', '椅', 'sofa'])
+
+    def test_prefix_search(self):
+        """测试字母数字按前缀匹配部分SKU，单个中文字匹配词中任意位置的字"""
+        self.assertEqual(self.search('sof'), ['SOFA-001'])
+        self.assertEqual(self.search('SOFA-0'), ['SOFA-001'])
+        self.assertEqual(self.search('chair-00'), ['CHAIR-001'])
+        self.assertEqual(self.search('fa-001'), [])
+        self.assertEqual(self.search('发'), ['SOFA-001'])
+        self.assertEqual(self.search('艺'), ['SOFA-001'])
+        self.assertEqual(self.search('欧 椅'), [])
+        index = inverted_index.get(self.tenant.pk)
+        self.assertEqual(index.vocabulary, sorted(index.postings))
+
+    def test_search_and_incremental_updates(self):
+        """测试按中文、单字、SKU搜索，产品与标签变更后索引随之更新"""
+        self.assertEqual(self.search('沙发'), ['SOFA-001'])
+        self.assertEqual(self.search('椅'), ['CHAIR-001'])
+        self.assertEqual(self.search('sofa 001'), ['SOFA-001'])
+        self.assertEqual(self.search('实木'), ['CHAIR-001'])
+
+        self.sofa.tags.add(self.tag)
+        self.assertEqual(self.search('实木'), ['CHAIR-001', 'SOFA-001'])
+        self.tag.name = '橡木'
+        self.tag.save()
+        self.assertEqual(self.search('橡木'), ['SOFA-001'])
+
+        self.chair.name = '休闲椅'
+        self.chair.save()
+        self.assertEqual(self.search('实木'), [])
+        chair_id = self.chair.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chair.delete()
+        self.assertEqual(inverted_index.search(self.tenant.pk, '休闲'), [])
+        self.assertNotIn(chair_id, inverted_index.get(self.tenant.pk).doc_tokens)
+
+    def test_rolled_back_changes_are_not_indexed(self):
+        """测试事务回滚后进程内索引不包含回滚的文本，提交后才更新"""
+        with override_settings(PRODUCT_SEARCH={
+            'BACKEND': 'search.inverted_index.InvertedIndexBackend', 'INDEX_SYNC_INTERVAL': 3600,
+        }):
+            self.assertEqual(inverted_index.search(self.tenant.pk, '餐椅'), [self.chair.pk])
+            sofa_id = self.sofa.pk
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                try:
+                    with transaction.atomic():
+                        self.chair.name = '藤编椅'
+                        self.chair.save()
+                        self.sofa.delete()
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+            self.assertEqual(callbacks, [])
+            self.assertEqual(inverted_index.search(self.tenant.pk, '藤编'), [])
+            self.assertEqual(inverted_index.search(self.tenant.pk, '沙发'), [sofa_id])
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.chair.save()
+            self.assertEqual(inverted_index.search(self.tenant.pk, '藤编'), [self.chair.pk])
+
+    def test_snapshot_warm_start(self):
+        """测试从快照加载索引，并从文档表同步其他进程写入的文档"""
+        self.assertEqual(self.search('沙发'), ['SOFA-001'])
+        self.assertTrue(os.path.exists(os.path.join(self.snapshot_dir, f'tenant-{self.tenant.pk}.idx')))
+
+        # 模拟其他进程：直接修改文档表，本进程的索引未收到更新
+        ProductSearchDocument.objects.filter(product=self.chair).update(keywords='藤编椅', updated_at=timezone.now())
+        inverted_index.clear()
+        self.assertEqual(self.search('藤编'), ['CHAIR-001'])
+        self.assertEqual(self.search('沙发'), ['SOFA-001'])
+
+    def test_snapshot_rewritten_after_sync(self):
+        """测试同步到更新后按间隔重写快照，之后启动的进程从快照中直接得到这些文档"""
+        self.assertEqual(self.search('沙发'), ['SOFA-001'])
+        ProductSearchDocument.objects.filter(product=self.chair).update(keywords='藤编椅', updated_at=timezone.now())
+        inverted_index.get(self.tenant.pk)
+        self.assertNotIn('藤编', inverted_index.read_snapshot(self.tenant.pk).postings)
+
+        with override_settings(PRODUCT_SEARCH={
+            'INDEX_SNAPSHOT_DIR': self.snapshot_dir, 'INDEX_SYNC_INTERVAL': 0, 'INDEX_SNAPSHOT_INTERVAL': 0,
+        }):
+            index = inverted_index.get(self.tenant.pk)
+        self.assertEqual(index.changes, 0)
+        self.assertEqual(list(inverted_index.read_snapshot(self.tenant.pk).postings['藤编']), [self.chair.pk])
+
+    def test_rebuild_writes_snapshots(self):
+        """测试重建命令写入各租户的快照"""
+        out = io.StringIO()
+        call_command('rebuild_search_index', '--snapshot', stdout=out)
+        self.assertEqual(len(os.listdir(self.snapshot_dir)), 2)
+        # 从快照加载，只同步快照之后更新的文档
+        ProductSearchDocument.objects.filter(tenant=self.tenant).update(
+            keywords='', content='', updated_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(inverted_index.search(self.tenant.pk, '沙发'), [self.sofa.pk])
+
+
+class FacetIndexTest(TestCase):
+    """测试分面索引"""
+
+    def setUp(self):
+        set_current_tenant(None)
+        self.addCleanup(set_current_tenant, None)
+        facet_index.clear()
+        self.addCleanup(facet_index.clear)
+
+    def test_positions_are_reused(self):
+        """测试移除产品后位置被复用，位图与计数正确"""
+        facets = TenantFacets([0, 100])
+        facets.add(1, [('type', 'simple'), ('tags', 7)], Decimal('50'))
+        facets.add(2, [('type', 'variable'), ('tags', 7)], Decimal('150'))
+        facets.remove(1)
+        facets.add(3, [('type', 'simple')], None)
+        self.assertEqual(facets.positions, {2: 1, 3: 0})
+        result = facets.counts({'tags': [7]})
+        self.assertEqual(result['type'], [{'value': 'variable', 'count': 1}])
+        self.assertEqual(result['tags'], [{'value': 7, 'count': 1}])
+        self.assertEqual(result['price'], [{'value': '100-', 'min': 100, 'max': None, 'count': 1}])
+        self.assertEqual(facets.counts({}, min_price=Decimal('100'))['type'], [{'value': 'variable', 'count': 1}])
+
+    def test_batch_add_matches_single_adds(self):
+        """测试批量添加、移除与逐个添加、移除得到相同的位图"""
+        rows = [(i, [('type', 'simple' if i % 3 else 'variable'), ('tags', i % 5)], Decimal(i)) for i in range(1, 200)]
+        single, batch = TenantFacets([0, 100]), TenantFacets([0, 100])
+        for row in rows:
+            single.add(*row)
+        batch.add_many(rows)
+        removed = list(range(1, 200, 7))
+        for product_id in removed:
+            single.remove(product_id)
+        batch.remove_many(removed)
+        self.assertEqual(single.alive, batch.alive)
+        self.assertEqual(dict(single.bitmaps), dict(batch.bitmaps))
+        self.assertEqual(batch.counts({'type': ['variable']}), single.counts({'type': ['variable']}))
+        self.assertEqual(len(batch), 199 - len(removed))
+
+    def test_invalidate_marks_only_owning_tenant(self):
+        """测试产品变更只标记所属租户的索引"""
+        tenant, other = TenantFactory(), TenantFactory()
+        product = Product.objects.create(tenant=tenant, name='产品', slug='p', sku='P', status='published')
+        facet_index.counts(tenant.pk, {})
+        facet_index.counts(other.pk, {})
+        product.status = 'draft'
+        product.save()
+        self.assertEqual(facet_index.get(other.pk).dirty, set())
+        self.assertEqual(facet_index.counts(tenant.pk, {})['status'], [{'value': 'draft', 'count': 1}])
+
+    @override_settings(PRODUCT_SEARCH={'INDEX_SYNC_INTERVAL': 0})
+    def test_sync_reads_product_ids_only_when_count_changes(self):
+        """测试产品数与数据库一致时，同步只查询文档更新与产品数"""
+        tenant = TenantFactory()
+        Product.objects.create(tenant=tenant, name='产品', slug='p', sku='P', status='published')
+        # 文档更新时间早于同步的重叠时间，不需要重新加载
+        ProductSearchDocument.objects.filter(tenant=tenant).update(updated_at=timezone.now() - timedelta(hours=1))
+        facet_index.counts(tenant.pk, {})
+        with self.assertNumQueries(2):
+            facet_index.counts(tenant.pk, {})
+
+    @override_settings(PRODUCT_SEARCH={'INDEX_SYNC_INTERVAL': 0})
+    def test_sync_picks_up_other_process_writes(self):
+        """测试从文档表同步其他进程更新的产品，并移除已删除的产品"""
+        tenant = TenantFactory()
+        products = [
+            Product.objects.create(tenant=tenant, name=f'产品{i}', slug=f'p-{i}', sku=f'P-{i}', status='published')
+            for i in range(3)
+        ]
+        self.assertEqual(facet_index.counts(tenant.pk, {})['status'], [{'value': 'published', 'count': 3}])
+
+        # 模拟其他进程：不经过本进程的信号修改数据，只留下文档更新时间
+        Product.original_objects.filter(pk=products[0].pk).update(status='draft')
+        ProductSearchDocument.objects.filter(product=products[0]).update(updated_at=timezone.now())
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM product_search_documents WHERE product_id = %s', [products[1].pk])
+            cursor.execute('DELETE FROM products WHERE id = %s', [products[1].pk])
+        self.assertEqual(facet_index.counts(tenant.pk, {})['status'], [
+            {'value': 'draft', 'count': 1}, {'value': 'published', 'count': 1},
+        ])
+
+
+class ImportIndexingTest(TestCase):
+    """测试导入后生成搜索文档"""
+
+    def test_import_indexes_products(self):
+        """测试批量导入的产品同样生成搜索文档"""
+        user = UserFactory()
+        path = os.path.join(settings.BASE_DIR, 'vSimpleNew2.csv')
+        history = ImportHistory.objects.create(user=user, file_name='vSimpleNew2.csv', file_path=path)
+        WooCommerceImporter(history).run()
+
+        product = Product.original_objects.get(sku='VL-EXCL-DT-056')
+        document = ProductSearchDocument.objects.get(product=product)
+        self.assertEqual(document.tenant, user.tenant)
+        self.assertIn('Uncategorized', document.keywords)
@@ -0,0 +1,62 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.test import RequestFactory, TestCase
+
+from common.tenant_middleware import (
+    TenantMiddleware, get_current_tenant, set_current_tenant, tenant_context,
+)
+from products.models import Tag
+from tests.factories.tenant_factories import TenantFactory
+from tests.factories.user_factories import UserFactory
+
+
+class TenantContextTest(TestCase):
+    """测试基于contextvars的租户上下文"""
+
+    def setUp(self):
+        self.tenant1 = TenantFactory()
+        self.tenant2 = TenantFactory()
+        set_current_tenant(None)
+        self.addCleanup(set_current_tenant, None)
+
+    def test_tenant_context_restores_previous_tenant(self):
+        """测试tenant_context退出后恢复之前的租户，管理器与保存按上下文取租户"""
+        set_current_tenant(self.tenant1)
+        with tenant_context(self.tenant2):
+            tag = Tag(name='木质', slug='wood')
+            tag.save()
+            self.assertEqual(list(Tag.objects.values_list('id', flat=True)), [tag.id])
+        self.assertEqual(get_current_tenant(), self.tenant1)
+        self.assertEqual(tag.tenant, self.tenant2)
+        self.assertFalse(Tag.objects.exists())
+
+    async def test_concurrent_coroutines_are_isolated(self):
+        """测试同一线程上并发的协程各自看到自己的租户"""
+        async def handle(tenant):
+            with tenant_context(tenant):
+                await asyncio.sleep(0.01)
+                return get_current_tenant()
+
+        results = await asyncio.gather(*(handle(tenant) for tenant in [self.tenant1, self.tenant2] * 5))
+        self.assertEqual(results, [self.tenant1, self.tenant2] * 5)
+        self.assertIsNone(get_current_tenant())
+
+    async def test_async_middleware_sets_tenant(self):
+        """测试异步中间件为请求设置租户，响应后清除"""
+        user = await sync_to_async(UserFactory)(tenant=self.tenant1)
+        seen = []
+
+        async def get_response(request):
+            seen.append(get_current_tenant())
+            # 同步视图在线程中执行时同样能读取租户
+            seen.append(await sync_to_async(get_current_tenant)())
+            return 'response'
+
+        middleware = TenantMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        request = RequestFactory().get('/')
+        request.user = user
+        self.assertEqual(await middleware(request), 'response')
+        self.assertEqual(seen, [self.tenant1, self.tenant1])
+        self.assertIsNone(get_current_tenant())
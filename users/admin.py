@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import Group
 from django.utils.html import format_html
-from .models import User, UserProfile, UserToken
+from .models import TokenRevocation, User, UserProfile, UserToken
 
 # Register your models here.
 
@@ -84,10 +84,10 @@ class UserTokenAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'token_type', 'is_valid', 'expired_at', 'created_at', 'is_expired')
     list_filter = ('token_type', 'is_valid', 'expired_at')
     search_fields = ('user__username', 'user__email')
-    readonly_fields = ('created_at', 'is_expired')
+    readonly_fields = ('token_hash', 'created_at', 'is_expired')
     fieldsets = (
         ('令牌信息', {
-            'fields': ('user', 'token', 'token_type', 'is_valid', 'expired_at')
+            'fields': ('user', 'token_hash', 'token_type', 'is_valid', 'expired_at')
         }),
         ('其他信息', {
             'fields': ('created_at', 'is_expired'),
@@ -100,7 +100,15 @@ class UserTokenAdmin(admin.ModelAdmin):
     is_expired.boolean = True
     is_expired.short_description = '是否过期'
 
+@admin.register(TokenRevocation)
+class TokenRevocationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'jti', 'user', 'token_type', 'revoked_at', 'expires_at')
+    list_filter = ('token_type', 'revoked_at')
+    search_fields = ('jti', 'user__username')
+    raw_id_fields = ('user',)
+
 # 注册模型
 admin.site.register(User, UserAdmin)
 # 如果需要Group模型，取消下面的注释
 # admin.site.unregister(Group)
+
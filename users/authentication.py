@@ -2,21 +2,35 @@
 JWT认证模块
 提供JWT令牌的生成、验证和管理功能
 """
+import uuid
+
 import jwt
 from datetime import datetime, timedelta, timezone as dt_timezone
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from rest_framework.authentication import BaseAuthentication
-from rest_framework.exceptions import AuthenticationFailed
 
-from common.exceptions import TokenException, TokenExpiredException
+from common.exceptions import PermissionException, TokenException, TokenExpiredException
+from common.tenant_cache import is_tenant_active, tenant_cache
+from common.tenant_middleware import set_current_tenant
 from .models import User, UserToken
+from .revocation import is_stateless, issued_at, revocation_list
+from .token_cache import VerifiedToken, token_cache
+
+# 令牌有效期
+ACCESS_TOKEN_LIFETIME = timedelta(hours=1)
+REFRESH_TOKEN_LIFETIME = timedelta(days=7)
 
 
 class JWTAuthentication(BaseAuthentication):
     """
     JWT认证类
-    实现基于JWT令牌的用户认证
+    实现基于JWT令牌的用户认证，已验证的令牌缓存在token_cache中，
+    命中时只按主键加载用户，request.auth为VerifiedToken；
+    settings.JWT_AUTH['STATELESS']开启时不查询令牌表，见users.revocation。
+    认证通过后按令牌中的tenant_id从租户缓存取得租户，设置user.tenant与租户上下文，
+    暂停或已删除租户的用户（超级管理员除外）拒绝访问
     """
     
     def authenticate(self, request):
@@ -35,47 +49,87 @@ class JWTAuthentication(BaseAuthentication):
         if not token:
             return None
             
+        # 无状态模式：只校验签名、过期时间与进程内的吊销列表，request.auth为令牌载荷
+        if is_stateless():
+            user, payload, _ = TokenManager.verify_token(token)
+            return self.authenticate_tenant(user, payload, payload.get('tenant_id'))
+
+        # 已验证过的令牌直接从缓存取得用户，不查询令牌表
+        cached = token_cache.get(token)
+        if cached is not None:
+            user = User.objects.filter(pk=cached.user_id).first()
+            if user is not None and user.tenant_id == cached.tenant_id:
+                return self.authenticate_tenant(user, cached, cached.tenant_id)
+            token_cache.discard(token)
+
         try:
+            # 解码令牌，签名或格式不正确时无需查询数据库
+            payload = jwt.decode(
+                token,
+                settings.SECRET_KEY,
+                algorithms=['HS256']
+            )
+
+            # 验证令牌用户
+            user_id = payload.get('user_id')
+            if not user_id:
+                raise TokenException("令牌用户信息不匹配")
+
+            # 查询数据库之前读取吊销版本号，查询期间令牌被吊销时缓存条目随即失效
+            version = token_cache.get_version(int(user_id))
+
             # 查找令牌
             token_obj = UserToken.objects.filter(
-                token=token,
+                token_hash=UserToken.hash_token(token),
                 token_type='access',
                 is_valid=True,
                 expired_at__gt=timezone.now()
             ).select_related('user').first()
-            
+
             if not token_obj:
                 raise TokenException("无效的令牌或令牌已过期")
-                
-            # 解码令牌
-            payload = jwt.decode(
-                token,
-                settings.SECRET_KEY,
-                algorithms=['HS256']
-            )
-            
-            # 验证令牌用户和过期时间
-            user_id = payload.get('user_id')
-            if not user_id or int(user_id) != token_obj.user.id:
+
+            if int(user_id) != token_obj.user.id:
                 raise TokenException("令牌用户信息不匹配")
-                
+
             exp = payload.get('exp')
             if not exp or datetime.fromtimestamp(exp, tz=dt_timezone.utc) < timezone.now():
                 # 如果令牌已过期，将其标记为无效
                 token_obj.is_valid = False
                 token_obj.save(update_fields=['is_valid'])
                 raise TokenExpiredException()
-                
-            # 返回用户和令牌对象
-            return (token_obj.user, token_obj)
-            
+
+            user = token_obj.user
+            verified = VerifiedToken(user.id, user.tenant_id, exp, version)
+            token_cache.set(token, verified)
+
+        except jwt.ExpiredSignatureError:
+            raise TokenExpiredException()
         except jwt.PyJWTError as e:
             raise TokenException(f"令牌解析失败: {str(e)}")
         except TokenException as e:
             raise e
         except Exception as e:
             raise TokenException(f"认证失败: {str(e)}")
-    
+
+        return self.authenticate_tenant(user, verified, user.tenant_id)
+
+    def authenticate_tenant(self, user, auth, tenant_id):
+        """
+        从租户缓存取得用户的租户并设置租户上下文
+        :param user: 已认证的用户，其tenant_id已与令牌一致
+        :param auth: 作为request.auth返回的令牌信息
+        :param tenant_id: 令牌中的租户ID
+        :return: (user, auth) 元组
+        """
+        tenant = tenant_cache.get(tenant_id)
+        if tenant is not None and not is_tenant_active(tenant) and not user.is_super_admin:
+            raise PermissionException(message="所属租户已暂停或已删除")
+        # 使用缓存的租户，访问user.tenant时不再查询租户表
+        user.tenant = tenant
+        set_current_tenant(tenant)
+        return (user, auth)
+
     def authenticate_header(self, request):
         """
         返回认证头部名称
@@ -89,158 +143,117 @@ class TokenManager:
     """
     令牌管理工具类
     用于生成和管理JWT令牌
+    令牌载荷包含jti与tenant_id；无状态模式下令牌不写入user_tokens表，失效通过吊销列表实现
     """
-    
+
     @staticmethod
-    def generate_tokens(user):
+    def encode_token(user, token_type, lifetime):
         """
-        为用户生成访问令牌和刷新令牌
+        签发令牌
         :param user: 用户对象
-        :return: (access_token, refresh_token, access_token_obj, refresh_token_obj) 元组
+        :param token_type: 令牌类型，access或refresh
+        :param lifetime: 有效期（timedelta）
+        :return: (令牌字符串, 过期时间) 元组
         """
-        # 生成访问令牌
-        access_token_expiry = timezone.now() + timedelta(hours=1)
-        access_payload = {
-            'user_id': user.id,
-            'username': user.username,
-            'exp': int(access_token_expiry.timestamp()),
-            'iat': int(timezone.now().timestamp()),
-            'type': 'access'
-        }
-        access_token = jwt.encode(
-            access_payload,
-            settings.SECRET_KEY,
-            algorithm='HS256'
-        )
-        
-        # 确保access_token是字符串类型
-        if isinstance(access_token, bytes):
-            access_token = access_token.decode('utf-8')
-        
-        # 生成刷新令牌
-        refresh_token_expiry = timezone.now() + timedelta(days=7)
-        refresh_payload = {
+        now = timezone.now()
+        expiry = now + lifetime
+        payload = {
             'user_id': user.id,
-            'exp': int(refresh_token_expiry.timestamp()),
-            'iat': int(timezone.now().timestamp()),
-            'type': 'refresh'
+            'tenant_id': user.tenant_id,
+            'jti': uuid.uuid4().hex,
+            'exp': int(expiry.timestamp()),
+            'iat': issued_at(now),
+            'type': token_type
         }
-        refresh_token = jwt.encode(
-            refresh_payload,
+        if token_type == 'access':
+            payload['username'] = user.username
+        token = jwt.encode(
+            payload,
             settings.SECRET_KEY,
             algorithm='HS256'
         )
-        
-        # 确保refresh_token是字符串类型
-        if isinstance(refresh_token, bytes):
-            refresh_token = refresh_token.decode('utf-8')
-        
-        # 保存令牌到数据库
-        # 先使当前用户的同类型令牌失效
-        UserToken.objects.filter(
-            user=user,
-            token_type='access',
-            is_valid=True
-        ).update(is_valid=False)
-        
-        UserToken.objects.filter(
-            user=user,
-            token_type='refresh',
-            is_valid=True
-        ).update(is_valid=False)
-        
-        # 创建新的令牌记录
-        access_token_obj = UserToken.objects.create(
+
+        # 确保令牌是字符串类型
+        if isinstance(token, bytes):
+            token = token.decode('utf-8')
+        return token, expiry
+
+    @staticmethod
+    def generate_tokens(user):
+        """
+        为用户生成访问令牌和刷新令牌
+        :param user: 用户对象
+        :return: (access_token, refresh_token, access_token_obj, refresh_token_obj) 元组，
+                 无状态模式下不保存令牌记录，两个令牌对象为None；
+                 令牌对象批量写入，MySQL下不回填主键
+        """
+        if is_stateless():
+            # 先吊销当前用户已签发的令牌再签发，新令牌的签发时间不早于吊销时间
+            revocation_list.revoke_user(user.id, REFRESH_TOKEN_LIFETIME)
+
+        # 生成访问令牌和刷新令牌
+        access_token, access_token_expiry = TokenManager.encode_token(user, 'access', ACCESS_TOKEN_LIFETIME)
+        refresh_token, refresh_token_expiry = TokenManager.encode_token(user, 'refresh', REFRESH_TOKEN_LIFETIME)
+        if is_stateless():
+            return (access_token, refresh_token, None, None)
+
+        access_token_obj = UserToken(
             user=user,
-            token=access_token,
+            token_hash=UserToken.hash_token(access_token),
             token_type='access',
             expired_at=access_token_expiry
         )
-        
-        refresh_token_obj = UserToken.objects.create(
+        refresh_token_obj = UserToken(
             user=user,
-            token=refresh_token,
+            token_hash=UserToken.hash_token(refresh_token),
             token_type='refresh',
             expired_at=refresh_token_expiry
         )
-        
+
+        # 在同一事务中使当前用户的全部有效令牌失效，并批量写入新的令牌对
+        with transaction.atomic():
+            UserToken.objects.filter(user=user, is_valid=True).update(is_valid=False)
+            UserToken.objects.bulk_create([access_token_obj, refresh_token_obj])
+        token_cache.revoke_user_on_commit(user.id)
+
         return (access_token, refresh_token, access_token_obj, refresh_token_obj)
-    
+
     @staticmethod
     def refresh_access_token(refresh_token):
         """
         使用刷新令牌生成新的访问令牌
         :param refresh_token: 刷新令牌
-        :return: (access_token, access_token_obj) 元组
+        :return: (access_token, access_token_obj) 元组，无状态模式下access_token_obj为None
         """
         try:
-            # 验证刷新令牌
-            token_obj = UserToken.objects.filter(
-                token=refresh_token,
-                token_type='refresh',
-                is_valid=True,
-                expired_at__gt=timezone.now()
-            ).select_related('user').first()
-            
-            if not token_obj:
-                raise TokenException("无效的刷新令牌")
-                
-            # 解码令牌
-            payload = jwt.decode(
-                refresh_token,
-                settings.SECRET_KEY,
-                algorithms=['HS256']
-            )
-            
-            # 验证令牌类型和用户
-            if payload.get('type') != 'refresh':
-                raise TokenException("无效的令牌类型")
-                
-            user_id = payload.get('user_id')
-            if not user_id or int(user_id) != token_obj.user.id:
-                raise TokenException("令牌用户信息不匹配")
-                
-            # 生成新的访问令牌
-            user = token_obj.user
-            
-            # 使当前用户的访问令牌失效
-            UserToken.objects.filter(
-                user=user,
-                token_type='access',
-                is_valid=True
-            ).update(is_valid=False)
-            
+            user, _, _ = TokenManager.verify_token(refresh_token, is_refresh=True)
+
+            if is_stateless():
+                # 先吊销再签发，新令牌的签发时间不早于吊销时间
+                revocation_list.revoke_user(user.id, ACCESS_TOKEN_LIFETIME, token_type='access')
+                access_token, _ = TokenManager.encode_token(user, 'access', ACCESS_TOKEN_LIFETIME)
+                return (access_token, None)
+
             # 生成新的访问令牌
-            access_token_expiry = timezone.now() + timedelta(hours=1)
-            access_payload = {
-                'user_id': user.id,
-                'username': user.username,
-                'exp': int(access_token_expiry.timestamp()),
-                'iat': int(timezone.now().timestamp()),
-                'type': 'access'
-            }
-            access_token = jwt.encode(
-                access_payload,
-                settings.SECRET_KEY,
-                algorithm='HS256'
-            )
-            
-            # 确保access_token是字符串类型
-            if isinstance(access_token, bytes):
-                access_token = access_token.decode('utf-8')
-            
-            # 保存新令牌到数据库
-            access_token_obj = UserToken.objects.create(
-                user=user,
-                token=access_token,
-                token_type='access',
-                expired_at=access_token_expiry
-            )
-            
+            access_token, access_token_expiry = TokenManager.encode_token(user, 'access', ACCESS_TOKEN_LIFETIME)
+
+            # 在同一事务中使旧访问令牌失效并保存新令牌
+            with transaction.atomic():
+                UserToken.objects.filter(
+                    user=user,
+                    token_type='access',
+                    is_valid=True
+                ).update(is_valid=False)
+                access_token_obj = UserToken.objects.create(
+                    user=user,
+                    token_hash=UserToken.hash_token(access_token),
+                    token_type='access',
+                    expired_at=access_token_expiry
+                )
+            token_cache.revoke_user_on_commit(user.id)
+
             return (access_token, access_token_obj)
-            
-        except jwt.PyJWTError as e:
-            raise TokenException(f"令牌解析失败: {str(e)}")
+
         except TokenException as e:
             raise e
         except Exception as e:
@@ -252,43 +265,57 @@ class TokenManager:
         验证令牌
         :param token: 令牌字符串
         :param is_refresh: 是否是刷新令牌
-        :return: (user, payload, token_obj) 元组
+        :return: (user, payload, token_obj) 元组，无状态模式下token_obj为None
         """
         try:
             # 确保token是字符串类型
             if isinstance(token, bytes):
                 token = token.decode('utf-8')
-                
+
             # 解码令牌
             payload = jwt.decode(
                 token,
                 settings.SECRET_KEY,
                 algorithms=['HS256']
             )
-            
+
             # 验证令牌类型
             token_type = 'refresh' if is_refresh else 'access'
             if payload.get('type') != token_type:
                 raise TokenException("无效的令牌类型")
-            
+
+            user_id = payload.get('user_id')
+            if not user_id:
+                raise TokenException("令牌用户信息不匹配")
+
+            if is_stateless():
+                # 只校验签名、过期时间与吊销列表
+                if revocation_list.is_revoked(payload):
+                    raise TokenException("无效的令牌或令牌已过期")
+                user = User.objects.filter(pk=user_id).first()
+                if user is None or user.tenant_id != payload.get('tenant_id'):
+                    raise TokenException("令牌用户信息不匹配")
+                return (user, payload, None)
+
             # 验证令牌是否存在于数据库且有效
             token_obj = UserToken.objects.filter(
-                token=token,
+                token_hash=UserToken.hash_token(token),
                 token_type=token_type,
                 is_valid=True,
                 expired_at__gt=timezone.now()
             ).select_related('user').first()
-            
+
             if not token_obj:
                 raise TokenException("无效的令牌或令牌已过期")
-            
-            user_id = payload.get('user_id')
-            if not user_id or int(user_id) != token_obj.user.id:
+
+            if int(user_id) != token_obj.user.id:
                 raise TokenException("令牌用户信息不匹配")
-            
+
             # 返回用户和令牌信息
             return (token_obj.user, payload, token_obj)
-        
+
+        except jwt.ExpiredSignatureError:
+            raise TokenExpiredException()
         except jwt.PyJWTError as e:
             raise TokenException(f"令牌解析失败: {str(e)}")
         except TokenException as e:
@@ -304,33 +331,56 @@ class TokenManager:
         :param token_type: 令牌类型
         :return: 是否成功使令牌失效
         """
+        if is_stateless():
+            # 已过期的令牌也可以吊销，签名不正确的令牌视为无效
+            try:
+                payload = jwt.decode(
+                    token,
+                    settings.SECRET_KEY,
+                    algorithms=['HS256'],
+                    options={'verify_exp': False}
+                )
+            except jwt.PyJWTError:
+                return False
+            if payload.get('type') != token_type:
+                return False
+            return revocation_list.revoke_token(payload)
+
         # 查找并使令牌失效
         token_obj = UserToken.objects.filter(
-            token=token,
+            token_hash=UserToken.hash_token(token),
             token_type=token_type,
             is_valid=True
         ).first()
-        
+
+        token_cache.discard(token)
         if token_obj:
             token_obj.is_valid = False
             token_obj.save(update_fields=['is_valid'])
+            token_cache.revoke_user_on_commit(token_obj.user_id)
             return True
-            
+
         return False
-    
+
     @staticmethod
     def invalidate_user_tokens(user, token_type=None):
         """
         使用户的所有令牌失效
         :param user: 用户对象
         :param token_type: 令牌类型，None表示所有类型
-        :return: 失效的令牌数量
+        :return: 失效的令牌数量，无状态模式下令牌没有记录，返回0
         """
+        if is_stateless():
+            lifetime = ACCESS_TOKEN_LIFETIME if token_type == 'access' else REFRESH_TOKEN_LIFETIME
+            revocation_list.revoke_user(user.id, lifetime, token_type=token_type or '')
+            return 0
+
         query = UserToken.objects.filter(user=user, is_valid=True)
         if token_type:
             query = query.filter(token_type=token_type)
-            
+
         count = query.count()
         query.update(is_valid=False)
-        
+        token_cache.revoke_user_on_commit(user.id)
+
         return count
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from users.retention import PURGE_BATCH_SIZE, purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = '分批删除过期超过保留期的令牌记录和已过期的吊销记录'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, help='令牌过期后的保留天数，默认使用JWT_AUTH配置')
+        parser.add_argument('--batch-size', type=int, help='每批删除的行数', default=PURGE_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, help='每批之间暂停的秒数', default=0)
+
+    def handle(self, *args, **options):
+        result = purge_expired_tokens(
+            retention_days=options['retention_days'],
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"已删除{result['tokens']}条令牌记录，{result['revocations']}条吊销记录"
+        ))
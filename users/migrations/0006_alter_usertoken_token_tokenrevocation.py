@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_create_default_tenant_and_associate_users'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usertoken',
+            name='token',
+            field=models.CharField(max_length=512),
+        ),
+        migrations.CreateModel(
+            name='TokenRevocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(blank=True, help_text='被吊销的令牌ID', max_length=64, null=True, unique=True)),
+                ('token_type', models.CharField(blank=True, choices=[('', '全部'), ('access', '访问令牌'), ('refresh', '刷新令牌')], default='', max_length=20)),
+                ('revoked_at', models.DateTimeField(help_text='按用户吊销时，早于该时间签发的令牌失效')),
+                ('expires_at', models.DateTimeField(db_index=True, help_text='相关令牌全部过期的时间，之后可清理')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='token_revocations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': '令牌吊销记录',
+                'verbose_name_plural': '令牌吊销记录',
+                'db_table': 'token_revocations',
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_existing_tokens(apps, schema_editor):
+    """
+    为已有令牌计算摘要，按主键分批更新
+    """
+    UserToken = apps.get_model('users', 'UserToken')
+    last_id = 0
+    while True:
+        batch = list(UserToken.objects.filter(id__gt=last_id).order_by('id').only('id', 'token')[:1000])
+        if not batch:
+            return
+        for token in batch:
+            token.token_hash = hashlib.sha256(token.token.encode('utf-8')).hexdigest()
+        UserToken.objects.bulk_update(batch, ['token_hash'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_alter_usertoken_token_tokenrevocation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usertoken',
+            name='token_hash',
+            field=models.CharField(default='', help_text='令牌的SHA-256摘要', max_length=64),
+            preserve_default=False,
+        ),
+        migrations.RunPython(hash_existing_tokens, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='usertoken',
+            name='user_tokens_token_f22396_idx',
+        ),
+        migrations.RemoveField(
+            model_name='usertoken',
+            name='token',
+        ),
+        migrations.AddIndex(
+            model_name='usertoken',
+            index=models.Index(fields=['token_hash'], name='user_tokens_token_h_f1ee2a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usertoken',
+            index=models.Index(fields=['expired_at'], name='user_tokens_expired_11b98e_idx'),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import hashlib
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
@@ -61,6 +63,8 @@ class UserProfile(models.Model):
 class UserToken(models.Model):
     """
     用户JWT令牌管理
+    只保存令牌的SHA-256摘要（定长64位），不保存令牌原文；
+    过期超过保留期的记录由purge_tokens命令分批清理
     """
     TOKEN_TYPE_CHOICES = (
         ('access', '访问令牌'),
@@ -68,7 +72,7 @@ class UserToken(models.Model):
     )
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tokens')
-    token = models.CharField(max_length=255)
+    token_hash = models.CharField(max_length=64, help_text="令牌的SHA-256摘要")
     token_type = models.CharField(max_length=20, choices=TOKEN_TYPE_CHOICES, default='access')
     is_valid = models.BooleanField(default=True)
     expired_at = models.DateTimeField()
@@ -79,12 +83,49 @@ class UserToken(models.Model):
         verbose_name = '用户令牌'
         verbose_name_plural = '用户令牌'
         indexes = [
-            models.Index(fields=['token']),
+            models.Index(fields=['token_hash']),
             models.Index(fields=['user', 'token_type']),
+            models.Index(fields=['expired_at']),
         ]
+
+    @staticmethod
+    def hash_token(token):
+        """
+        计算令牌摘要
+        """
+        if isinstance(token, str):
+            token = token.encode('utf-8')
+        return hashlib.sha256(token).hexdigest()
     
     @property
     def is_expired(self):
         """检查令牌是否已过期"""
         from django.utils import timezone
         return not self.is_valid or self.expired_at < timezone.now()
+
+
+class TokenRevocation(models.Model):
+    """
+    无状态JWT模式下的令牌吊销记录
+    只记录被吊销的令牌（按jti）或用户在某时刻之前签发的全部令牌，
+    令牌过期后记录即可清理
+    """
+    TOKEN_TYPE_CHOICES = (
+        ('', '全部'),
+    ) + UserToken.TOKEN_TYPE_CHOICES
+
+    jti = models.CharField(max_length=64, null=True, blank=True, unique=True, help_text="被吊销的令牌ID")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='token_revocations')
+    token_type = models.CharField(max_length=20, choices=TOKEN_TYPE_CHOICES, blank=True, default='')
+    revoked_at = models.DateTimeField(help_text="按用户吊销时，早于该时间签发的令牌失效")
+    expires_at = models.DateTimeField(db_index=True, help_text="相关令牌全部过期的时间，之后可清理")
+
+    class Meta:
+        db_table = 'token_revocations'
+        verbose_name = '令牌吊销记录'
+        verbose_name_plural = '令牌吊销记录'
+
+    def __str__(self):
+        if self.jti:
+            return f"令牌 {self.jti}"
+        return f"用户 {self.user_id} {self.revoked_at:%Y-%m-%d %H:%M:%S} 前签发的令牌"
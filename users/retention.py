@@ -0,0 +1,56 @@
+"""
+令牌记录清理模块
+user_tokens表中过期超过保留期的记录、token_revocations表中已过期的吊销记录分批删除，
+每批按主键删除固定数量的行，避免长事务与大范围锁
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import TokenRevocation, UserToken
+from .revocation import get_setting
+
+logger = logging.getLogger('django')
+
+# 每批删除的行数
+PURGE_BATCH_SIZE = 5000
+
+
+def purge_queryset(queryset, batch_size=PURGE_BATCH_SIZE, pause=0):
+    """
+    按主键分批删除查询集中的记录
+    :param queryset: 待删除记录的查询集
+    :param batch_size: 每批删除的行数
+    :param pause: 每批之间暂停的秒数，降低对线上库的压力
+    :return: 删除的行数
+    """
+    total = 0
+    while True:
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return total
+        deleted, _ = queryset.model.objects.filter(pk__in=ids).delete()
+        total += deleted
+        if len(ids) < batch_size:
+            return total
+        if pause:
+            time.sleep(pause)
+
+
+def purge_expired_tokens(retention_days=None, batch_size=PURGE_BATCH_SIZE, pause=0):
+    """
+    清理过期的令牌记录与吊销记录
+    :param retention_days: 令牌过期后的保留天数，默认JWT_AUTH['TOKEN_RETENTION_DAYS']
+    :return: {'tokens': 删除的令牌记录数, 'revocations': 删除的吊销记录数}
+    """
+    if retention_days is None:
+        retention_days = get_setting('TOKEN_RETENTION_DAYS')
+    now = timezone.now()
+    tokens = purge_queryset(
+        UserToken.objects.filter(expired_at__lt=now - timedelta(days=retention_days)), batch_size, pause
+    )
+    revocations = purge_queryset(TokenRevocation.objects.filter(expires_at__lt=now), batch_size, pause)
+    logger.info(f"已清理{tokens}条过期令牌记录，{revocations}条过期吊销记录")
+    return {'tokens': tokens, 'revocations': revocations}
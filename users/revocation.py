@@ -0,0 +1,193 @@
+"""
+令牌吊销列表模块
+无状态JWT模式下，访问令牌只校验签名与过期时间，吊销信息保存在进程内的吊销列表中：
+被吊销令牌的jti集合，以及按用户（和令牌类型）记录的吊销时间，早于该时间签发的令牌失效。
+列表按固定间隔从token_revocations表同步，本进程的吊销操作立即生效，
+其他进程最多在同步间隔后生效
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import TokenRevocation
+
+logger = logging.getLogger('django')
+
+DEFAULTS = {
+    # 是否启用无状态模式：令牌不写入user_tokens表，认证时不查询令牌表
+    'STATELESS': False,
+    # 吊销列表同步间隔（秒）
+    'REVOCATION_SYNC_INTERVAL': 30,
+    # 令牌记录过期后的保留天数，超过后由purge_tokens命令清理
+    'TOKEN_RETENTION_DAYS': 7,
+    # 登录时是否同时建立Django会话（供SessionAuthentication与可浏览API使用）
+    'SESSION_LOGIN': True,
+}
+
+
+def get_setting(name):
+    """
+    读取settings.JWT_AUTH中的配置，未配置时使用默认值
+    """
+    return getattr(settings, 'JWT_AUTH', {}).get(name, DEFAULTS[name])
+
+
+def to_milliseconds(timestamp):
+    """
+    将秒级时间戳转换为整数毫秒，避免浮点比较误差
+    """
+    return int(round(timestamp * 1000))
+
+
+def issued_at(now=None):
+    """
+    令牌签发时间，保留到毫秒，按用户吊销时可以区分吊销前后签发的令牌
+    """
+    now = now or timezone.now()
+    return int(now.timestamp() * 1000) / 1000
+
+
+def is_stateless():
+    """
+    是否启用无状态JWT模式
+    """
+    return get_setting('STATELESS')
+
+
+class RevocationList:
+    """
+    进程内的令牌吊销列表
+    用法：
+        revocation_list.is_revoked(payload)
+        revocation_list.revoke_token(payload)
+        revocation_list.revoke_user(user_id, lifetime)
+    """
+
+    def __init__(self):
+        self._jtis = set()
+        # {(用户ID, 令牌类型): 吊销时间（毫秒时间戳）}，令牌类型为''表示全部类型
+        self._cutoffs = {}
+        self._synced_at = None
+        # 本进程的吊销记录[(序号, jti, (用户ID, 令牌类型), 吊销时间)]，
+        # 同步时合并读取数据库之后新增的记录，避免被同步结果覆盖
+        self._seq = 0
+        self._log = []
+        # 已应用的同步开始读取数据库时的序号
+        self._synced_seq = 0
+        self._lock = threading.Lock()
+
+    def sync(self):
+        """
+        从数据库重新加载未过期的吊销记录
+        读取数据库期间本进程新增的吊销在替换时合并；开始更早的同步晚于其他同步完成时丢弃结果
+        """
+        with self._lock:
+            start = self._seq
+        jtis, cutoffs = set(), {}
+        rows = TokenRevocation.objects.filter(expires_at__gt=timezone.now()).values_list(
+            'jti', 'user_id', 'token_type', 'revoked_at'
+        )
+        for jti, user_id, token_type, revoked_at in rows.iterator():
+            if jti:
+                jtis.add(jti)
+            else:
+                key = (user_id, token_type)
+                cutoffs[key] = max(cutoffs.get(key, 0), to_milliseconds(revoked_at.timestamp()))
+        with self._lock:
+            if start < self._synced_seq:
+                return
+            self._log = [entry for entry in self._log if entry[0] > start]
+            for _, jti, key, cutoff in self._log:
+                if jti:
+                    jtis.add(jti)
+                else:
+                    cutoffs[key] = max(cutoffs.get(key, 0), cutoff)
+            self._jtis = jtis
+            self._cutoffs = cutoffs
+            self._synced_seq = start
+            self._synced_at = time.monotonic()
+
+    def _record(self, jti=None, key=None, cutoff=None):
+        """
+        记录本进程的吊销，需在持有锁时调用
+        """
+        self._seq += 1
+        self._log.append((self._seq, jti, key, cutoff))
+
+    def _ensure_synced(self):
+        synced_at = self._synced_at
+        if synced_at is None or time.monotonic() - synced_at >= get_setting('REVOCATION_SYNC_INTERVAL'):
+            self.sync()
+
+    def is_revoked(self, payload):
+        """
+        判断令牌是否已被吊销
+        :param payload: 已校验签名的令牌载荷，需包含jti、user_id、type、iat
+        """
+        self._ensure_synced()
+        user_id = payload.get('user_id')
+        issued = to_milliseconds(payload.get('iat') or 0)
+        with self._lock:
+            if payload.get('jti') in self._jtis:
+                return True
+            cutoff = max(
+                self._cutoffs.get((user_id, ''), 0),
+                self._cutoffs.get((user_id, payload.get('type')), 0),
+            )
+        return issued < cutoff
+
+    def revoke_token(self, payload):
+        """
+        吊销单个令牌
+        :param payload: 令牌载荷
+        :return: 是否新吊销了该令牌
+        """
+        jti = payload.get('jti')
+        if not jti:
+            return False
+        _, created = TokenRevocation.objects.get_or_create(jti=jti, defaults={
+            'user_id': payload.get('user_id'),
+            'token_type': payload.get('type') or '',
+            'revoked_at': timezone.now(),
+            'expires_at': datetime.fromtimestamp(payload['exp'], tz=dt_timezone.utc),
+        })
+        with self._lock:
+            self._jtis.add(jti)
+            self._record(jti=jti)
+        return created
+
+    def revoke_user(self, user_id, lifetime, token_type=''):
+        """
+        吊销用户在此之前签发的全部令牌
+        :param lifetime: 相关令牌的最长有效期（timedelta），记录在此之后可清理
+        :param token_type: 令牌类型，''表示全部类型
+        """
+        # 截断到毫秒，与令牌iat的精度一致，保证随后签发的新令牌不会被误判
+        now = timezone.now()
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        TokenRevocation.objects.create(
+            user_id=user_id, token_type=token_type, revoked_at=now, expires_at=now + lifetime
+        )
+        with self._lock:
+            key = (user_id, token_type)
+            cutoff = to_milliseconds(now.timestamp())
+            self._cutoffs[key] = max(self._cutoffs.get(key, 0), cutoff)
+            self._record(key=key, cutoff=cutoff)
+
+    def clear(self):
+        """
+        清空进程内的列表，下次检查时重新同步，用于测试
+        """
+        with self._lock:
+            self._jtis = set()
+            self._cutoffs = {}
+            self._synced_at = None
+            self._log = []
+            self._synced_seq = self._seq
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,194 @@
+"""
+令牌验证缓存模块
+缓存已通过数据库校验的访问令牌，命中时不再查询令牌表。
+两级缓存：进程内存（本地层）与可选的Django缓存（共享层，如Redis），按令牌摘要存储用户ID、租户ID和过期时间。
+
+令牌失效通过按用户的吊销版本号实现：TokenManager使令牌失效时递增该用户的版本号，
+缓存条目记录写入时的版本号，版本号不一致的条目视为失效。
+配置了共享层时版本号保存在共享层，各进程立即可见；
+只有本地层时版本号保存在进程内，其他进程最多在LOCAL_TTL秒后失效。
+版本号在令牌失效的事务提交后递增（见revoke_user_on_commit）：提交前递增时，
+并发请求可能按新版本号缓存仍为有效状态的旧令牌
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import UserToken
+
+logger = logging.getLogger('django')
+
+DEFAULTS = {
+    # 本地层条目有效期（秒）
+    'LOCAL_TTL': 60,
+    # 本地层最多保存的条目数
+    'LOCAL_MAX_ENTRIES': 10000,
+    # 共享层使用的缓存别名（settings.CACHES中的键），为None时不使用共享层
+    'SHARED_ALIAS': None,
+    # 共享层条目有效期上限（秒），不超过令牌剩余有效期
+    'SHARED_TTL': 300,
+}
+
+KEY_PREFIX = 'auth_token'
+
+# 已验证的令牌：用户ID、租户ID、过期时间戳、写入时的吊销版本号
+VerifiedToken = namedtuple('VerifiedToken', ['user_id', 'tenant_id', 'expires_at', 'version'])
+
+
+def get_setting(name):
+    """
+    读取settings.AUTH_TOKEN_CACHE中的配置，未配置时使用默认值
+    """
+    return getattr(settings, 'AUTH_TOKEN_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def token_digest(token):
+    """
+    计算令牌摘要，缓存中不保存令牌原文
+    """
+    return UserToken.hash_token(token)
+
+
+class TokenCache:
+    """
+    令牌验证缓存
+    用法：
+        version = token_cache.get_version(user_id)  # 查询数据库之前读取
+        ...数据库校验...
+        token_cache.set(token, VerifiedToken(user.id, user.tenant_id, exp, version))
+        token_cache.get(token)
+        token_cache.revoke_user_on_commit(user_id)
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        """
+        共享层缓存，未配置时为None
+        """
+        alias = get_setting('SHARED_ALIAS')
+        return caches[alias] if alias else None
+
+    def _version_key(self, user_id):
+        return f'{KEY_PREFIX}:version:{user_id}'
+
+    def _entry_key(self, digest):
+        return f'{KEY_PREFIX}:entry:{digest}'
+
+    def get_version(self, user_id):
+        """
+        获取用户当前的吊销版本号
+        """
+        shared = self.shared
+        if shared is not None:
+            return shared.get(self._version_key(user_id), 0)
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def get(self, token):
+        """
+        查找已验证的令牌
+        :return: VerifiedToken，未命中、已过期或已吊销时返回None
+        """
+        digest = token_digest(token)
+        now = time.time()
+        with self._lock:
+            cached = self._entries.get(digest)
+            if cached is not None:
+                entry, cached_at = cached
+                if now - cached_at < get_setting('LOCAL_TTL'):
+                    self._entries.move_to_end(digest)
+                else:
+                    del self._entries[digest]
+                    entry = None
+            else:
+                entry = None
+
+        shared = self.shared
+        if entry is None and shared is not None:
+            entry = shared.get(self._entry_key(digest))
+            if entry is not None:
+                entry = VerifiedToken(*entry)
+                self._store_local(digest, entry, now)
+        if entry is None:
+            return None
+
+        if entry.expires_at <= now or entry.version != self.get_version(entry.user_id):
+            self.discard(token)
+            return None
+        return entry
+
+    def set(self, token, entry):
+        """
+        缓存已验证的令牌
+        :param entry: VerifiedToken，version需为查询数据库之前读取的版本号
+        """
+        digest = token_digest(token)
+        now = time.time()
+        self._store_local(digest, entry, now)
+        shared = self.shared
+        if shared is not None:
+            timeout = min(get_setting('SHARED_TTL'), int(entry.expires_at - now))
+            if timeout > 0:
+                shared.set(self._entry_key(digest), tuple(entry), timeout)
+
+    def _store_local(self, digest, entry, now):
+        with self._lock:
+            self._entries[digest] = (entry, now)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > get_setting('LOCAL_MAX_ENTRIES'):
+                self._entries.popitem(last=False)
+
+    def discard(self, token):
+        """
+        删除单个令牌的缓存
+        """
+        digest = token_digest(token)
+        with self._lock:
+            self._entries.pop(digest, None)
+        shared = self.shared
+        if shared is not None:
+            shared.delete(self._entry_key(digest))
+
+    def revoke_user(self, user_id):
+        """
+        递增用户的吊销版本号，使该用户已缓存的全部令牌失效
+        """
+        shared = self.shared
+        if shared is not None:
+            key = self._version_key(user_id)
+            # 版本号不设过期时间，过期后回到0可能与旧条目的版本号重合
+            if not shared.add(key, 1, None):
+                try:
+                    shared.incr(key)
+                except ValueError:
+                    shared.set(key, 1, None)
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def revoke_user_on_commit(self, user_id):
+        """
+        在当前事务提交后递增用户的吊销版本号，不在事务中时立即递增；事务回滚时不递增
+        """
+        transaction.on_commit(partial(self.revoke_user, user_id))
+
+    def clear(self):
+        """
+        清空本地层，用于测试
+        """
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+
+token_cache = TokenCache()
@@ -1,5 +1,6 @@
 from django.shortcuts import render
 from django.contrib.auth import login, logout
+from django.db import transaction
 from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.conf import settings
@@ -21,7 +22,7 @@ from common.exceptions import BusinessException, AuthenticationException
 from common.permissions import IsAuthenticated, IsAdminUser, IsSuperAdminUser
 from common.models import Tenant, TenantQuota
 
-from .models import User, UserToken
+from .models import User
 from .serializers import (
     UserRegisterSerializer, 
     UserLoginSerializer, 
@@ -35,6 +36,7 @@ from .serializers import (
     TenantUserCreateSerializer  # 添加租户用户创建序列化器
 )
 from .authentication import JWTAuthentication, TokenManager
+from .revocation import get_setting as get_jwt_setting
 from .api_examples import *  # 导入API示例数据
 
 
@@ -187,15 +189,17 @@ class LoginAPIView(BaseAPIView):
         if serializer.is_valid():
             user = serializer.validated_data['user']
             
-            # Django会话登录（可选）
-            login(request, user)
-            
-            # 生成令牌
-            access_token, refresh_token, _, _ = TokenManager.generate_tokens(user)
-            
-            # 更新最后登录时间
-            user.last_login = timezone.now()
-            user.save(update_fields=['last_login'])
+            # 会话登录、最后登录时间与令牌在同一事务中写入
+            with transaction.atomic():
+                if get_jwt_setting('SESSION_LOGIN'):
+                    # Django会话登录，同时通过user_logged_in信号更新最后登录时间
+                    login(request, user)
+                else:
+                    user.last_login = timezone.now()
+                    User.objects.filter(pk=user.pk).update(last_login=user.last_login)
+
+                # 生成令牌
+                access_token, refresh_token, _, _ = TokenManager.generate_tokens(user)
             
             # 返回用户信息和令牌
             return self.success(
@@ -1089,7 +1093,7 @@ class UserTenantAssignAPIView(BaseAPIView):
             user.save()
             
             # 使所有该用户的令牌失效，强制用户重新登录
-            UserToken.objects.filter(user=user).update(is_valid=False)
+            TokenManager.invalidate_user_tokens(user)
             
             return self.success(
                 data={